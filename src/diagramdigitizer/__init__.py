@@ -2,6 +2,21 @@ from . import ui
 
 from . import diagramdigitizer
 from . import graphscene
+from . import calibration
+from . import datapoints
+from . import history
+from . import lrucache
+from . import background
+from . import imagecache
+from . import loader
+from . import pageselector
+from . import preprocessing
+from . import extraction
+from . import matching
+from . import axisdetection
+from . import clustering
+from . import executor
+from . import pipeline
 from . import export
 from . import utils
 
@@ -0,0 +1,205 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: axisdetection
+   :synopsis: Detection of axis lines and the plot frame for proposing the axes reference points.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import math
+import numpy
+
+from . import preprocessing
+
+# Constants
+AXIS_MIN_FRACTION = 0.25  # minimum length of an axis line relative to the image width/height
+AXIS_LENGTH_RATIO = 0.8  # lines at least this share of the longest line are axis candidates
+AXIS_MAX_GAP = 2  # pixels of a line interrupted by scanning noise
+AXIS_SNAP_DISTANCE = 5.0  # pixels between the end of an axis and a frame line crossing it there
+
+
+def findRuns(maskArr, maxGap=0):
+    """Runs of set pixels along the rows, runs with gaps up to maxGap in between are merged.
+
+    Parameters
+    ----------
+    maskArr : numpy-array
+        Mask, shape (H, W), dtype bool.
+    maxGap : int
+        Largest gap bridged in pixels.
+
+    Returns
+    -------
+    out : tuple
+        (rows, first columns, last columns + 1) of the runs, ordered by row and column.
+    """
+
+    (height, width) = maskArr.shape
+
+    # transitions within the rows, padded with an unset column
+    paddedArr = numpy.zeros((height, width + 2), dtype=numpy.int8)
+    paddedArr[:, 1:-1] = maskArr
+    (rowArr, startArr) = numpy.nonzero(numpy.diff(paddedArr, axis=1) == 1)
+    (_, endArr) = numpy.nonzero(numpy.diff(paddedArr, axis=1) == -1)
+
+    if (len(rowArr) == 0) or (maxGap <= 0):
+        return (rowArr, startArr, endArr)
+
+    # a new run starts where the row changes or the gap is too large
+    isNewArr = numpy.ones(len(rowArr), dtype=bool)
+    isNewArr[1:] = (rowArr[1:] != rowArr[:-1]) | (startArr[1:] - endArr[:-1] > maxGap)
+    firstArr = numpy.nonzero(isNewArr)[0]
+    lastArr = numpy.append(firstArr[1:], len(rowArr)) - 1
+
+    return (rowArr[firstArr], startArr[firstArr], endArr[lastArr])
+
+
+def findLines(maskArr, minLength, maxGap=AXIS_MAX_GAP):
+    """Horizontal lines: adjacent rows covered by long runs (projection profile of the long runs).
+
+    Parameters
+    ----------
+    maskArr : numpy-array
+        Mask of the dark pixels, shape (H, W), dtype bool.
+    minLength : float
+        Minimum length of a line in pixels.
+    maxGap : int
+        Largest gap within a line in pixels.
+
+    Returns
+    -------
+    out : numpy-array
+        Lines (center row, first column, last column + 1) in pixel edges, shape (N, 3), ordered from the top.
+    """
+
+    (rowArr, startArr, endArr) = findRuns(maskArr, maxGap)
+    isLongArr = endArr - startArr >= minLength
+    (rowArr, startArr, endArr) = (rowArr[isLongArr], startArr[isLongArr], endArr[isLongArr])
+
+    if (len(rowArr) == 0):
+        return numpy.zeros((0, 3))
+
+    # profile of the long runs per row, adjacent rows form one (thick) line
+    profileArr = numpy.bincount(rowArr, weights=endArr - startArr, minlength=maskArr.shape[0])
+    rowsArr = numpy.nonzero(profileArr)[0]
+    lineIdArr = numpy.cumsum(numpy.diff(rowsArr, prepend=-2) > 1) - 1
+
+    lineArr = numpy.zeros((lineIdArr[-1] + 1, 3))
+    lineArr[:, 0] = (numpy.bincount(lineIdArr, weights=profileArr[rowsArr] * (rowsArr + 0.5)) /
+                     numpy.bincount(lineIdArr, weights=profileArr[rowsArr]))
+
+    # extent of the runs of each line
+    runLineIdArr = lineIdArr[numpy.searchsorted(rowsArr, rowArr)]
+    lineArr[:, 1] = numpy.inf
+    numpy.minimum.at(lineArr[:, 1], runLineIdArr, startArr)
+    numpy.maximum.at(lineArr[:, 2], runLineIdArr, endArr)
+
+    return lineArr
+
+
+def selectAxisLine(lineArr, fromEnd):
+    """Axis among lines: the outermost of the lines nearly as long as the longest one.
+
+    Parameters
+    ----------
+    lineArr : numpy-array
+        Lines, see :func:`findLines`.
+    fromEnd : bool
+        Outermost at the end (bottom) instead of the start (left).
+
+    Returns
+    -------
+    out : numpy-array
+        Line (center, first, last + 1), None if there is no line.
+    """
+
+    if (len(lineArr) == 0):
+        return None
+
+    lengthArr = lineArr[:, 2] - lineArr[:, 1]
+    candidateArr = lineArr[lengthArr >= AXIS_LENGTH_RATIO * lengthArr.max()]
+
+    return candidateArr[-1] if fromEnd else candidateArr[0]
+
+
+def snapAxisEnd(end, lineArr, position):
+    """End of an axis moved onto the center of a crossing line there (e.g. the plot frame).
+
+    Parameters
+    ----------
+    end : float
+        Pixel center of the axis end.
+    lineArr : numpy-array
+        Lines perpendicular to the axis, see :func:`findLines`.
+    position : float
+        Position of the axis, the crossing line must span it.
+
+    Returns
+    -------
+    out : float
+        Center of the nearest crossing line within AXIS_SNAP_DISTANCE, else the end.
+    """
+
+    isCrossingArr = ((numpy.abs(lineArr[:, 0] - end) <= AXIS_SNAP_DISTANCE) &
+                     (lineArr[:, 1] <= position) & (lineArr[:, 2] >= position))
+
+    if not numpy.any(isCrossingArr):
+        return end
+
+    return lineArr[isCrossingArr][numpy.argmin(numpy.abs(lineArr[isCrossingArr, 0] - end)), 0]
+
+
+def detectAxesPoints(pixelArr, isDeskewing=True, minFraction=AXIS_MIN_FRACTION):
+    """Proposal of the axes reference points: the x axis is the lowest and the y axis the leftmost long dark line
+    (e.g. the plot frame); X0/Y0 are placed at their crossing, X1 at the right end of the x axis, Y1 at the top of
+    the y axis (or on the frame lines there).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    isDeskewing : bool
+        Detect the lines in the deskewed image (see :func:`preprocessing.estimateSkewAngle`), the points are mapped
+        back to the image.
+    minFraction : float
+        Minimum length of an axis line relative to the image width/height.
+
+    Returns
+    -------
+    out : dict
+        {"X0": (x, y), "X1": ..., "Y0": ..., "Y1": ...} in image pixels, None if no axes are found.
+    """
+
+    pixelArr = numpy.asarray(pixelArr)
+    (height, width) = pixelArr.shape[:2]
+
+    angle = preprocessing.estimateSkewAngle(pixelArr) if isDeskewing else 0.0
+    if (angle != 0.0):
+        pixelArr = preprocessing.rotateImage(pixelArr, angle)
+
+    grayArr = preprocessing.calcGray(pixelArr)
+    maskArr = grayArr <= preprocessing.calcOtsuThreshold(grayArr)
+
+    horizontalArr = findLines(maskArr, minFraction * width)
+    verticalArr = findLines(numpy.ascontiguousarray(maskArr.T), minFraction * height)
+    xAxisArr = selectAxisLine(horizontalArr, True)
+    yAxisArr = selectAxisLine(verticalArr, False)
+
+    if (xAxisArr is None) or (yAxisArr is None):
+        return None
+
+    # pixel centers of the line ends
+    (xOrigin, yOrigin) = (yAxisArr[0], xAxisArr[0])
+    xEnd = snapAxisEnd(xAxisArr[2] - 0.5, verticalArr, yOrigin)
+    yEnd = snapAxisEnd(yAxisArr[1] + 0.5, horizontalArr, xOrigin)
+    dictPoints = {"X0": (xOrigin, yOrigin), "X1": (xEnd, yOrigin), "Y0": (xOrigin, yOrigin), "Y1": (xOrigin, yEnd)}
+
+    # back to the image (inverse of the rotation about the center)
+    (cosA, sinA) = (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+    for (flag, (x, y)) in dictPoints.items():
+        (dx, dy) = (x - width / 2.0, y - height / 2.0)
+        dictPoints[flag] = (float(width / 2.0 + dx * cosA - dy * sinA), float(height / 2.0 + dx * sinA + dy * cosA))
+
+    return dictPoints
@@ -0,0 +1,290 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: background
+   :synopsis: Tiled multi-resolution background for large images.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import math
+import numpy
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from . import lrucache
+
+# Constants
+TILE_SIZE = 512  # pixels of a tile at every level
+TILE_CACHE_BUDGET = 256 * 2 ** 20  # bytes of decoded tiles
+TILED_MIN_PIXELS = 4096 * 4096  # images from this size on are shown tiled
+
+
+def calcNumLevels(width, height, tileSize=TILE_SIZE):
+    """Number of levels of an image pyramid, the coarsest level fits into one tile.
+
+    Parameters
+    ----------
+    width, height : int
+        Size of the image.
+    tileSize : int
+        Size of the tiles.
+
+    Returns
+    -------
+    out : int
+        Number of levels; level k is downscaled by 2**k.
+    """
+
+    return 1 + max(0, math.ceil(math.log2(max(width, height, 1) / tileSize)))
+
+
+def calcPyramidShapes(width, height):
+    """Pixel array shapes of the pyramid levels of an image.
+
+    Parameters
+    ----------
+    width, height : int
+        Size of the image.
+
+    Returns
+    -------
+    out : list
+        Shapes (H, W, 4); level k is downscaled by 2**k (rounded up).
+    """
+
+    return [(-(-height // 2 ** level), -(-width // 2 ** level), 4) for level in range(calcNumLevels(width, height))]
+
+
+def calcLevel(levelOfDetail, numLevels):
+    """Pyramid level for a zoom factor: the coarsest level that is not magnified.
+
+    Parameters
+    ----------
+    levelOfDetail : float
+        Scale of the view (screen pixels per image pixel).
+    numLevels : int
+        Number of levels.
+
+    Returns
+    -------
+    out : int
+        Level.
+    """
+
+    if (levelOfDetail <= 0.0):
+        return numLevels - 1
+
+    return min(numLevels - 1, max(0, math.floor(math.log2(1.0 / levelOfDetail))))
+
+
+def calcTileRange(rect, tileSizeFull, width, height):
+    """Tiles covering a rectangle.
+
+    Parameters
+    ----------
+    rect : tuple
+        (left, top, right, bottom) in image pixels.
+    tileSizeFull : int
+        Size of a tile in image pixels.
+    width, height : int
+        Size of the image.
+
+    Returns
+    -------
+    out : tuple
+        (first tile column, first tile row, last tile column, last tile row), empty if last < first.
+    """
+
+    (left, top, right, bottom) = rect
+
+    tx0 = max(0, math.floor(left / tileSizeFull))
+    ty0 = max(0, math.floor(top / tileSizeFull))
+    tx1 = min(math.ceil(width / tileSizeFull) - 1, math.floor(right / tileSizeFull))
+    ty1 = min(math.ceil(height / tileSizeFull) - 1, math.floor(bottom / tileSizeFull))
+
+    return (tx0, ty0, tx1, ty1)
+
+
+def openImageReader(filepath, page=0):
+    """Image reader of a page (frame) of an image file, only this page is decoded when read.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+    page : int
+        Page of a multi-page image (e.g. TIFF), 0 for single-page images.
+
+    Returns
+    -------
+    out : QImageReader
+        Reader positioned at the page.
+    """
+
+    reader = QtGui.QImageReader(filepath)
+
+    if (page > 0) and not reader.jumpToImage(page):
+        raise OSError("Page {} of {} not found".format(page + 1, filepath))
+
+    return reader
+
+
+def countImagePages(filepath):
+    """Number of pages (frames) of an image file.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+
+    Returns
+    -------
+    out : int
+        Number of pages, 1 for single-page images.
+    """
+
+    return max(1, QtGui.QImageReader(filepath).imageCount())
+
+
+def imageToArr(image):
+    """Pixels of an image.
+
+    Parameters
+    ----------
+    image : QImage
+        Image.
+
+    Returns
+    -------
+    out : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    """
+
+    image = image.convertToFormat(QtGui.QImage.Format_RGBA8888)
+    ptr = image.constBits()
+    ptr.setsize(image.sizeInBytes())
+
+    pixelArr = numpy.frombuffer(ptr, dtype=numpy.uint8).reshape(image.height(), image.bytesPerLine())
+
+    return pixelArr[:, :4 * image.width()].reshape(image.height(), image.width(), 4).copy()
+
+
+def arrToImage(pixelArr):
+    """Image of pixels.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+
+    Returns
+    -------
+    out : QImage
+        Image owning a copy of the pixels.
+    """
+
+    pixelArr = numpy.ascontiguousarray(pixelArr)
+    (height, width) = pixelArr.shape[:2]
+
+    return QtGui.QImage(pixelArr.data, width, height, 4 * width, QtGui.QImage.Format_RGBA8888).copy()
+
+
+def maskToImage(maskArr, rgba):
+    """Overlay image of a mask: set pixels in a color, the others transparent (indexed, one byte per pixel).
+
+    Parameters
+    ----------
+    maskArr : numpy-array
+        Mask, shape (H, W), dtype bool.
+    rgba : tuple
+        (r, g, b, alpha) of the set pixels.
+
+    Returns
+    -------
+    out : QImage
+        Image owning a copy of the mask.
+    """
+
+    maskArr = numpy.ascontiguousarray(maskArr).view(numpy.uint8)
+    (height, width) = maskArr.shape
+    image = QtGui.QImage(maskArr.data, width, height, width, QtGui.QImage.Format_Indexed8)
+    image.setColorTable([QtGui.qRgba(0, 0, 0, 0), QtGui.qRgba(*rgba)])
+
+    return image.copy()
+
+
+class DDTiledImageItem(QtWidgets.QGraphicsItem):
+    """Image drawn from tiles of an image pyramid.
+
+    The pyramid is decoded once in strips when the image is loaded (memory-mapped from the image cache, or from a
+    temporary file without cache), so painting never decodes the image file: only the tiles visible at the current
+    zoom are sliced from the level matching it. Sliced tiles are kept in a least recently used cache limited to a
+    memory budget.
+
+    Parameters
+    ----------
+    pyramidArrs : list
+        RGBA pixels of all pyramid levels, see :func:`calcPyramidShapes`.
+    """
+
+    def __init__(self, pyramidArrs, *args):
+
+        QtWidgets.QGraphicsItem.__init__(self, *args)
+
+        self.setFlag(QtWidgets.QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+        self.__size = QtCore.QSize(pyramidArrs[0].shape[1], pyramidArrs[0].shape[0])
+        self.__numLevels = len(pyramidArrs)
+        self.__tileCache = lrucache.DDLruCache(TILE_CACHE_BUDGET)
+        self.__pyramidArrs = pyramidArrs
+
+    def getImageSize(self):
+
+        return QtCore.QSize(self.__size)
+
+    def getPyramidArrs(self):
+
+        return self.__pyramidArrs
+
+    def getTileCache(self):
+
+        return self.__tileCache
+
+    def setTileCacheBudget(self, budget):
+
+        self.__tileCache.setBudget(budget)
+
+    def getTile(self, level, tx, ty):
+
+        key = (level, tx, ty)
+
+        if not (key in self.__tileCache):
+            tile = arrToImage(self.__pyramidArrs[level][ty * TILE_SIZE:(ty + 1) * TILE_SIZE,
+                                                        tx * TILE_SIZE:(tx + 1) * TILE_SIZE])
+            self.__tileCache.put(key, tile, tile.sizeInBytes())
+            return tile
+
+        return self.__tileCache.get(key)
+
+    def boundingRect(self):
+
+        return QtCore.QRectF(0.0, 0.0, self.__size.width(), self.__size.height())
+
+    def paint(self, painter, option, widget=None):
+
+        level = calcLevel(option.levelOfDetailFromTransform(painter.worldTransform()), self.__numLevels)
+        tileSizeFull = TILE_SIZE << level
+
+        exposedRect = option.exposedRect.intersected(self.boundingRect())
+        (tx0, ty0, tx1, ty1) = calcTileRange((exposedRect.left(), exposedRect.top(), exposedRect.right(),
+                                              exposedRect.bottom()), tileSizeFull, self.__size.width(),
+                                             self.__size.height())
+
+        painter.setRenderHint(QtGui.QPainter.SmoothPixmapTransform, level > 0)
+
+        for ty in range(ty0, ty1 + 1):
+            for tx in range(tx0, tx1 + 1):
+                targetRect = QtCore.QRectF(tx * tileSizeFull, ty * tileSizeFull, tileSizeFull,
+                                           tileSizeFull).intersected(self.boundingRect())
+                painter.drawImage(targetRect, self.getTile(level, tx, ty))
@@ -0,0 +1,611 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: calibration
+   :synopsis: Axes calibration and coordinate transformation.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import numpy
+import pickle
+
+
+class AXES_POINTS:
+    """Keys of the axes reference points in project files (identical to the graphics scene operation modes)."""
+    (AXIS_X0, AXIS_X1, AXIS_Y0, AXIS_Y1) = (1, 3, 5, 7)
+
+
+class SCALETYPE_AXES:
+    """Axes scale types (linear/logarithmic)."""
+    (AXIS_LIN_X, AXIS_LOG_X, AXIS_LIN_Y, AXIS_LOG_Y) = range(4)
+
+
+class CALIBRATION_POINTS:
+    """Keys of fitted calibration points (reference points per axis, control points for both axes)."""
+    (POINTS_X, POINTS_Y, POINTS_XY) = ("x", "y", "xy")
+
+
+class DDAxesCalibration:
+    """Axes calibration: Transformation of scene coordinates to real coordinates.
+
+    Each axis is described by an origin and a unit direction in scene coordinates and by an offset and a scale
+    factor in linear or logarithmic real coordinates. The real coordinate of a scene position pos is
+
+    * linear axis: offset + scale * c
+    * logarithmic axis: exp(offset + scale * c)
+
+    with the coordinate c of pos - origin along the axis: its projection onto the axis direction (two-point
+    calibration), or its oblique coordinate (decomposition into both axis directions, fitted calibrations), so
+    positions on a line parallel to the other axis have the same value, also on sheared scans.
+
+    A calibration object is not modified after construction. A changed axes setup requires a new object.
+    The calibration does not depend on Qt and can be used without a graphical user interface.
+
+    Parameters
+    ----------
+    origins : numpy-array
+        Origins of x and y axis in scene coordinates, shape (2, 2).
+    directions : numpy-array
+        Unit directions of x and y axis in scene coordinates, shape (2, 2).
+    offsets : numpy-array
+        Offsets of x and y axis in linear or logarithmic real coordinates, shape (2,).
+    scales : numpy-array
+        Scale factors of x and y axis, shape (2,).
+    logAxes : tuple
+        Logarithmic scale flags (x axis, y axis).
+    residuals : tuple
+        Residuals of a fitted calibration (x axis, y axis) in linear or logarithmic real coordinates, optional.
+    isOblique : bool
+        Oblique coordinates along the axes instead of projections onto them.
+    """
+
+    def __init__(self, origins, directions, offsets, scales, logAxes, residuals=None, isOblique=False):
+
+        self.__origins = numpy.array(origins, dtype=float)
+        self.__directions = numpy.array(directions, dtype=float)
+        self.__offsets = numpy.array(offsets, dtype=float)
+        self.__scales = numpy.array(scales, dtype=float)
+        self.__logAxes = (bool(logAxes[0]), bool(logAxes[1]))
+
+        if (residuals is None):
+            self.__residuals = (numpy.zeros(0), numpy.zeros(0))
+        else:
+            self.__residuals = (numpy.array(residuals[0], dtype=float), numpy.array(residuals[1], dtype=float))
+
+        self.__isOblique = bool(isOblique)
+        isParallel = (abs(numpy.linalg.det(self.__directions)) <= 1e-12)
+
+        # Coordinate along axis i: projDirection_i . (pos - origin_i), with the dual basis of the axis directions
+        # (rows) for oblique coordinates
+        if self.__isOblique:
+            if isParallel:
+                raise ValueError("Axes are parallel, coordinates cannot be determined.")
+            self.__projDirections = numpy.linalg.inv(self.__directions.T)
+        else:
+            self.__projDirections = self.__directions.copy()
+
+        # Inverse for the back-transformation (None if the axes are parallel)
+        self.__invProjDirections = None if isParallel else numpy.linalg.inv(self.__projDirections)
+
+        for arr in (self.__origins, self.__directions, self.__projDirections, self.__offsets,
+                    self.__scales) + self.__residuals:
+            arr.setflags(write=False)
+
+    def isOblique(self):
+
+        return self.__isOblique
+
+    def getLogAxes(self):
+
+        return self.__logAxes
+
+    def getResiduals(self):
+
+        return self.__residuals
+
+    def getResidualsRms(self):
+
+        return tuple(numpy.sqrt(numpy.mean(res ** 2)) if (len(res) > 0) else 0.0 for res in self.__residuals)
+
+    def getAffineMatrix(self):
+        """Affine matrix M of the transformation to linear or logarithmic real coordinates:
+        lin = M . (x, y, 1).
+
+        Returns
+        -------
+        out : numpy-array
+            Affine matrix, shape (2, 3).
+        """
+
+        matAffine = numpy.zeros((2, 3))
+
+        for axis in range(2):
+            matAffine[axis, :2] = self.__scales[axis] * self.__projDirections[axis]
+            matAffine[axis, 2] = (self.__offsets[axis] -
+                                  self.__scales[axis] * numpy.dot(self.__origins[axis], self.__projDirections[axis]))
+
+        return matAffine
+
+    def calculateRealCoordinates(self, x, y):
+
+        realCoords = self.calculateRealCoordinatesArr(numpy.array([[x, y]]))
+
+        return (realCoords[0, 0], realCoords[0, 1])
+
+    def calculateRealCoordinatesArr(self, scenePosArr):
+        """Transform scene coordinates to real coordinates.
+
+        Parameters
+        ----------
+        scenePosArr : numpy-array
+            Scene coordinates, shape (N, 2).
+
+        Returns
+        -------
+        out : numpy-array
+            Real coordinates, shape (N, 2).
+        """
+
+        scenePosArr = numpy.asarray(scenePosArr, dtype=float).reshape(-1, 2)
+        realCoords = numpy.zeros((len(scenePosArr), 2))
+
+        for axis in range(2):
+
+            # projection onto axis (or oblique coordinate along axis)
+            posVec_sc_rel = scenePosArr - self.__origins[axis]
+            proj_sc = (posVec_sc_rel[:, 0] * self.__projDirections[axis, 0] +
+                       posVec_sc_rel[:, 1] * self.__projDirections[axis, 1])
+
+            # scaling to real coordinates
+            if (self.__logAxes[axis]):
+                realCoords[:, axis] = numpy.exp(self.__offsets[axis] + self.__scales[axis] * proj_sc)
+            else:
+                realCoords[:, axis] = self.__offsets[axis] + self.__scales[axis] * proj_sc
+
+        return realCoords
+
+    def calculateSceneCoordinatesArr(self, realCoordsArr):
+        """Transform real coordinates to scene coordinates (inverse of calculateRealCoordinatesArr).
+
+        Parameters
+        ----------
+        realCoordsArr : numpy-array
+            Real coordinates, shape (N, 2). Values on logarithmic axes have to be positive.
+
+        Returns
+        -------
+        out : numpy-array
+            Scene coordinates, shape (N, 2). Invalid values on logarithmic axes result in NaN.
+        """
+
+        if (self.__invProjDirections is None):
+            raise ValueError("Axes are parallel, scene coordinates cannot be determined.")
+
+        realCoordsArr = numpy.asarray(realCoordsArr, dtype=float).reshape(-1, 2)
+        projArr = numpy.zeros((len(realCoordsArr), 2))
+
+        for axis in range(2):
+
+            # back-scaling to coordinates along axis, relative to the scene origin
+            if (self.__logAxes[axis]):
+                with numpy.errstate(divide='ignore', invalid='ignore'):
+                    linReal = numpy.log(numpy.where(realCoordsArr[:, axis] > 0.0, realCoordsArr[:, axis], numpy.nan))
+            else:
+                linReal = realCoordsArr[:, axis]
+
+            projArr[:, axis] = ((linReal - self.__offsets[axis]) / self.__scales[axis] +
+                                numpy.dot(self.__origins[axis], self.__projDirections[axis]))
+
+        # solve projDirections . pos = proj for all points
+        return projArr @ self.__invProjDirections.T
+
+    def calculateSceneCoordinates(self, x, y):
+
+        sceneCoords = self.calculateSceneCoordinatesArr(numpy.array([[x, y]]))
+
+        return (sceneCoords[0, 0], sceneCoords[0, 1])
+
+
+def isAxisRealValid(real0, real1, isLog):
+    """Check real values of the reference points of an axis.
+
+    Parameters
+    ----------
+    real0, real1 : float
+        Real values of the axis reference points (None if not given).
+    isLog : bool
+        Logarithmic scale flag.
+
+    Returns
+    -------
+    out : bool
+        True if a calibration can be built from the values.
+
+    Example
+    -------
+    Basic example.
+
+    >>> from diagramdigitizer import calibration
+    >>> calibration.isAxisRealValid(0.0, 10.0, False)
+    True
+    >>> calibration.isAxisRealValid(0.0, 10.0, True)
+    False
+    """
+
+    if ((real0 is None) or (real1 is None) or (real0 == real1)):
+        return False
+
+    if (isLog):
+        return (real0 > 0.0) and (real1 > 0.0)
+
+    return True
+
+
+def calcLenEvec(vec):
+    """Length and unit vector of a vector.
+
+    Parameters
+    ----------
+    vec : numpy-array
+        Vector.
+
+    Returns
+    -------
+    out : tuple
+        Length, unit vector.
+    """
+
+    len_vec = numpy.sqrt(numpy.dot(vec, vec))
+    evec = vec / len_vec
+
+    return (len_vec, evec)
+
+
+def buildAxesCalibration(x0Vec, x1Vec, y0Vec, y1Vec, x0Real, x1Real, y0Real, y1Real, logX, logY):
+    """Axes calibration from two reference points per axis. Scene positions are projected onto the axes (unlike the
+    fitted calibrations), so the values of existing projects are kept.
+
+    Parameters
+    ----------
+    x0Vec, x1Vec, y0Vec, y1Vec : numpy-array
+        Scene coordinates of the axes reference points.
+    x0Real, x1Real, y0Real, y1Real : float
+        Real values of the axes reference points.
+    logX, logY : bool
+        Logarithmic scale flags.
+
+    Returns
+    -------
+    out : DDAxesCalibration
+        Axes calibration.
+
+    Example
+    -------
+    Basic example.
+
+    >>> import numpy
+    >>> from diagramdigitizer import calibration
+    >>> cal = calibration.buildAxesCalibration(numpy.array([0., 100.]), numpy.array([100., 100.]),
+    ...                                        numpy.array([0., 100.]), numpy.array([0., 0.]),
+    ...                                        0.0, 10.0, 1.0, 100.0, False, True)
+    >>> cal.calculateRealCoordinatesArr(numpy.array([[50., 50.]]))
+    array([[ 5., 10.]])
+    """
+
+    origins = numpy.zeros((2, 2))
+    directions = numpy.zeros((2, 2))
+    offsets = numpy.zeros(2)
+    scales = numpy.zeros(2)
+
+    axesDefs = ((x0Vec, x1Vec, x0Real, x1Real, logX), (y0Vec, y1Vec, y0Real, y1Real, logY))
+
+    for axis, (vec0, vec1, real0, real1, isLog) in enumerate(axesDefs):
+
+        vec0 = numpy.asarray(vec0, dtype=float)
+        vec1 = numpy.asarray(vec1, dtype=float)
+        (len_sc, evec_sc) = calcLenEvec(vec1 - vec0)
+
+        origins[axis] = vec0
+        directions[axis] = evec_sc
+
+        if (isLog):
+            offsets[axis] = numpy.log(real0)
+            scales[axis] = (numpy.log(real1) - numpy.log(real0)) / len_sc
+        else:
+            offsets[axis] = real0
+            scales[axis] = (real1 - real0) / len_sc
+
+    return DDAxesCalibration(origins, directions, offsets, scales, (logX, logY))
+
+
+def linearizeRealValues(realArr, isLog):
+    """Real values in linear or logarithmic coordinates.
+
+    Parameters
+    ----------
+    realArr : numpy-array
+        Real values.
+    isLog : bool
+        Logarithmic scale flag.
+
+    Returns
+    -------
+    out : numpy-array
+        Real values (linear axis) or their logarithms (logarithmic axis).
+    """
+
+    realArr = numpy.asarray(realArr, dtype=float)
+
+    if (isLog):
+        if not (realArr > 0.0).all():
+            raise ValueError("Real values on logarithmic axes have to be positive.")
+        return numpy.log(realArr)
+
+    return realArr
+
+
+def fitAxisLine(scenePosArr):
+    """Least-squares line through N >= 2 reference points of one axis.
+
+    Parameters
+    ----------
+    scenePosArr : numpy-array
+        Scene coordinates of the reference points, shape (N, 2).
+
+    Returns
+    -------
+    out : tuple
+        Origin (centroid), unit direction (principal direction of the points).
+    """
+
+    scenePosArr = numpy.asarray(scenePosArr, dtype=float).reshape(-1, 2)
+
+    if (len(scenePosArr) < 2):
+        raise ValueError("At least two reference points with real values are required per axis.")
+
+    origin = scenePosArr.mean(axis=0)
+
+    (_, singVals, rightSingVecs) = numpy.linalg.svd(scenePosArr - origin, full_matrices=False)
+    if (singVals[0] <= 0.0):
+        raise ValueError("Reference points of an axis have to be distinct.")
+
+    return (origin, rightSingVecs[0])
+
+
+def fitAxesReferencePoints(xScenePosArr, xRealArr, yScenePosArr, yRealArr, logX, logY):
+    """Axes calibration from N >= 2 reference points per axis (least-squares fit).
+
+    The axis lines are fitted to the reference points first. The real values are then fitted to the oblique
+    coordinates of the points along their axis (one least-squares system for both axes), so ticks of a sheared or
+    rotated scan are mapped consistently.
+
+    Parameters
+    ----------
+    xScenePosArr, yScenePosArr : numpy-array
+        Scene coordinates of the reference points of x and y axis, shape (N, 2).
+    xRealArr, yRealArr : numpy-array
+        Real values of the reference points of x and y axis, shape (N,).
+    logX, logY : bool
+        Logarithmic scale flags.
+
+    Returns
+    -------
+    out : DDAxesCalibration
+        Axes calibration including residuals.
+    """
+
+    xScenePosArr = numpy.asarray(xScenePosArr, dtype=float).reshape(-1, 2)
+    yScenePosArr = numpy.asarray(yScenePosArr, dtype=float).reshape(-1, 2)
+    xLinReal = linearizeRealValues(xRealArr, logX)
+    yLinReal = linearizeRealValues(yRealArr, logY)
+
+    if (len(xScenePosArr) != len(xLinReal)) or (len(yScenePosArr) != len(yLinReal)):
+        raise ValueError("At least two reference points with real values are required per axis.")
+
+    (xOrigin, xDirection) = fitAxisLine(xScenePosArr)
+    (yOrigin, yDirection) = fitAxisLine(yScenePosArr)
+    directions = numpy.array([xDirection, yDirection])
+
+    if (abs(numpy.linalg.det(directions)) <= 1e-12):
+        raise ValueError("Axes are parallel, coordinates cannot be determined.")
+
+    # oblique coordinates of the reference points along their axis
+    dualDirections = numpy.linalg.inv(directions.T)
+    xProj_sc = (xScenePosArr - xOrigin) @ dualDirections[0]
+    yProj_sc = (yScenePosArr - yOrigin) @ dualDirections[1]
+
+    # lin = offset + scale * oblique coordinate, both axes in one system: (scaleX, offsetX, scaleY, offsetY)
+    numX = len(xProj_sc)
+    designArr = numpy.zeros((numX + len(yProj_sc), 4))
+    designArr[:numX, 0] = xProj_sc
+    designArr[:numX, 1] = 1.0
+    designArr[numX:, 2] = yProj_sc
+    designArr[numX:, 3] = 1.0
+    linRealArr = numpy.concatenate((xLinReal, yLinReal))
+
+    (paramArr, _, rank, _) = numpy.linalg.lstsq(designArr, linRealArr, rcond=None)
+    if (rank < 4) or (paramArr[0] == 0.0) or (paramArr[2] == 0.0):
+        raise ValueError("Real values of the reference points of an axis have to differ.")
+
+    residuals = linRealArr - designArr @ paramArr
+
+    return DDAxesCalibration((xOrigin, yOrigin), directions, (paramArr[1], paramArr[3]), (paramArr[0], paramArr[2]),
+                             (logX, logY), (residuals[:numX], residuals[numX:]), isOblique=True)
+
+
+def fitAxesControlPoints(scenePosArr, realCoordsArr, logX, logY):
+    """Axes calibration from N >= 3 control points with known (x,y) real coordinates (least-squares fit of one
+    affine matrix). Skewed and rotated scans are handled.
+
+    Parameters
+    ----------
+    scenePosArr : numpy-array
+        Scene coordinates of the control points, shape (N, 2).
+    realCoordsArr : numpy-array
+        Real coordinates of the control points, shape (N, 2).
+    logX, logY : bool
+        Logarithmic scale flags.
+
+    Returns
+    -------
+    out : DDAxesCalibration
+        Axes calibration including residuals.
+
+    Example
+    -------
+    Basic example.
+
+    >>> import numpy
+    >>> from diagramdigitizer import calibration
+    >>> scenePosArr = numpy.array([[0., 100.], [100., 100.], [0., 0.], [100., 0.]])
+    >>> realCoordsArr = numpy.array([[0., 0.], [10., 0.], [0., 1.], [10., 1.]])
+    >>> cal = calibration.fitAxesControlPoints(scenePosArr, realCoordsArr, False, False)
+    >>> cal.calculateRealCoordinatesArr(numpy.array([[50., 50.]]))
+    array([[5. , 0.5]])
+    """
+
+    scenePosArr = numpy.asarray(scenePosArr, dtype=float).reshape(-1, 2)
+    realCoordsArr = numpy.asarray(realCoordsArr, dtype=float).reshape(-1, 2)
+
+    if (len(scenePosArr) < 3) or (len(scenePosArr) != len(realCoordsArr)):
+        raise ValueError("At least three control points with real coordinates are required.")
+
+    linReal = numpy.column_stack((linearizeRealValues(realCoordsArr[:, 0], logX),
+                                  linearizeRealValues(realCoordsArr[:, 1], logY)))
+
+    origin = scenePosArr.mean(axis=0)
+    offsets = linReal.mean(axis=0)
+
+    # lin - offsets = (pos - origin) . matLin^T for all control points
+    (matLinT, _, rank, _) = numpy.linalg.lstsq(scenePosArr - origin, linReal - offsets, rcond=None)
+    if (rank < 2):
+        raise ValueError("Control points must not lie on a line.")
+
+    residuals = linReal - (offsets + (scenePosArr - origin) @ matLinT)
+
+    # axis directions: columns of the inverse linear map (lines of constant value of the other axis)
+    invMatLin = numpy.linalg.inv(matLinT.T)
+    directions = numpy.zeros((2, 2))
+    scales = numpy.zeros(2)
+    for axis in range(2):
+        (lenAxis, directions[axis]) = calcLenEvec(invMatLin[:, axis])
+        scales[axis] = 1.0 / lenAxis
+
+    return DDAxesCalibration((origin, origin), directions, offsets, scales, (logX, logY),
+                             (residuals[:, 0], residuals[:, 1]), isOblique=True)
+
+
+def fitCalibrationPoints(dictCalibrationPoints, logX, logY):
+    """Axes calibration from calibration points: Reference points per axis or control points.
+
+    Parameters
+    ----------
+    dictCalibrationPoints : dict
+        Either { POINTS_X : (scene coordinates, real values), POINTS_Y : (...) } with reference points per axis or
+        { POINTS_XY : (scene coordinates, real coordinates) } with control points.
+    logX, logY : bool
+        Logarithmic scale flags.
+
+    Returns
+    -------
+    out : DDAxesCalibration
+        Axes calibration including residuals.
+    """
+
+    if (CALIBRATION_POINTS.POINTS_XY in dictCalibrationPoints):
+        (scenePosArr, realCoordsArr) = dictCalibrationPoints[CALIBRATION_POINTS.POINTS_XY]
+        return fitAxesControlPoints(scenePosArr, realCoordsArr, logX, logY)
+
+    (xScenePosArr, xRealArr) = dictCalibrationPoints[CALIBRATION_POINTS.POINTS_X]
+    (yScenePosArr, yRealArr) = dictCalibrationPoints[CALIBRATION_POINTS.POINTS_Y]
+
+    return fitAxesReferencePoints(xScenePosArr, xRealArr, yScenePosArr, yRealArr, logX, logY)
+
+
+def buildCalibrationFromProjectDict(dumpDict):
+    """Axes calibration from the content of a project file.
+
+    Parameters
+    ----------
+    dumpDict : dict
+        Project file content, see :func:`loadProjectDict`.
+
+    Returns
+    -------
+    out : DDAxesCalibration
+        Axes calibration, None if the axes are not completely defined.
+    """
+
+    logX = (dumpDict["scaleX"] == SCALETYPE_AXES.AXIS_LOG_X)
+    logY = (dumpDict["scaleY"] == SCALETYPE_AXES.AXIS_LOG_Y)
+
+    # fitted calibration (optional)
+    dictCalibrationPoints = dumpDict.get("CalibrationPoints")
+    if not (dictCalibrationPoints is None):
+        return fitCalibrationPoints(dictCalibrationPoints, logX, logY)
+
+    dictAxesPointCoords = dumpDict["AxesPointItemsCoords"]
+
+    for axisPoint in (AXES_POINTS.AXIS_X0, AXES_POINTS.AXIS_X1, AXES_POINTS.AXIS_Y0, AXES_POINTS.AXIS_Y1):
+        if not (axisPoint in dictAxesPointCoords):
+            return None
+
+    if not (isAxisRealValid(dumpDict["x0"], dumpDict["x1"], logX) and
+            isAxisRealValid(dumpDict["y0"], dumpDict["y1"], logY)):
+        return None
+
+    return buildAxesCalibration(numpy.array(dictAxesPointCoords[AXES_POINTS.AXIS_X0]),
+                                numpy.array(dictAxesPointCoords[AXES_POINTS.AXIS_X1]),
+                                numpy.array(dictAxesPointCoords[AXES_POINTS.AXIS_Y0]),
+                                numpy.array(dictAxesPointCoords[AXES_POINTS.AXIS_Y1]),
+                                dumpDict["x0"], dumpDict["x1"], dumpDict["y0"], dumpDict["y1"], logX, logY)
+
+
+def loadProjectDict(filepath):
+    """Read the content of a project file (*.mydig) without a graphics scene.
+
+    Parameters
+    ----------
+    filepath : str
+        File path.
+
+    Returns
+    -------
+    out : dict
+        Project file content.
+    """
+
+    with open(filepath, "rb") as fp:
+        return pickle.load(fp)
+
+
+def determineProjectRealCoords(dumpDict):
+    """Real coordinates of all data points of a project, without a graphics scene.
+
+    Parameters
+    ----------
+    dumpDict : dict
+        Project file content, see :func:`loadProjectDict`.
+
+    Returns
+    -------
+    out : dict
+        Data dictionary { str1 : numpy-array1, ...}, empty if the axes are not completely defined.
+    """
+
+    dictRealCoords = {}
+
+    axesCalibration = buildCalibrationFromProjectDict(dumpDict)
+
+    if not (axesCalibration is None):
+
+        dictLinesOfDataPoints_coords = dumpDict["LinesOfDataPointsCoords"]
+
+        for nameSingleLine in dictLinesOfDataPoints_coords.keys():
+
+            scenePosArr = numpy.array(dictLinesOfDataPoints_coords[nameSingleLine], dtype=float).reshape(-1, 2)
+            dictRealCoords[nameSingleLine] = axesCalibration.calculateRealCoordinatesArr(scenePosArr)
+
+    return dictRealCoords
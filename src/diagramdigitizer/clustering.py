@@ -0,0 +1,196 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: clustering
+   :synopsis: Curve colors of multi-curve plots by clustering a color histogram (k-means).
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import math
+import numpy
+
+from . import extraction
+
+# Constants
+CLUSTER_HIST_BITS = 4  # bits per channel of the quantized color histogram (4096 bins of 16 levels)
+CLUSTER_MAX_SAMPLES = 2 ** 22  # pixels sampled (regular grid) for the histogram
+CLUSTER_MIN_CHROMA = 40  # channel spread below which pixels are gray (background, axes, grid, text)
+CLUSTER_ITERATIONS = 30  # maximum k-means iterations
+
+
+def calcColorHistogram(pixelArr, rect=None, minChroma=CLUSTER_MIN_CHROMA, bits=CLUSTER_HIST_BITS,
+                       maxSamples=CLUSTER_MAX_SAMPLES):
+    """Histogram of the colored pixels, quantized and downsampled.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped, only the sampled pixels are read).
+    rect : tuple
+        (left, top, right, bottom) in image pixels, e.g. the plot area (None: whole image).
+    minChroma : int
+        Minimum difference of the largest and smallest channel of a pixel counted (0: all pixels).
+    bits : int
+        Bits per channel of the histogram bins.
+    maxSamples : int
+        Maximum number of pixels sampled, on a regular grid.
+
+    Returns
+    -------
+    out : tuple
+        (pixel counts, shape (n, n, n), mean colors of the bins, shape (n, n, n, 3)), n = 2 ** bits.
+    """
+
+    numBins = 2 ** bits
+    countArr = numpy.zeros(numBins ** 3)
+    sumsArr = numpy.zeros((numBins ** 3, 3))
+    (col0, row0, col1, row1) = extraction.calcPixelRect(rect, pixelArr.shape[1], pixelArr.shape[0])
+
+    if (col1 > col0) and (row1 > row0):
+        stride = max(1, math.ceil(math.sqrt((col1 - col0) * (row1 - row0) / maxSamples)))
+        rgbArr = numpy.asarray(pixelArr[row0:row1:stride, col0:col1:stride, :3]).reshape(-1, 3)
+        rgbArr = rgbArr[rgbArr.max(axis=1) - rgbArr.min(axis=1) >= minChroma]
+
+        shift = 8 - bits
+        binArr = (((rgbArr[:, 0] >> shift).astype(numpy.intp) << (2 * bits)) |
+                  ((rgbArr[:, 1] >> shift).astype(numpy.intp) << bits) | (rgbArr[:, 2] >> shift))
+
+        countArr = numpy.bincount(binArr, minlength=numBins ** 3).astype(float)
+        sumsArr = numpy.column_stack([numpy.bincount(binArr, weights=rgbArr[:, ii], minlength=numBins ** 3)
+                                      for ii in range(3)])
+
+    meanArr = sumsArr / numpy.maximum(countArr, 1.0)[:, numpy.newaxis]
+
+    return (countArr.reshape((numBins,) * 3), meanArr.reshape((numBins,) * 3 + (3,)))
+
+
+def findColorPeaks(countArr, meanArr, numPeaks, minDistance):
+    """Dominant colors: local maxima of the histogram smoothed over neighboring bins, at least minDistance apart.
+
+    Parameters
+    ----------
+    countArr : numpy-array
+        Pixel counts, shape (n, n, n).
+    meanArr : numpy-array
+        Mean colors of the bins, shape (n, n, n, 3).
+    numPeaks : int
+        Maximum number of peaks.
+    minDistance : float
+        Minimum RGB distance of the peak colors; of closer peaks the higher one is kept.
+
+    Returns
+    -------
+    out : numpy-array
+        Mean colors of the peak bins, shape (K, 3), K <= numPeaks, by descending smoothed count.
+    """
+
+    numBins = countArr.shape[0]
+
+    # 3x3x3 box sums and maxima (neighborhoods of the bins)
+    paddedArr = numpy.pad(countArr, 1)
+    smoothArr = numpy.zeros(countArr.shape)
+    for (di, dj, dk) in numpy.ndindex(3, 3, 3):
+        smoothArr += paddedArr[di:di + numBins, dj:dj + numBins, dk:dk + numBins]
+
+    paddedArr = numpy.pad(smoothArr, 1)
+    isPeakArr = countArr > 0
+    for (di, dj, dk) in numpy.ndindex(3, 3, 3):
+        isPeakArr &= smoothArr >= paddedArr[di:di + numBins, dj:dj + numBins, dk:dk + numBins]
+
+    orderArr = numpy.argsort(-smoothArr[isPeakArr], kind='stable')
+    candidateArr = meanArr[isPeakArr][orderArr]
+
+    peakList = []
+    for color in candidateArr:
+        if all(numpy.sum((color - peak) ** 2) >= minDistance ** 2 for peak in peakList):
+            peakList.append(color)
+            if (len(peakList) == numPeaks):
+                break
+
+    return numpy.array(peakList).reshape(-1, 3)
+
+
+def clusterColors(colorArr, weightArr, centerArr, radius, numIterations=CLUSTER_ITERATIONS):
+    """Weighted k-means of colors, colors farther than radius from all centers are ignored (trimmed: light
+    anti-aliasing tints do not pull the curve colors).
+
+    Parameters
+    ----------
+    colorArr : numpy-array
+        Colors, shape (M, 3).
+    weightArr : numpy-array
+        Weights (pixel counts), shape (M,).
+    centerArr : numpy-array
+        Initial centers, shape (K, 3).
+    radius : float
+        Maximum RGB distance of a color to its center.
+    numIterations : int
+        Maximum iterations.
+
+    Returns
+    -------
+    out : tuple
+        (centers, shape (K, 3), weights, shape (K,)).
+    """
+
+    colorArr = numpy.asarray(colorArr, dtype=float).reshape(-1, 3)
+    weightArr = numpy.asarray(weightArr, dtype=float)
+    centerArr = numpy.asarray(centerArr, dtype=float).reshape(-1, 3)
+    numCenters = len(centerArr)
+
+    if (numCenters == 0) or (len(colorArr) == 0):
+        return (centerArr, numpy.zeros(numCenters))
+
+    for _ in range(numIterations + 1):
+        distArr = ((colorArr[:, numpy.newaxis, :] - centerArr[numpy.newaxis]) ** 2).sum(axis=2)
+        labelArr = numpy.argmin(distArr, axis=1)
+        isMemberArr = distArr[numpy.arange(len(colorArr)), labelArr] <= radius ** 2
+        memberWeightArr = numpy.where(isMemberArr, weightArr, 0.0)
+
+        clusterWeightArr = numpy.bincount(labelArr, weights=memberWeightArr, minlength=numCenters)
+        sumsArr = numpy.column_stack([numpy.bincount(labelArr, weights=memberWeightArr * colorArr[:, ii],
+                                                     minlength=numCenters) for ii in range(3)])
+        newCenterArr = numpy.where(clusterWeightArr[:, numpy.newaxis] > 0.0,
+                                   sumsArr / numpy.maximum(clusterWeightArr, 1e-12)[:, numpy.newaxis], centerArr)
+
+        if numpy.allclose(newCenterArr, centerArr):
+            break
+        centerArr = newCenterArr
+
+    return (centerArr, clusterWeightArr)
+
+
+def proposeCurveColors(pixelArr, numCurves, rect=None, minChroma=CLUSTER_MIN_CHROMA,
+                       tolerance=extraction.EXTRACT_COLOR_TOLERANCE):
+    """Colors of the curves of a multi-curve plot: the dominant colors of the colored pixels (histogram peaks,
+    refined by k-means).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped).
+    numCurves : int
+        Number of curves.
+    rect : tuple
+        (left, top, right, bottom) in image pixels, e.g. the plot area (None: whole image).
+    minChroma : int
+        Minimum channel spread of curve pixels, see :func:`calcColorHistogram`.
+    tolerance : float
+        RGB distance of curve pixels to their color; peaks are at least this far apart.
+
+    Returns
+    -------
+    out : list
+        (r, g, b) per curve, most frequent first; fewer if the image has fewer colors.
+    """
+
+    (countArr, meanArr) = calcColorHistogram(pixelArr, rect, minChroma)
+    peakArr = findColorPeaks(countArr, meanArr, numCurves, tolerance)
+
+    isOccupiedArr = countArr > 0
+    (centerArr, weightArr) = clusterColors(meanArr[isOccupiedArr], countArr[isOccupiedArr], peakArr, tolerance)
+    orderArr = numpy.argsort(-weightArr, kind='stable')
+
+    return [tuple(int(val) for val in numpy.round(center)) for center in centerArr[orderArr]]
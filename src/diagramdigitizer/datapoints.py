@@ -0,0 +1,516 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: datapoints
+   :synopsis: Array storage of data points.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import numpy
+
+# Constants
+INITIAL_CAPACITY = 64
+
+GRID_CELL_SIZE = 32.0  # scene units
+GRID_MAX_PENDING = 16384  # points added after the last index build, searched linearly
+GRID_KEY_OFFSET = 2 ** 24
+GRID_KEY_FACTOR = 2 ** 25
+
+# Unique point ids across all data sets, increasing with insertion
+_nextPointId = 0
+
+
+def newPointIds(numPoints):
+    """New unique point ids.
+
+    Parameters
+    ----------
+    numPoints : int
+        Number of ids.
+
+    Returns
+    -------
+    out : numpy-array
+        Increasing point ids, shape (numPoints,).
+    """
+
+    global _nextPointId
+
+    pointIds = numpy.arange(_nextPointId, _nextPointId + numPoints, dtype=numpy.int64)
+    _nextPointId = _nextPointId + numPoints
+
+    return pointIds
+
+
+def calcGridKeys(cellX, cellY):
+
+    return (cellX + GRID_KEY_OFFSET) * GRID_KEY_FACTOR + (cellY + GRID_KEY_OFFSET)
+
+
+def decimateToGrid(coordsArr, cellSize):
+    """Decimation of points to one point per occupied grid cell.
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates, shape (N, 2).
+    cellSize : float
+        Size of the grid cells.
+
+    Returns
+    -------
+    out : numpy-array
+        Increasing indices of the first point in every occupied cell.
+    """
+
+    if (len(coordsArr) == 0):
+        return numpy.zeros(0, dtype=numpy.int64)
+
+    cellsArr = numpy.floor(coordsArr / cellSize).astype(numpy.int64)
+    (_, indFirst) = numpy.unique(calcGridKeys(cellsArr[:, 0], cellsArr[:, 1]), return_index=True)
+
+    return numpy.sort(indFirst)
+
+
+def selectPointsInPolygon(coordsArr, polygonArr):
+    """Mask of points inside a polygon (even-odd rule).
+
+    The points are sorted by y, so the points crossed by a horizontal ray through an edge are a contiguous range.
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates, shape (N, 2).
+    polygonArr : numpy-array
+        Vertices of the (implicitly closed) polygon, shape (M, 2).
+
+    Returns
+    -------
+    out : numpy-array
+        Boolean mask, shape (N,).
+    """
+
+    coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+    polygonArr = numpy.asarray(polygonArr, dtype=float).reshape(-1, 2)
+    isInside = numpy.zeros(len(coordsArr), dtype=bool)
+
+    if (len(coordsArr) == 0) or (len(polygonArr) < 3):
+        return isInside
+
+    order = numpy.argsort(coordsArr[:, 1], kind='stable')
+    (xSorted, ySorted) = (coordsArr[order, 0], coordsArr[order, 1])
+    isInsideSorted = numpy.zeros(len(coordsArr), dtype=bool)
+
+    for ((x0, y0), (x1, y1)) in zip(polygonArr.tolist(), numpy.roll(polygonArr, 1, axis=0).tolist()):
+        if (y0 == y1):
+            continue
+
+        # points with min(y0, y1) <= y < max(y0, y1)
+        i0 = numpy.searchsorted(ySorted, min(y0, y1), side='left')
+        i1 = numpy.searchsorted(ySorted, max(y0, y1), side='left')
+
+        xCross = x0 + (ySorted[i0:i1] - y0) * (x1 - x0) / (y1 - y0)
+        isInsideSorted[i0:i1] ^= (xSorted[i0:i1] < xCross)
+
+    isInside[order] = isInsideSorted
+
+    return isInside
+
+
+class DDGridIndex:
+    """Spatial index of points on a uniform grid.
+
+    The cell keys of the indexed points are kept sorted, so the points of a cell range are found by binary search.
+    Points appended after the last build are searched linearly until their number exceeds GRID_MAX_PENDING, then
+    the index is rebuilt. Removed points are filtered by the caller.
+
+    Parameters
+    ----------
+    cellSize : float
+        Size of the grid cells.
+    """
+
+    def __init__(self, cellSize=GRID_CELL_SIZE):
+
+        self.__cellSize = cellSize
+        self.invalidate()
+
+    def invalidate(self):
+
+        self.__sortedKeys = numpy.zeros(0, dtype=numpy.int64)
+        self.__sortedSlots = numpy.zeros(0, dtype=numpy.int64)
+        self.__numIndexed = 0
+        self.__isValid = False
+
+    def build(self, coordsArr):
+
+        cellsArr = numpy.floor(coordsArr / self.__cellSize).astype(numpy.int64)
+        keys = calcGridKeys(cellsArr[:, 0], cellsArr[:, 1])
+        order = numpy.argsort(keys, kind='stable')
+
+        self.__sortedKeys = keys[order]
+        self.__sortedSlots = order
+        self.__numIndexed = len(coordsArr)
+        self.__isValid = True
+
+    def querySlots(self, coordsArr, x, y, radius):
+        """Candidate slots within the grid cells covering a circle.
+
+        Parameters
+        ----------
+        coordsArr : numpy-array
+            Coordinates of all slots, shape (N, 2). Slots are only appended between builds.
+        x, y : float
+            Center of the circle.
+        radius : float
+            Radius of the circle.
+
+        Returns
+        -------
+        out : numpy-array
+            Candidate slots (superset of the slots within the circle).
+        """
+
+        if (not self.__isValid) or (len(coordsArr) - self.__numIndexed > GRID_MAX_PENDING):
+            self.build(coordsArr)
+
+        (cellX0, cellY0) = (int(numpy.floor((x - radius) / self.__cellSize)),
+                            int(numpy.floor((y - radius) / self.__cellSize)))
+        (cellX1, cellY1) = (int(numpy.floor((x + radius) / self.__cellSize)),
+                            int(numpy.floor((y + radius) / self.__cellSize)))
+
+        # one contiguous key range per grid column
+        cellXArr = numpy.arange(cellX0, cellX1 + 1, dtype=numpy.int64)
+        indStart = numpy.searchsorted(self.__sortedKeys, calcGridKeys(cellXArr, cellY0), side='left')
+        indEnd = numpy.searchsorted(self.__sortedKeys, calcGridKeys(cellXArr, cellY1), side='right')
+
+        slotsList = [self.__sortedSlots[i0:i1] for (i0, i1) in zip(indStart, indEnd) if (i1 > i0)]
+
+        # points appended after last build
+        slotsList.append(numpy.arange(self.__numIndexed, len(coordsArr), dtype=numpy.int64))
+
+        return numpy.concatenate(slotsList)
+
+
+class DDDataPointArray:
+    """Data points of a data set in scene coordinates, stored in one growing array.
+
+    Every point has a unique id. Points are stored in slots in insertion order, so the ids of the slots are
+    increasing. A point is removed in O(1) by marking its slot as empty. Empty slots are dropped by a compaction
+    that keeps the order of the points, once they make up more than half of the slots (amortized O(1)).
+    A point id is located by binary search on the increasing ids. Nearest-point queries use a grid index, which is
+    extended by appended points and rebuilt after compaction.
+    """
+
+    def __init__(self):
+
+        self.__gridIndex = DDGridIndex()
+
+        self.__coords = numpy.zeros((INITIAL_CAPACITY, 2))
+        self.__ids = numpy.zeros(INITIAL_CAPACITY, dtype=numpy.int64)
+        self.__valid = numpy.zeros(INITIAL_CAPACITY, dtype=bool)
+        self.__count = 0  # used slots
+        self.__numValid = 0  # points
+
+    def __len__(self):
+
+        return self.__numValid
+
+    def reserve(self, capacity):
+
+        if (capacity > len(self.__coords)):
+            capacityNew = max(capacity, 2 * len(self.__coords))
+
+            coordsNew = numpy.zeros((capacityNew, 2))
+            coordsNew[:self.__count] = self.__coords[:self.__count]
+            idsNew = numpy.zeros(capacityNew, dtype=numpy.int64)
+            idsNew[:self.__count] = self.__ids[:self.__count]
+            validNew = numpy.zeros(capacityNew, dtype=bool)
+            validNew[:self.__count] = self.__valid[:self.__count]
+
+            (self.__coords, self.__ids, self.__valid) = (coordsNew, idsNew, validNew)
+
+    def compact(self):
+
+        if (self.__numValid < self.__count):
+            mask = self.__valid[:self.__count]
+
+            self.__coords[:self.__numValid] = self.__coords[:self.__count][mask]
+            self.__ids[:self.__numValid] = self.__ids[:self.__count][mask]
+            self.__valid[:self.__numValid] = True
+            self.__valid[self.__numValid:self.__count] = False
+            self.__count = self.__numValid
+
+            self.__gridIndex.invalidate()
+
+    def getCoords(self):
+        """Coordinates of all points in insertion order.
+
+        Returns
+        -------
+        out : numpy-array
+            Coordinates, shape (N, 2). The array is read-only.
+        """
+
+        if (self.__numValid < self.__count):
+            coordsArr = self.__coords[:self.__count][self.__valid[:self.__count]]
+        else:
+            coordsArr = self.__coords[:self.__count]
+
+        coordsArr.flags.writeable = False
+
+        return coordsArr
+
+    def getPointIds(self):
+        """Ids of all points in insertion order.
+
+        Returns
+        -------
+        out : numpy-array
+            Point ids, shape (N,). The array is read-only.
+        """
+
+        if (self.__numValid < self.__count):
+            idsArr = self.__ids[:self.__count][self.__valid[:self.__count]]
+        else:
+            idsArr = self.__ids[:self.__count]
+
+        idsArr.flags.writeable = False
+
+        return idsArr
+
+    def setCoords(self, coordsArr, pointIds=None):
+
+        coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+        numPoints = len(coordsArr)
+
+        if (pointIds is None):
+            pointIds = newPointIds(numPoints)
+
+        capacity = max(INITIAL_CAPACITY, numPoints)
+        self.__coords = numpy.zeros((capacity, 2))
+        self.__coords[:numPoints] = coordsArr
+        self.__ids = numpy.zeros(capacity, dtype=numpy.int64)
+        self.__ids[:numPoints] = pointIds
+        self.__valid = numpy.zeros(capacity, dtype=bool)
+        self.__valid[:numPoints] = True
+        self.__count = numPoints
+        self.__numValid = numPoints
+
+        self.__gridIndex.invalidate()
+
+    def addPoint(self, x, y):
+
+        pointId = int(newPointIds(1)[0])
+
+        self.reserve(self.__count + 1)
+
+        self.__coords[self.__count] = (x, y)
+        self.__ids[self.__count] = pointId
+        self.__valid[self.__count] = True
+        self.__count = self.__count + 1
+        self.__numValid = self.__numValid + 1
+
+        return pointId
+
+    def addPoints(self, coordsArr):
+
+        coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+        numPoints = len(coordsArr)
+        pointIds = newPointIds(numPoints)
+
+        self.reserve(self.__count + numPoints)
+
+        self.__coords[self.__count:self.__count + numPoints] = coordsArr
+        self.__ids[self.__count:self.__count + numPoints] = pointIds
+        self.__valid[self.__count:self.__count + numPoints] = True
+        self.__count = self.__count + numPoints
+        self.__numValid = self.__numValid + numPoints
+
+        return pointIds
+
+    def restorePoints(self, coordsArr, pointIds):
+        """Restore points with their former ids, e.g. to undo a removal.
+
+        Slots of removed points are reused if they have not been compacted yet, otherwise the points are inserted
+        at the position given by their ids.
+
+        Parameters
+        ----------
+        coordsArr : numpy-array
+            Coordinates, shape (N, 2).
+        pointIds : numpy-array
+            Ids of the points, not contained in the array.
+        """
+
+        coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+        pointIds = numpy.asarray(pointIds, dtype=numpy.int64).reshape(-1)
+
+        # empty slots of the points
+        slots = numpy.searchsorted(self.__ids[:self.__count], pointIds)
+        slots[slots >= self.__count] = 0
+        isEmptySlot = (self.__count > 0) & (self.__ids[slots] == pointIds) & ~self.__valid[slots]
+
+        if numpy.any(isEmptySlot):
+            slotsEmpty = slots[isEmptySlot]
+            if not numpy.array_equal(self.__coords[slotsEmpty], coordsArr[isEmptySlot]):
+                self.__gridIndex.invalidate()
+
+            self.__coords[slotsEmpty] = coordsArr[isEmptySlot]
+            self.__valid[slotsEmpty] = True
+            self.__numValid = self.__numValid + len(slotsEmpty)
+
+            (coordsArr, pointIds) = (coordsArr[~isEmptySlot], pointIds[~isEmptySlot])
+
+        if (len(pointIds) == 0):
+            return
+
+        order = numpy.argsort(pointIds)
+        (coordsArr, pointIds) = (coordsArr[order], pointIds[order])
+
+        if (self.__count == 0) or (pointIds[0] > self.__ids[self.__count - 1]):
+            # append
+            numPoints = len(pointIds)
+            self.reserve(self.__count + numPoints)
+
+            self.__coords[self.__count:self.__count + numPoints] = coordsArr
+            self.__ids[self.__count:self.__count + numPoints] = pointIds
+            self.__valid[self.__count:self.__count + numPoints] = True
+            self.__count = self.__count + numPoints
+            self.__numValid = self.__numValid + numPoints
+        else:
+            # merge by id
+            idsAll = numpy.concatenate((self.getPointIds(), pointIds))
+            coordsAll = numpy.concatenate((self.getCoords(), coordsArr))
+            order = numpy.argsort(idsAll, kind='stable')
+            self.setCoords(coordsAll[order], idsAll[order])
+
+    def findSlots(self, pointIds):
+        """Slots of points.
+
+        Parameters
+        ----------
+        pointIds : numpy-array
+            Point ids.
+
+        Returns
+        -------
+        out : numpy-array
+            Slots, -1 for ids that are not contained.
+        """
+
+        pointIds = numpy.asarray(pointIds, dtype=numpy.int64).reshape(-1)
+
+        slots = numpy.searchsorted(self.__ids[:self.__count], pointIds)
+        slots[slots >= self.__count] = 0
+        isFound = (self.__count > 0) & (self.__ids[slots] == pointIds) & self.__valid[slots]
+
+        return numpy.where(isFound, slots, -1)
+
+    def getPointsCoords(self, pointIds):
+        """Coordinates of points.
+
+        Parameters
+        ----------
+        pointIds : numpy-array
+            Ids of contained points.
+
+        Returns
+        -------
+        out : numpy-array
+            Coordinates, shape (N, 2).
+        """
+
+        slots = self.findSlots(pointIds)
+
+        return self.__coords[slots[slots >= 0]]
+
+    def setPointsCoords(self, pointIds, coordsArr):
+
+        slots = self.findSlots(pointIds)
+        isFound = (slots >= 0)
+
+        self.__coords[slots[isFound]] = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)[isFound]
+        self.__gridIndex.invalidate()
+
+    def findPointsInPolygon(self, polygonArr):
+        """Points inside a polygon.
+
+        Parameters
+        ----------
+        polygonArr : numpy-array
+            Vertices of the polygon, shape (M, 2).
+
+        Returns
+        -------
+        out : numpy-array
+            Increasing ids of the points inside.
+        """
+
+        return self.getPointIds()[selectPointsInPolygon(self.getCoords(), polygonArr)]
+
+    def containsPoint(self, pointId):
+
+        return bool(self.findSlots([pointId])[0] >= 0)
+
+    def getSlotCoords(self, slot):
+
+        return (float(self.__coords[slot, 0]), float(self.__coords[slot, 1]))
+
+    def getSlotPointId(self, slot):
+
+        return int(self.__ids[slot])
+
+    def removeSlots(self, slots):
+
+        slots = numpy.asarray(slots, dtype=numpy.int64).reshape(-1)
+        slots = numpy.unique(slots[(slots >= 0) & (slots < self.__count)])
+        slots = slots[self.__valid[slots]]
+
+        self.__valid[slots] = False
+        self.__numValid = self.__numValid - len(slots)
+
+        # Compaction if more than half of the slots are empty
+        if (self.__count - self.__numValid > max(INITIAL_CAPACITY, self.__numValid)):
+            self.compact()
+
+    def removePoints(self, pointIds):
+
+        slots = self.findSlots(pointIds)
+        self.removeSlots(slots[slots >= 0])
+
+    def findPoint(self, x, y, radius):
+        """Nearest point within a radius.
+
+        Parameters
+        ----------
+        x, y : float
+            Scene coordinates of the search position.
+        radius : float
+            Search radius.
+
+        Returns
+        -------
+        out : int
+            Slot of the nearest point, None if no point is within the radius.
+        """
+
+        if (self.__numValid == 0):
+            return None
+
+        coordsView = self.__coords[:self.__count]
+        slots = self.__gridIndex.querySlots(coordsView, x, y, radius)
+        slots = slots[self.__valid[slots]]
+
+        if (len(slots) == 0):
+            return None
+
+        dist2 = (coordsView[slots, 0] - x) ** 2 + (coordsView[slots, 1] - y) ** 2
+        indMin = int(numpy.argmin(dist2))
+
+        if (dist2[indMin] <= radius ** 2):
+            return int(slots[indMin])
+
+        return None
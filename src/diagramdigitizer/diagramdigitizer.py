@@ -15,7 +15,15 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 from . import ui
 from . import graphscene
+from . import calibration
 from . import export
+from . import extraction
+from . import imagecache
+from . import loader
+from . import matching
+from . import pageselector
+from . import preprocessing
+from . import background
 from . import utils
 
 
@@ -50,6 +58,7 @@ class DDMainWindow(QtWidgets.QMainWindow):
         self.initAxesScaleTypes()
         self.initRadioButtonsExport()
         self.initZoom()
+        self.initToolBar()
 
         # Organize axis buttons / edits
         self.__dictAxisButtonsOPERATION_MODES = {
@@ -70,6 +79,13 @@ class DDMainWindow(QtWidgets.QMainWindow):
         # Init data set count
         self.__countDataSet = 0
 
+        # Worker thread of running load, cache of decoded images
+        self.__loaderThread = None
+        self.__imageCache = imagecache.DDImageCache()
+
+        # Number of significant digits of mouse coordinates
+        self.__coordPrecision = utils.COORD_PRECISION
+
         # Menu page at start
         self.showPageMenu()
 
@@ -121,6 +137,39 @@ class DDMainWindow(QtWidgets.QMainWindow):
         # Zoom
         self.ui.sliderZoom.valueChanged.connect(self.zoomGraphicsView)
 
+        # Tools
+        self.actionLoadOverlay.triggered.connect(self.loadOverlay)
+        self.actionClearOverlay.triggered.connect(self.clearOverlay)
+        self.actionDetectAxes.triggered.connect(self.detectAxes)
+        self.actionPickReferencePointsX.triggered.connect(
+            partial(self.pickCalibrationPoints, calibration.CALIBRATION_POINTS.POINTS_X))
+        self.actionPickReferencePointsY.triggered.connect(
+            partial(self.pickCalibrationPoints, calibration.CALIBRATION_POINTS.POINTS_Y))
+        self.actionPickControlPoints.triggered.connect(
+            partial(self.pickCalibrationPoints, calibration.CALIBRATION_POINTS.POINTS_XY))
+        self.__graphicsScene.calibrationPointPickedSignal.connect(self.addCalibrationPoint)
+        self.actionFitCalibrationPoints.triggered.connect(self.fitCalibrationPoints)
+        self.actionClearCalibrationPoints.triggered.connect(self.clearCalibrationPoints)
+        self.actionUndo.triggered.connect(self.__graphicsScene.undo)
+        self.actionRedo.triggered.connect(self.__graphicsScene.redo)
+        self.__graphicsScene.dataSetsChangedSignal.connect(self.updateDataSetsFromScene)
+        self.actionSelectRect.triggered.connect(
+            partial(self.selectDataPoints, self.__graphicsScene.SELECTION_SHAPES.SEL_RECT))
+        self.actionSelectLasso.triggered.connect(
+            partial(self.selectDataPoints, self.__graphicsScene.SELECTION_SHAPES.SEL_LASSO))
+        self.actionDeleteSelected.triggered.connect(self.__graphicsScene.removeSelectedDataPoints)
+        self.actionTranslateSelected.triggered.connect(self.translateSelectedDataPoints)
+        self.actionExtractByColor.triggered.connect(self.pickExtractionColor)
+        self.__graphicsScene.colorPickedSignal.connect(self.extractDataPointsByColor)
+        self.actionExtractByColorClusters.triggered.connect(self.extractDataPointsByColorClusters)
+        self.actionTraceCurve.triggered.connect(self.pickTraceSeed)
+        self.__graphicsScene.seedPickedSignal.connect(self.traceDataPointsFromSeed)
+        self.actionDetectMarkers.triggered.connect(self.pickMarkerTemplate)
+        self.__graphicsScene.markerBoxedSignal.connect(self.detectMarkers)
+        for (step, action) in self.__dictPreprocessingActions.items():
+            action.triggered.connect(partial(self.togglePreprocessingStep, step))
+        self.actionMoveSelectedToDataSet.triggered.connect(self.moveSelectedDataPointsToDataSet)
+
     def initAxesScaleTypes(self):
 
         # Init axes scaletypes to linear
@@ -145,6 +194,49 @@ class DDMainWindow(QtWidgets.QMainWindow):
 
         self.ui.labelZoomFactor.setText(str(100) + " %")
 
+    def initToolBar(self):
+
+        self.toolBarTools = self.addToolBar("Tools")
+
+        self.actionLoadOverlay = self.toolBarTools.addAction("Overlay reference data")
+        self.actionClearOverlay = self.toolBarTools.addAction("Clear overlay")
+        self.toolBarTools.addSeparator()
+        self.actionDetectAxes = self.toolBarTools.addAction("Detect axes")
+        self.actionPickReferencePointsX = self.toolBarTools.addAction("Pick x axis reference points")
+        self.actionPickReferencePointsY = self.toolBarTools.addAction("Pick y axis reference points")
+        self.actionPickControlPoints = self.toolBarTools.addAction("Pick control points")
+        self.actionFitCalibrationPoints = self.toolBarTools.addAction("Fit axes to calibration points")
+        self.actionClearCalibrationPoints = self.toolBarTools.addAction("Clear calibration points")
+        self.toolBarTools.addSeparator()
+        self.actionUndo = self.toolBarTools.addAction("Undo")
+        self.actionUndo.setShortcut(QtGui.QKeySequence.Undo)
+        self.actionRedo = self.toolBarTools.addAction("Redo")
+        self.actionRedo.setShortcut(QtGui.QKeySequence.Redo)
+        self.toolBarTools.addSeparator()
+        self.actionSelectRect = self.toolBarTools.addAction("Select points (rectangle)")
+        self.actionSelectLasso = self.toolBarTools.addAction("Select points (lasso)")
+        self.actionDeleteSelected = self.toolBarTools.addAction("Delete selected points")
+        self.actionDeleteSelected.setShortcut(QtGui.QKeySequence.Delete)
+        self.actionTranslateSelected = self.toolBarTools.addAction("Move selected points")
+        self.actionMoveSelectedToDataSet = self.toolBarTools.addAction("Move selected points to data set")
+        self.toolBarTools.addSeparator()
+        self.actionExtractByColor = self.toolBarTools.addAction("Extract curve by color")
+        self.actionExtractByColorClusters = self.toolBarTools.addAction("Extract curves by color clusters")
+        self.actionTraceCurve = self.toolBarTools.addAction("Trace curve from point")
+        self.actionDetectMarkers = self.toolBarTools.addAction("Detect markers like boxed one")
+
+        # Preprocessing of the background image, steps switched on/off
+        self.toolBarImage = self.addToolBar("Image")
+
+        self.__dictPreprocessingActions = {}
+        for (step, text) in ((preprocessing.PREPROCESSING_STEPS.DESKEW, "Deskew"),
+                             (preprocessing.PREPROCESSING_STEPS.GRAYSCALE, "Grayscale"),
+                             (preprocessing.PREPROCESSING_STEPS.CONTRAST, "Stretch contrast"),
+                             (preprocessing.PREPROCESSING_STEPS.BINARIZE, "Binarize")):
+            action = self.toolBarImage.addAction(text)
+            action.setCheckable(True)
+            self.__dictPreprocessingActions[step] = action
+
     @QtCore.pyqtSlot()
     def showPageMenu(self):
 
@@ -206,19 +298,21 @@ class DDMainWindow(QtWidgets.QMainWindow):
     @QtCore.pyqtSlot()
     def newProject(self):
         fileName = QtWidgets.QFileDialog.getOpenFileName(self, 'Open an image file to be digitized',
-                                                         filter='Images (*.png *.jpg *.jpeg *.bmp)')
+                                                         filter='Images (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)')
 
         if (fileName and (len(fileName[0]) > 0)):
-            try:
+            page = 0
 
-                self.__graphicsScene.newScene(fileName[0])
-                self.updateAxesLineEditsFromScene()
-                self.updateAxesScaleTypesFromScene()
-                self.updateDataSetListFromScene()
-                self.initRadioButtonsExport()
+            # Multi-page images: one page is selected and decoded
+            numPages = background.countImagePages(fileName[0])
+            if (numPages > 1):
+                pageSelector = pageselector.DDPageSelectorDialog(fileName[0], numPages, self)
+                if (pageSelector.exec_() != QtWidgets.QDialog.Accepted):
+                    return
+                page = pageSelector.getPage()
 
-            except Exception as e:
-                print(str(e))
+            self.startLoading(loader.DDLoaderThread(imagePath=fileName[0], imageCache=self.__imageCache,
+                                                    imagePage=page))
 
     @QtCore.pyqtSlot()
     def saveProject(self):
@@ -235,16 +329,61 @@ class DDMainWindow(QtWidgets.QMainWindow):
 
         fileName = QtWidgets.QFileDialog.getOpenFileName(self, caption='Open a project from file', filter='*.mydig')
         if (fileName and (len(fileName[0]) > 0)):
-            try:
+            self.startLoading(loader.DDLoaderThread(projectPath=fileName[0], imageCache=self.__imageCache))
 
-                self.__graphicsScene.loadScene(fileName[0])
-                self.updateAxesLineEditsFromScene()
-                self.updateAxesScaleTypesFromScene()
-                self.updateDataSetListFromScene()
-                self.initRadioButtonsExport()
+    def startLoading(self, loaderThread):
 
-            except Exception as e:
-                print(str(e))
+        # one load at a time
+        if not (self.__loaderThread is None):
+            return
+
+        progressDialog = QtWidgets.QProgressDialog("Loading", "Cancel", 0, 100, self)
+        progressDialog.setWindowTitle("DiagramDigitizer")
+        progressDialog.setWindowModality(QtCore.Qt.WindowModal)
+        progressDialog.setMinimumDuration(0)
+        progressDialog.setAutoClose(False)
+        progressDialog.setAutoReset(False)
+
+        loaderThread.progressSignal.connect(progressDialog.setValue)
+        loaderThread.progressSignal.connect(lambda percent, text: progressDialog.setLabelText(text))
+        progressDialog.canceled.connect(loaderThread.requestInterruption)
+        loaderThread.finished.connect(partial(self.finishLoading, loaderThread, progressDialog))
+
+        self.__loaderThread = loaderThread
+        loaderThread.start()
+
+    @QtCore.pyqtSlot()
+    def finishLoading(self, loaderThread, progressDialog):
+
+        progressDialog.close()
+        self.__loaderThread = None
+
+        result = loaderThread.getResult()
+
+        if not (loaderThread.getError() is None):
+            print(loaderThread.getError())
+
+        # Scene is populated with complete data only
+        if (result is None) or loaderThread.isInterruptionRequested():
+            return
+
+        (dumpDict, image, pyramidArrs) = result
+
+        try:
+            if (dumpDict is None):
+                self.__graphicsScene.newScene(loaderThread.getImagePath(), image, pyramidArrs,
+                                              loaderThread.getImagePage())
+            else:
+                self.__graphicsScene.loadSceneFromDict(dumpDict, image, pyramidArrs)
+
+            self.updateAxesLineEditsFromScene()
+            self.updateAxesScaleTypesFromScene()
+            self.updateDataSetListFromScene()
+            self.updatePreprocessingFromScene()
+            self.initRadioButtonsExport()
+
+        except Exception as e:
+            print(str(e))
 
     def updateAxesLineEditsFromScene(self):
 
@@ -307,6 +446,23 @@ class DDMainWindow(QtWidgets.QMainWindow):
             self.ui.comboBoxDataSet.setCurrentIndex(ind)
             self.actDataSet()
 
+    @QtCore.pyqtSlot()
+    def updateDataSetsFromScene(self):
+
+        # keep current data set of the scene, without intermediate switching
+        nameCurrent = self.__graphicsScene.get_nameCurrentSingleLine()
+        nameList = utils.sortNameListWithTag(self.__graphicsScene.getNamesLinesOfDataPoints())
+
+        self.ui.comboBoxDataSet.blockSignals(True)
+        self.ui.comboBoxDataSet.clear()
+        self.ui.comboBoxDataSet.addItems(nameList)
+        self.ui.comboBoxDataSet.setCurrentIndex(nameList.index(nameCurrent) if (nameCurrent in nameList) else 0)
+        self.ui.comboBoxDataSet.blockSignals(False)
+
+        if (len(nameList) > 0):
+            self.__countDataSet = max(self.__countDataSet, int(nameList[-1][utils.DATASETTAGLEN:]))
+            self.actDataSet()
+
     @QtCore.pyqtSlot()
     def setAxisXScale(self):
 
@@ -432,11 +588,315 @@ class DDMainWindow(QtWidgets.QMainWindow):
             except Exception as e:
                 print(str(e))
 
-    @QtCore.pyqtSlot(str, str)
-    def updateMouseCoords(self, xStr, yStr):
+    @QtCore.pyqtSlot()
+    def loadOverlay(self):
+
+        fileName = QtWidgets.QFileDialog.getOpenFileName(self, caption='Open reference data to be overlaid',
+                                                         filter='Data (*.csv *.txt)')
+        if (fileName and (len(fileName[0]) > 0)):
+            try:
+                realCoordsArr = utils.readCoordsFromText(fileName[0])
+                self.__graphicsScene.setOverlayRealCoords(realCoordsArr)
+            except Exception as e:
+                print(str(e))
+
+    @QtCore.pyqtSlot()
+    def clearOverlay(self):
+
+        self.__graphicsScene.clearOverlay()
+
+    @QtCore.pyqtSlot()
+    def detectAxes(self):
+
+        if not self.__graphicsScene.getBackgroundStatus():
+            return
+
+        self.showPageAxes()
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            dictAxesPoints = self.__graphicsScene.detectAxesPoints()
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        if (dictAxesPoints is None):
+            QtWidgets.QMessageBox.information(self, 'Detect axes', 'No axis lines found.')
+            return
+
+        # proposal shown in place, kept or undone
+        self.__graphicsScene.setAxesPoints(dictAxesPoints)
+
+        answer = QtWidgets.QMessageBox.question(
+            self, 'Detect axes', 'Use the proposed axes reference points? Their real values are entered afterwards.')
+        if (answer != QtWidgets.QMessageBox.Yes):
+            self.__graphicsScene.undo()
+
+    @QtCore.pyqtSlot()
+    def pickCalibrationPoints(self, kind):
+
+        # each click on the image adds a calibration point of this kind, its real value is asked for then
+        if self.__graphicsScene.getBackgroundStatus():
+            self.showPageAxes()
+            self.__graphicsScene.startCalibrationPoints(kind)
+
+    @QtCore.pyqtSlot(float, float)
+    def addCalibrationPoint(self, x, y):
+
+        kind = self.__graphicsScene.getCalibrationPointKind()
+
+        if (kind == calibration.CALIBRATION_POINTS.POINTS_XY):
+            (text, ok) = QtWidgets.QInputDialog.getText(self, 'Control point', 'Real coordinates "x;y" of the point:')
+            if not ok:
+                return
+
+            try:
+                real = tuple(float(val) for val in text.split(";"))
+                if (len(real) != 2):
+                    raise ValueError("Two real coordinates \"x;y\" are required.")
+            except ValueError as e:
+                print(str(e))
+                return
+        else:
+            axisName = 'x' if (kind == calibration.CALIBRATION_POINTS.POINTS_X) else 'y'
+            (real, ok) = QtWidgets.QInputDialog.getDouble(
+                self, 'Reference point', 'Real ' + axisName + ' value of the point:', 0.0, -1e300, 1e300, 6)
+            if not ok:
+                return
+
+        self.__graphicsScene.addCalibrationPoint(x, y, real)
+
+    @QtCore.pyqtSlot()
+    def fitCalibrationPoints(self):
+
+        try:
+            (rmsX, rmsY) = self.__graphicsScene.fitPickedCalibrationPoints().getResidualsRms()
+            QtWidgets.QMessageBox.information(self, 'Calibration points', 'Residuals (RMS): x = ' + str(rmsX) +
+                                              ', y = ' + str(rmsY))
+        except ValueError as e:
+            QtWidgets.QMessageBox.information(self, 'Calibration points', str(e))
+
+    @QtCore.pyqtSlot()
+    def clearCalibrationPoints(self):
+
+        self.__graphicsScene.clearCalibrationPoints()
+
+    @QtCore.pyqtSlot()
+    def selectDataPoints(self, selectionShape):
+
+        # one rubber band selection (Ctrl: add to selection) in the current data set
+        self.showPageData()
+        self.__graphicsScene.setSelectionShape(selectionShape)
+        self.__graphicsScene.setOperationMode(self.__graphicsScene.OPERATION_MODES.OP_SELECT)
+
+    @QtCore.pyqtSlot()
+    def translateSelectedDataPoints(self):
+
+        if (len(self.__graphicsScene.getSelectedDataPointIds()) == 0):
+            return
+
+        (text, ok) = QtWidgets.QInputDialog.getText(self, 'Move selected points', 'Offset "dx;dy" in pixels:')
+        if not ok:
+            return
+
+        try:
+            (dx, dy) = [float(val) for val in text.split(";")]
+            self.__graphicsScene.translateSelectedDataPoints(dx, dy)
+        except ValueError as e:
+            print(str(e))
+
+    @QtCore.pyqtSlot()
+    def moveSelectedDataPointsToDataSet(self):
+
+        ind = self.ui.comboBoxDataSet.currentIndex()
+        singleLineName = self.ui.comboBoxDataSet.itemText(ind)
+
+        nameList = [self.ui.comboBoxDataSet.itemText(ii) for ii in range(self.ui.comboBoxDataSet.count())]
+        nameList.remove(singleLineName)
+
+        if ((len(self.__graphicsScene.getSelectedDataPointIds()) == 0) or (len(nameList) == 0)):
+            return
+
+        (targetName, ok) = QtWidgets.QInputDialog.getItem(self, 'Move selected points',
+                                                          'Target data set:', nameList, 0, False)
+        if ok:
+            self.__graphicsScene.moveSelectedDataPointsToLine(targetName)
+
+    @QtCore.pyqtSlot()
+    def pickExtractionColor(self):
+
+        # the next click on the image picks the curve color of the current data set
+        self.showPageData()
+        if not (self.__graphicsScene.get_nameCurrentSingleLine() is None):
+            self.__graphicsScene.setOperationMode(self.__graphicsScene.OPERATION_MODES.OP_PICK_COLOR)
+
+    @QtCore.pyqtSlot(int, int, int)
+    def extractDataPointsByColor(self, r, g, b):
+
+        # the pixels within the tolerance are previewed while it is changed (cached stages: only the mask is redone)
+        dialog = QtWidgets.QInputDialog(self)
+        dialog.setWindowTitle('Extract curve by color')
+        dialog.setLabelText('Tolerance (RGB distance) to color ({}, {}, {}):'.format(r, g, b))
+        dialog.setInputMode(QtWidgets.QInputDialog.DoubleInput)
+        dialog.setDoubleRange(0.0, 442.0)
+        dialog.setDoubleDecimals(1)
+        dialog.setDoubleValue(extraction.EXTRACT_COLOR_TOLERANCE)
+        dialog.doubleValueChanged.connect(lambda tolerance: self.__graphicsScene.previewColorMask((r, g, b), tolerance))
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            self.__graphicsScene.previewColorMask((r, g, b), dialog.doubleValue())
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        ok = (dialog.exec_() == QtWidgets.QDialog.Accepted)
+        self.__graphicsScene.clearColorMaskPreview()
+        if not ok:
+            return
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            self.__graphicsScene.extractDataPointsByColor((r, g, b), dialog.doubleValue())
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+    @QtCore.pyqtSlot()
+    def extractDataPointsByColorClusters(self):
+
+        if not self.__graphicsScene.getBackgroundStatus():
+            return
+
+        self.showPageData()
+
+        (numCurves, ok) = QtWidgets.QInputDialog.getInt(
+            self, 'Extract curves by color clusters', 'Number of curves:', 2, 1, 20)
+        if not ok:
+            return
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            colorList = self.__graphicsScene.proposeCurveColors(numCurves)
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        if (len(colorList) == 0):
+            QtWidgets.QMessageBox.information(self, 'Extract curves by color clusters', 'No colored curves found.')
+            return
+
+        # proposed colors confirmed, then one new data set per curve
+        colorText = '<br>'.join('<span style="color:#{0:02x}{1:02x}{2:02x}">&#9632;&#9632;&#9632;</span> '
+                                '({0}, {1}, {2})'.format(*color) for color in colorList)
+        answer = QtWidgets.QMessageBox.question(
+            self, 'Extract curves by color clusters', 'Extract the curves in these colors into new data sets?<br>' +
+            colorText)
+        if (answer != QtWidgets.QMessageBox.Yes):
+            return
+
+        nameList = []
+        for _ in colorList:
+            self.newDataSet()
+            nameList.append(self.__graphicsScene.get_nameCurrentSingleLine())
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            self.__graphicsScene.extractDataPointsByColors(colorList, nameList)
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+    @QtCore.pyqtSlot()
+    def pickTraceSeed(self):
+
+        # the next click on a curve starts tracing into the current data set
+        self.showPageData()
+        if not (self.__graphicsScene.get_nameCurrentSingleLine() is None):
+            self.__graphicsScene.setOperationMode(self.__graphicsScene.OPERATION_MODES.OP_TRACE)
+
+    @QtCore.pyqtSlot(float, float)
+    def traceDataPointsFromSeed(self, x, y):
+
+        (arcStep, ok) = QtWidgets.QInputDialog.getDouble(
+            self, 'Trace curve from point', 'Point spacing along the curve in pixels (0: one point per column):',
+            0.0, 0.0, 10000.0, 1)
+        if not ok:
+            return
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            self.__graphicsScene.traceDataPointsFromSeed(x, y, arcStep=(arcStep if (arcStep > 0.0) else None))
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+    @QtCore.pyqtSlot()
+    def pickMarkerTemplate(self):
+
+        # the next rectangle drawn on the image boxes the marker searched into the current data set
+        self.showPageData()
+        if not (self.__graphicsScene.get_nameCurrentSingleLine() is None):
+            self.__graphicsScene.setOperationMode(self.__graphicsScene.OPERATION_MODES.OP_MARKER)
+
+    @QtCore.pyqtSlot(float, float, float, float)
+    def detectMarkers(self, left, top, right, bottom):
+
+        (threshold, ok) = QtWidgets.QInputDialog.getDouble(
+            self, 'Detect markers', 'Minimum similarity to the boxed marker (correlation, 0..1):',
+            matching.MATCH_THRESHOLD, 0.0, 1.0, 2)
+        if not ok:
+            return
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            self.__graphicsScene.detectMarkers((left, top, right, bottom), threshold)
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+    @QtCore.pyqtSlot()
+    def togglePreprocessingStep(self, step, isChecked):
+
+        dictParams = self.__graphicsScene.getPreprocessing()
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            if not isChecked:
+                dictParams.pop(step, None)
+            elif (step == preprocessing.PREPROCESSING_STEPS.DESKEW):
+                dictParams[step] = self.__graphicsScene.estimateBackgroundSkew()
+            elif (step == preprocessing.PREPROCESSING_STEPS.GRAYSCALE):
+                dictParams[step] = True
+            elif (step == preprocessing.PREPROCESSING_STEPS.CONTRAST):
+                dictParams[step] = preprocessing.CONTRAST_CLIP_PERCENT
+            else:
+                dictParams[step] = None  # automatic threshold
+
+            self.__graphicsScene.setPreprocessing(dictParams)
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+    def updatePreprocessingFromScene(self):
+
+        dictParams = self.__graphicsScene.getPreprocessing()
+        isTiled = self.__graphicsScene.isBackgroundTiled()
+
+        # tiled backgrounds are shown as decoded
+        for (step, action) in self.__dictPreprocessingActions.items():
+            action.setChecked((step in dictParams) and not isTiled)
+            action.setEnabled(not isTiled)
+
+    def getImageCache(self):
+
+        return self.__imageCache
+
+    def setCoordPrecision(self, precision):
+
+        self.__coordPrecision = precision
+
+    def getCoordPrecision(self):
+
+        return self.__coordPrecision
+
+    @QtCore.pyqtSlot(float, float)
+    def updateMouseCoords(self, x, y):
 
-        self.ui.labelXCurrent.setText(xStr)
-        self.ui.labelYCurrent.setText(yStr)
+        self.ui.labelXCurrent.setText(utils.formatCoordinate(x, self.__coordPrecision))
+        self.ui.labelYCurrent.setText(utils.formatCoordinate(y, self.__coordPrecision))
 
     def myGraphicsViewEnterEvent(self, event):
         QtWidgets.QGraphicsView.enterEvent(self, event)
@@ -0,0 +1,257 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: executor
+   :synopsis: Tile-parallel image analysis on a thread pool.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import concurrent.futures
+import math
+import os
+import numpy
+
+from . import extraction
+
+# Constants
+ANALYSIS_TILE_SIZE = 2048  # pixels per side of the tiles analysed in parallel
+ANALYSIS_MIN_PIXELS = 2 ** 23  # regions smaller than this are analysed in one piece
+ANALYSIS_WORKERS = os.cpu_count() or 1  # threads of the pool (NumPy releases the GIL in its kernels)
+
+
+def splitTiles(rect, width, height, tileWidth, tileHeight, overlap=0):
+    """Tiles of a rectangle: core rectangles partitioning it, each extended by the overlap (within the image).
+
+    Parameters
+    ----------
+    rect : tuple
+        (left, top, right, bottom) in image pixels (None: whole image).
+    width, height : int
+        Image size.
+    tileWidth, tileHeight : int
+        Size of the core rectangles (None: the size of the rectangle).
+    overlap : int
+        Pixels added to each side of the core rectangles.
+
+    Returns
+    -------
+    out : list
+        (tile, core) per tile, both (col0, row0, col1, row1) in pixels, ordered by row, then column.
+    """
+
+    (col0, row0, col1, row1) = extraction.calcPixelRect(rect, width, height)
+
+    if (col1 <= col0) or (row1 <= row0):
+        return []
+
+    tileWidth = (col1 - col0) if (tileWidth is None) else tileWidth
+    tileHeight = (row1 - row0) if (tileHeight is None) else tileHeight
+
+    tileList = []
+    for coreRow0 in range(row0, row1, tileHeight):
+        for coreCol0 in range(col0, col1, tileWidth):
+            core = (coreCol0, coreRow0, min(col1, coreCol0 + tileWidth), min(row1, coreRow0 + tileHeight))
+            tile = (max(0, core[0] - overlap), max(0, core[1] - overlap),
+                    min(width, core[2] + overlap), min(height, core[3] + overlap))
+            tileList.append((tile, core))
+
+    return tileList
+
+
+def calcCoreMask(coordsArr, core):
+    """Points within a core rectangle (half-open, so a point on a seam belongs to one tile only).
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates in image pixels, shape (N, 2).
+    core : tuple
+        (col0, row0, col1, row1).
+
+    Returns
+    -------
+    out : numpy-array
+        Mask of the points within the core rectangle, shape (N,), dtype bool.
+    """
+
+    coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+    (col0, row0, col1, row1) = core
+
+    return ((coordsArr[:, 0] >= col0) & (coordsArr[:, 0] < col1) &
+            (coordsArr[:, 1] >= row0) & (coordsArr[:, 1] < row1))
+
+
+def selectCorePoints(coordsArr, core):
+    """Points within a core rectangle, see :func:`calcCoreMask`.
+
+    Returns
+    -------
+    out : numpy-array
+        Coordinates within the core rectangle, order kept.
+    """
+
+    coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+
+    return coordsArr[calcCoreMask(coordsArr, core)]
+
+
+def suppressClosePoints(coordsArr, minDistance):
+    """Of points closer than minDistance, the first one is kept (e.g. the same marker found at a seam twice).
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates, shape (N, 2), by descending priority.
+    minDistance : float
+        Minimum distance of the kept points.
+
+    Returns
+    -------
+    out : numpy-array
+        Kept coordinates, order kept.
+    """
+
+    coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+
+    if (minDistance <= 0.0) or (len(coordsArr) < 2):
+        return coordsArr
+
+    # points hashed to cells of the size of minDistance, neighbors are in the adjacent cells
+    cellArr = numpy.floor(coordsArr / minDistance).astype(numpy.int64)
+    dictCells = {}
+    isKeptArr = numpy.zeros(len(coordsArr), dtype=bool)
+
+    for (ii, (cx, cy)) in enumerate(cellArr):
+        neighborList = [jj for dx in (-1, 0, 1) for dy in (-1, 0, 1) for jj in dictCells.get((cx + dx, cy + dy), ())]
+        if all(numpy.hypot(*(coordsArr[ii] - coordsArr[jj])) >= minDistance for jj in neighborList):
+            dictCells.setdefault((cx, cy), []).append(ii)
+            isKeptArr[ii] = True
+
+    return coordsArr[isKeptArr]
+
+
+class DDAnalysisExecutor:
+    """Shared executor of image analysis kernels on overlapping tiles (thread pool).
+
+    A kernel takes the rectangle (left, top, right, bottom) it analyses and returns point coordinates in image
+    pixels, e.g. :func:`extraction.extractColorCurve` or :func:`matching.findMarkers` with all other arguments
+    bound. The points of each tile are restricted to its core rectangle, so points found in the overlap of two tiles
+    are kept once.
+    """
+
+    def __init__(self, numWorkers=ANALYSIS_WORKERS, tileSize=ANALYSIS_TILE_SIZE, minPixels=ANALYSIS_MIN_PIXELS):
+
+        self.__numWorkers = max(1, numWorkers)
+        self.__tileSize = tileSize
+        self.__minPixels = minPixels
+        self.__pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.__numWorkers,
+                                                            thread_name_prefix="analysis")
+
+    def getNumWorkers(self):
+
+        return self.__numWorkers
+
+    def getTileSize(self):
+
+        return self.__tileSize
+
+    def mapTiles(self, kernel, width, height, rect=None, overlap=0, isColumnBands=False):
+        """Run a kernel on the tiles of a rectangle in parallel.
+
+        Parameters
+        ----------
+        kernel : callable
+            kernel(tile) -> result, tile (left, top, right, bottom) in image pixels.
+        width, height : int
+            Image size.
+        rect : tuple
+            (left, top, right, bottom) in image pixels (None: whole image).
+        overlap : int
+            Pixels the tiles extend beyond their core rectangles (at least the reach of the kernel).
+        isColumnBands : bool
+            Tiles spanning the full height (kernels working on whole columns).
+
+        Returns
+        -------
+        out : list
+            (core, result) per tile, ordered by row, then column; one tile for small rectangles.
+        """
+
+        (col0, row0, col1, row1) = extraction.calcPixelRect(rect, width, height)
+        numPixels = max(0, col1 - col0) * max(0, row1 - row0)
+
+        if (numPixels < self.__minPixels):
+            tileSize = (None, None)
+        elif isColumnBands:
+            tileSize = (max(1, math.ceil(self.__tileSize ** 2 / (row1 - row0))), None)
+        else:
+            tileSize = (self.__tileSize, self.__tileSize)
+
+        tileList = splitTiles(rect, width, height, tileSize[0], tileSize[1], overlap)
+
+        if (len(tileList) <= 1):
+            return [(core, kernel(tile)) for (tile, core) in tileList]
+
+        futureList = [self.__pool.submit(kernel, tile) for (tile, _) in tileList]
+
+        return [(core, future.result()) for ((_, core), future) in zip(tileList, futureList)]
+
+    def mapPoints(self, kernel, width, height, rect=None, overlap=0, isColumnBands=False, minDistance=0.0,
+                  numResults=None, hasScores=False):
+        """Run a point-finding kernel on the tiles of a rectangle in parallel, merge the points.
+
+        Parameters
+        ----------
+        kernel : callable
+            kernel(tile) -> coordinates in image pixels, shape (N, 2), a list of numResults of those (e.g. one per
+            curve), or a tuple of coordinates and their scores, shape (N,).
+        width, height : int
+            Image size.
+        rect : tuple
+            (left, top, right, bottom) in image pixels (None: whole image).
+        overlap : int
+            Pixels the tiles extend beyond their core rectangles.
+        isColumnBands : bool
+            Tiles spanning the full height, points stay sorted by x.
+        minDistance : float
+            Points closer than this at the seams are de-duplicated, see :func:`suppressClosePoints`.
+        numResults : int
+            Number of coordinate arrays the kernel returns as a list (None: a single array).
+        hasScores : bool
+            The kernel returns scores, too: the points are ordered by descending score, so the de-duplication keeps
+            the best-scoring one.
+
+        Returns
+        -------
+        out : numpy-array
+            Coordinates, shape (N, 2) (a list of numResults of those), ordered by tile or by descending score.
+        """
+
+        resultList = self.mapTiles(kernel, width, height, rect, overlap, isColumnBands)
+
+        def merge(tileResults):
+            (coordsList, scoresList) = ([numpy.zeros((0, 2))], [numpy.zeros(0)])
+            for (core, result) in tileResults:
+                (coordsArr, scoreArr) = result if hasScores else (result, None)
+                coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+                isCoreArr = calcCoreMask(coordsArr, core)
+                coordsList.append(coordsArr[isCoreArr])
+                if hasScores:
+                    scoresList.append(numpy.asarray(scoreArr, dtype=float)[isCoreArr])
+
+            coordsArr = numpy.vstack(coordsList)
+            if hasScores:
+                coordsArr = coordsArr[numpy.argsort(-numpy.concatenate(scoresList), kind='stable')]
+
+            return suppressClosePoints(coordsArr, minDistance) if (minDistance > 0.0) else coordsArr
+
+        if (numResults is None):
+            return merge(resultList)
+
+        return [merge([(core, result[ii]) for (core, result) in resultList]) for ii in range(numResults)]
+
+    def shutdown(self):
+
+        self.__pool.shutdown(wait=True)
@@ -0,0 +1,446 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: extraction
+   :synopsis: Automatic extraction of curves from image pixels.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import math
+import numpy
+
+# Constants
+EXTRACT_COLOR_TOLERANCE = 40.0  # RGB distance of curve pixels to the picked color
+EXTRACT_STRIP_ROWS = 1024  # rows masked at once, bounding the temporary arrays (and reads of mapped images)
+TRACE_SEED_RADIUS = 5  # pixels around a clicked seed point searched for the curve
+TRACE_MAX_GAP = 12  # pixels bridged by the tracer (thinning shortens line ends by about half the line width)
+TRACE_DIRECTION_STEPS = 10  # path pixels the tracing direction is averaged over
+TRACE_MIN_COS = -0.3  # cosine of the largest turn per step (no steps back)
+TRACE_JUNCTION_COS = 0.5  # cosine of turns from which a continuation straight ahead is searched (junctions)
+TRACE_GAP_COS = 0.8  # cosine of the cone ahead searched for continuations (gaps, junctions)
+
+# Neighbors of a pixel (dx, dy), clockwise from north, as used by the thinning
+NEIGHBOR_OFFSETS = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+
+def calcPixelRect(rect, width, height):
+    """Pixel range of a rectangle, clipped to the image.
+
+    Parameters
+    ----------
+    rect : tuple
+        (left, top, right, bottom) in image pixels (None: whole image).
+    width, height : int
+        Size of the image.
+
+    Returns
+    -------
+    out : tuple
+        (first column, first row, end column, end row), ends exclusive; empty if end <= first.
+    """
+
+    if (rect is None):
+        return (0, 0, width, height)
+
+    (left, top, right, bottom) = rect
+
+    return (min(width, max(0, math.floor(left))), min(height, max(0, math.floor(top))),
+            max(0, min(width, math.ceil(right))), max(0, min(height, math.ceil(bottom))))
+
+
+def calcColorMask(pixelArr, color, tolerance=EXTRACT_COLOR_TOLERANCE):
+    """Pixels close to a color (Euclidean RGB distance).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped).
+    color : tuple
+        (r, g, b).
+    tolerance : float
+        Maximum distance.
+
+    Returns
+    -------
+    out : numpy-array
+        Mask, shape (H, W), dtype bool.
+    """
+
+    colorArr = numpy.asarray(color, dtype=numpy.int32)[:3]
+    lowArr = numpy.clip(numpy.ceil(colorArr - tolerance), 0, 255).astype(numpy.uint8)
+    highArr = numpy.clip(numpy.floor(colorArr + tolerance), 0, 255).astype(numpy.uint8)
+    maskArr = numpy.zeros(pixelArr.shape[:2], dtype=bool)
+
+    for row0 in range(0, pixelArr.shape[0], EXTRACT_STRIP_ROWS):
+        stripArr = numpy.asarray(pixelArr[row0:row0 + EXTRACT_STRIP_ROWS])
+
+        # cheap per-channel bounds first, exact distance of the remaining candidates only
+        boxArr = ((stripArr[..., 0] >= lowArr[0]) & (stripArr[..., 0] <= highArr[0]) &
+                  (stripArr[..., 1] >= lowArr[1]) & (stripArr[..., 1] <= highArr[1]) &
+                  (stripArr[..., 2] >= lowArr[2]) & (stripArr[..., 2] <= highArr[2]))
+        (rowArr, colArr) = numpy.nonzero(boxArr)
+        diffArr = stripArr[rowArr, colArr, :3].astype(numpy.int32) - colorArr
+        isCloseArr = numpy.einsum('ij,ij->i', diffArr, diffArr) <= tolerance ** 2
+
+        maskArr[row0 + rowArr[isCloseArr], colArr[isCloseArr]] = True
+
+    return maskArr
+
+
+def extractMaskPoints(maskArr):
+    """Curve points of a mask: the center of every vertical run of mask pixels in every column.
+
+    A curve y(x) yields one point per column, curves crossing a column several times yield one point per crossing.
+
+    Parameters
+    ----------
+    maskArr : numpy-array
+        Mask, shape (H, W), dtype bool.
+
+    Returns
+    -------
+    out : numpy-array
+        Coordinates (pixel centers), shape (N, 2), sorted by x, then y.
+    """
+
+    (height, width) = maskArr.shape
+
+    # run starts/ends per column: transitions of the padded, transposed mask
+    paddedArr = numpy.zeros((width, height + 2), dtype=numpy.int8)
+    paddedArr[:, 1:-1] = maskArr.T
+    diffArr = numpy.diff(paddedArr, axis=1)
+
+    (colArr, startArr) = numpy.nonzero(diffArr == 1)
+    (_, endArr) = numpy.nonzero(diffArr == -1)
+
+    return numpy.column_stack((colArr + 0.5, (startArr + endArr) / 2.0))
+
+
+def extractColorCurve(pixelArr, color, tolerance=EXTRACT_COLOR_TOLERANCE, rect=None):
+    """Points of a curve drawn in a color.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped, only the rectangle is read).
+    color : tuple
+        (r, g, b) of the curve.
+    tolerance : float
+        Maximum RGB distance of curve pixels to the color.
+    rect : tuple
+        (left, top, right, bottom) in image pixels the curve is searched in, e.g. the plot area (None: whole image).
+
+    Returns
+    -------
+    out : numpy-array
+        Coordinates in image pixels, shape (N, 2), sorted by x.
+    """
+
+    (col0, row0, col1, row1) = calcPixelRect(rect, pixelArr.shape[1], pixelArr.shape[0])
+
+    if (col1 <= col0) or (row1 <= row0):
+        return numpy.zeros((0, 2))
+
+    maskArr = calcColorMask(pixelArr[row0:row1, col0:col1], color, tolerance)
+
+    return extractMaskPoints(maskArr) + numpy.array([col0, row0])
+
+
+def extractColorCurves(pixelArr, colorList, tolerance=EXTRACT_COLOR_TOLERANCE, rect=None):
+    """Points of several curves drawn in different colors, in one pass: each pixel belongs to the nearest color.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped, only the rectangle is read).
+    colorList : list
+        (r, g, b) per curve.
+    tolerance : float
+        Maximum RGB distance of curve pixels to the color.
+    rect : tuple
+        (left, top, right, bottom) in image pixels the curves are searched in (None: whole image).
+
+    Returns
+    -------
+    out : list
+        Coordinates in image pixels per curve, shape (N, 2), sorted by x.
+    """
+
+    (col0, row0, col1, row1) = calcPixelRect(rect, pixelArr.shape[1], pixelArr.shape[0])
+
+    if (col1 <= col0) or (row1 <= row0) or (len(colorList) == 0):
+        return [numpy.zeros((0, 2)) for _ in colorList]
+
+    colorArr = numpy.asarray(colorList, dtype=numpy.int32).reshape(-1, 3)
+    labelArr = numpy.full((row1 - row0, col1 - col0), len(colorArr), dtype=numpy.int32)
+
+    for stripRow0 in range(row0, row1, EXTRACT_STRIP_ROWS):
+        stripArr = numpy.asarray(pixelArr[stripRow0:min(row1, stripRow0 + EXTRACT_STRIP_ROWS), col0:col1, :3],
+                                 dtype=numpy.int32)
+        bestArr = numpy.full(stripArr.shape[:2], tolerance ** 2 + 1.0)
+        labelStripArr = labelArr[stripRow0 - row0:stripRow0 - row0 + len(stripArr)]
+
+        for (label, color) in enumerate(colorArr):
+            diffArr = stripArr - color
+            distArr = numpy.einsum('ijk,ijk->ij', diffArr, diffArr)
+            isNearerArr = distArr < bestArr
+            bestArr[isNearerArr] = distArr[isNearerArr]
+            labelStripArr[isNearerArr] = label
+
+    return [extractMaskPoints(labelArr == label) + numpy.array([col0, row0]) for label in range(len(colorArr))]
+
+
+def findSeedColor(pixelArr, x, y, radius=TRACE_SEED_RADIUS):
+    """Curve color near a clicked point: the pixel differing most from the surrounding (median) background.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    x, y : float
+        Clicked point in image pixels.
+    radius : int
+        Half size of the searched window.
+
+    Returns
+    -------
+    out : tuple
+        ((r, g, b) of the curve, (column, row) of the pixel), None if the point is outside of the image.
+    """
+
+    (col, row) = (int(math.floor(x)), int(math.floor(y)))
+
+    if not ((0 <= row < pixelArr.shape[0]) and (0 <= col < pixelArr.shape[1])):
+        return None
+
+    (col0, row0) = (max(0, col - radius), max(0, row - radius))
+    windowArr = numpy.asarray(pixelArr[row0:row + radius + 1, col0:col + radius + 1, :3], dtype=numpy.int32)
+
+    diffArr = windowArr - numpy.median(windowArr.reshape(-1, 3), axis=0)
+    (wRow, wCol) = numpy.unravel_index(numpy.argmax(numpy.einsum('ijk,ijk->ij', diffArr, diffArr)),
+                                       windowArr.shape[:2])
+
+    return (tuple(int(val) for val in windowArr[wRow, wCol]), (col0 + int(wCol), row0 + int(wRow)))
+
+
+def thinMask(maskArr):
+    """Skeleton of a mask, one pixel wide and 8-connected (Zhang-Suen thinning).
+
+    Only the mask pixels are processed (neighborhoods gathered by flat index), so the cost depends on the number
+    of mask pixels rather than on the image size.
+
+    Parameters
+    ----------
+    maskArr : numpy-array
+        Mask, shape (H, W), dtype bool.
+
+    Returns
+    -------
+    out : numpy-array
+        Skeleton mask, shape (H, W), dtype bool.
+    """
+
+    (height, width) = maskArr.shape
+    paddedArr = numpy.zeros((height + 2, width + 2), dtype=bool)
+    paddedArr[1:-1, 1:-1] = maskArr
+    flatArr = paddedArr.reshape(-1)
+
+    offsetArr = numpy.array([dy * (width + 2) + dx for (dx, dy) in NEIGHBOR_OFFSETS])
+    indArr = numpy.flatnonzero(flatArr)
+
+    isChanged = True
+    while isChanged:
+        isChanged = False
+
+        for subIteration in range(2):
+            nbArr = flatArr[indArr[:, numpy.newaxis] + offsetArr]
+            (p2, p4, p6, p8) = (nbArr[:, 0], nbArr[:, 2], nbArr[:, 4], nbArr[:, 6])
+
+            # neighbor count and 0 -> 1 transitions around the pixel
+            countArr = nbArr.sum(axis=1)
+            transArr = (~nbArr & numpy.roll(nbArr, -1, axis=1)).sum(axis=1)
+
+            if (subIteration == 0):
+                isFreeArr = ~(p2 & p4 & p6) & ~(p4 & p6 & p8)
+            else:
+                isFreeArr = ~(p2 & p4 & p8) & ~(p2 & p6 & p8)
+
+            isDeletedArr = (countArr >= 2) & (countArr <= 6) & (transArr == 1) & isFreeArr
+
+            if numpy.any(isDeletedArr):
+                flatArr[indArr[isDeletedArr]] = False
+                indArr = indArr[~isDeletedArr]
+                isChanged = True
+
+    return paddedArr[1:-1, 1:-1].copy()
+
+
+def traceSkeletonPath(skeletonArr, seed, maxGap=TRACE_MAX_GAP, seedRadius=TRACE_SEED_RADIUS):
+    """Path along a skeleton from a seed point in both directions.
+
+    At every step the unvisited neighbor closest to the current direction (averaged over the last path pixels) is
+    followed. If the skeleton ends or turns sharply, as at gaps and at crossings of curves of the same color (which
+    the thinning displaces), the path continues with the nearest skeleton pixel within a cone ahead. The path ends
+    where no continuation is found.
+
+    Parameters
+    ----------
+    skeletonArr : numpy-array
+        Skeleton mask, shape (H, W), dtype bool, see :func:`thinMask`.
+    seed : tuple
+        (column, row) near the curve.
+    maxGap : int
+        Largest gap bridged in pixels.
+    seedRadius : int
+        Distance of the nearest skeleton pixel to the seed.
+
+    Returns
+    -------
+    out : numpy-array
+        (column, row) of the path pixels in path order (from its left end), shape (N, 2), empty if no skeleton
+        pixel is near the seed or the seed lies outside the skeleton.
+    """
+
+    pad = max(1, maxGap, seedRadius)
+    (height, width) = skeletonArr.shape
+
+    if not ((0 <= seed[0] < width) and (0 <= seed[1] < height)):
+        return numpy.zeros((0, 2), dtype=numpy.intp)
+
+    isFreeArr = numpy.zeros((height + 2 * pad, width + 2 * pad), dtype=bool)  # skeleton pixels not visited
+    isFreeArr[pad:-pad, pad:-pad] = skeletonArr
+
+    # nearest skeleton pixel to the seed
+    (seedX, seedY) = (int(math.floor(seed[0])) + pad, int(math.floor(seed[1])) + pad)
+    (nearYArr, nearXArr) = numpy.nonzero(isFreeArr[seedY - seedRadius:seedY + seedRadius + 1,
+                                                   seedX - seedRadius:seedX + seedRadius + 1])
+    if (len(nearXArr) == 0):
+        return numpy.zeros((0, 2), dtype=numpy.intp)
+
+    iNear = numpy.argmin((nearXArr - seedRadius) ** 2 + (nearYArr - seedRadius) ** 2)
+    start = (seedX - seedRadius + int(nearXArr[iNear]), seedY - seedRadius + int(nearYArr[iNear]))
+    isFreeArr[start[1], start[0]] = False
+
+    # offsets beyond the neighbors, nearest first
+    gapOffsets = sorted(((dx, dy) for dx in range(-maxGap, maxGap + 1) for dy in range(-maxGap, maxGap + 1)
+                         if (max(abs(dx), abs(dy)) > 1) and (dx * dx + dy * dy <= maxGap * maxGap)),
+                        key=lambda offset: offset[0] ** 2 + offset[1] ** 2)
+
+    def findNext(x, y, dirX, dirY, offsets, minCos, isNearest):
+        (bestOffset, bestCos) = (None, minCos)
+        norm = math.hypot(dirX, dirY)
+        for (dx, dy) in offsets:
+            if isFreeArr[y + dy, x + dx]:
+                cosAngle = 1.0 if (norm == 0.0) else (dx * dirX + dy * dirY) / (math.hypot(dx, dy) * norm)
+                if (cosAngle >= bestCos):
+                    if isNearest:
+                        return ((dx, dy), cosAngle)
+                    (bestOffset, bestCos) = ((dx, dy), cosAngle)
+        return (bestOffset, bestCos)
+
+    def walk(dirX, dirY):
+        path = [start]
+        while True:
+            (x, y) = path[-1]
+            (offset, cosAngle) = findNext(x, y, dirX, dirY, NEIGHBOR_OFFSETS, TRACE_MIN_COS, False)
+
+            if (offset is None) or (cosAngle < TRACE_JUNCTION_COS):
+                (aheadOffset, _) = findNext(x, y, dirX, dirY, gapOffsets, TRACE_GAP_COS, True)
+                if not (aheadOffset is None):
+                    offset = aheadOffset
+
+            if (offset is None):
+                return path[1:]
+
+            (nextX, nextY) = (x + offset[0], y + offset[1])
+            isFreeArr[nextY, nextX] = False
+            path.append((nextX, nextY))
+
+            (backX, backY) = path[max(0, len(path) - 1 - TRACE_DIRECTION_STEPS)]
+            (dirX, dirY) = (nextX - backX, nextY - backY)
+
+    # first direction: any neighbor of the start, second direction: opposite to the first one
+    firstPath = walk(0.0, 0.0)
+    if (len(firstPath) > 0):
+        secondPath = walk(start[0] - firstPath[0][0], start[1] - firstPath[0][1])
+    else:
+        secondPath = []
+
+    pathArr = numpy.array(secondPath[::-1] + [start] + firstPath, dtype=numpy.intp) - pad
+
+    if (pathArr[0, 0] > pathArr[-1, 0]):
+        pathArr = pathArr[::-1]
+
+    return pathArr
+
+
+def resamplePath(pathArr, arcStep=None):
+    """Points along a pixel path: one per column (mean row of consecutive path pixels in a column) or equidistant.
+
+    Parameters
+    ----------
+    pathArr : numpy-array
+        (column, row) of the path pixels in path order, shape (N, 2).
+    arcStep : float
+        Distance of the points along the path in pixels (None: one point per column).
+
+    Returns
+    -------
+    out : numpy-array
+        Coordinates (pixel centers) in path order, shape (M, 2).
+    """
+
+    pathArr = numpy.asarray(pathArr, dtype=float).reshape(-1, 2)
+
+    if (len(pathArr) == 0):
+        return numpy.zeros((0, 2))
+
+    if (arcStep is None):
+        startArr = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(pathArr[:, 0]) != 0) + 1))
+        countArr = numpy.diff(numpy.append(startArr, len(pathArr)))
+        rowArr = numpy.add.reduceat(pathArr[:, 1], startArr) / countArr
+
+        return numpy.column_stack((pathArr[startArr, 0], rowArr)) + 0.5
+
+    arcArr = numpy.concatenate(([0.0], numpy.cumsum(numpy.hypot(*numpy.diff(pathArr, axis=0).T))))
+    sampleArr = numpy.arange(0.0, arcArr[-1] + 1e-9, arcStep)
+
+    return numpy.column_stack((numpy.interp(sampleArr, arcArr, pathArr[:, 0]),
+                               numpy.interp(sampleArr, arcArr, pathArr[:, 1]))) + 0.5
+
+
+def traceColorCurve(pixelArr, seed, tolerance=EXTRACT_COLOR_TOLERANCE, rect=None, arcStep=None):
+    """Points of the curve through a clicked point, traced along the skeleton of its color mask.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped, only the rectangle is read).
+    seed : tuple
+        (x, y) clicked on the curve in image pixels, the curve color is taken from there.
+    tolerance : float
+        Maximum RGB distance of curve pixels to the color.
+    rect : tuple
+        (left, top, right, bottom) in image pixels the curve is searched in (None: whole image).
+    arcStep : float
+        Distance of the points along the curve (None: one point per column).
+
+    Returns
+    -------
+    out : numpy-array
+        Coordinates in image pixels in curve order, shape (N, 2).
+    """
+
+    seedColor = findSeedColor(pixelArr, seed[0], seed[1])
+    (col0, row0, col1, row1) = calcPixelRect(rect, pixelArr.shape[1], pixelArr.shape[0])
+
+    if (seedColor is None) or (col1 <= col0) or (row1 <= row0):
+        return numpy.zeros((0, 2))
+
+    (color, (seedCol, seedRow)) = seedColor
+    skeletonArr = thinMask(calcColorMask(pixelArr[row0:row1, col0:col1], color, tolerance))
+    pathArr = traceSkeletonPath(skeletonArr, (seedCol - col0, seedRow - row0))
+
+    return resamplePath(pathArr, arcStep) + numpy.array([col0, row0])
@@ -0,0 +1,335 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: graphitems
+   :synopsis: Graphical items for large numbers of points.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import numpy
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from . import datapoints
+
+# Constants
+LOD_EXACT = 1.0  # level of detail (zoom) from which all markers are drawn
+LOD_CELL_PIXELS = 2.0  # minimum screen size of the cells of decimated markers
+LOD_DOT_PIXELS = 4.0  # screen size of markers below which they are drawn as dots in one pass
+
+
+def arrToPolygonF(coordsArr):
+    """Convert a coordinate array to a polygon without a loop over points.
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates, shape (N, 2).
+
+    Returns
+    -------
+    out : QPolygonF
+        Polygon with N points.
+    """
+
+    numPoints = len(coordsArr)
+    polygon = QtGui.QPolygonF(numPoints)
+
+    if (numPoints > 0):
+        ptr = polygon.data()
+        ptr.setsize(numPoints * 2 * numpy.dtype(numpy.float64).itemsize)
+        polyArr = numpy.frombuffer(ptr, dtype=numpy.float64).reshape(numPoints, 2)
+        polyArr[:] = coordsArr
+
+    return polygon
+
+
+def calcBoundingRectArr(coordsArr, margin):
+    """Bounding rectangle of a coordinate array.
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates, shape (N, 2).
+    margin : float
+        Margin added on all sides.
+
+    Returns
+    -------
+    out : QRectF
+        Bounding rectangle, empty rectangle if there are no points.
+    """
+
+    if (len(coordsArr) == 0):
+        return QtCore.QRectF()
+
+    (xMin, yMin) = coordsArr.min(axis=0)
+    (xMax, yMax) = coordsArr.max(axis=0)
+
+    return QtCore.QRectF(xMin - margin, yMin - margin, xMax - xMin + 2.0 * margin, yMax - yMin + 2.0 * margin)
+
+
+def selectPointsInRect(coordsArr, rect):
+    """Mask of points within a rectangle.
+
+    Parameters
+    ----------
+    coordsArr : numpy-array
+        Coordinates, shape (N, 2).
+    rect : QRectF
+        Rectangle.
+
+    Returns
+    -------
+    out : numpy-array
+        Boolean mask, shape (N,).
+    """
+
+    return ((coordsArr[:, 0] >= rect.left()) & (coordsArr[:, 0] <= rect.right()) &
+            (coordsArr[:, 1] >= rect.top()) & (coordsArr[:, 1] <= rect.bottom()))
+
+
+class DDOverlayItem(QtWidgets.QGraphicsItem):
+    """Overlay of reference points: All points are drawn by a single item in one pass.
+
+    The overlay does not take part in the item search of the scene (empty shape), i.e. mouse clicks pass through
+    to the items below.
+    """
+
+    PEN_OVERLAY = QtGui.QPen(QtCore.Qt.darkGreen, 3, QtCore.Qt.SolidLine, QtCore.Qt.SquareCap, QtCore.Qt.MiterJoin)
+    PEN_OVERLAY.setCosmetic(True)
+
+    def __init__(self, *args):
+
+        QtWidgets.QGraphicsItem.__init__(self, *args)
+
+        self.setFlag(QtWidgets.QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+        self.__coordsArr = numpy.zeros((0, 2))
+        self.__boundingRect = QtCore.QRectF()
+
+    def setCoords(self, coordsArr):
+
+        coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+
+        self.prepareGeometryChange()
+        self.__coordsArr = coordsArr[numpy.isfinite(coordsArr).all(axis=1)]
+        self.__boundingRect = calcBoundingRectArr(self.__coordsArr, DDOverlayItem.PEN_OVERLAY.widthF())
+        self.update()
+
+    def getCoords(self):
+
+        return self.__coordsArr
+
+    def boundingRect(self):
+
+        return self.__boundingRect
+
+    def shape(self):
+
+        return QtGui.QPainterPath()
+
+    def paint(self, painter, option, widget=None):
+
+        # draw visible points only
+        visibleArr = self.__coordsArr[selectPointsInRect(self.__coordsArr, option.exposedRect)]
+
+        painter.setPen(DDOverlayItem.PEN_OVERLAY)
+        painter.drawPoints(arrToPolygonF(visibleArr))
+
+
+class DDDataPointsItem(QtWidgets.QGraphicsItem):
+    """Data points of a data set: All markers are drawn by a single item from a coordinate array.
+
+    The item does not take part in the item search of the scene (empty shape), hit-testing of points is done on the
+    coordinate array. Zoomed out, one marker per occupied screen cell is drawn (level of detail), so the number of
+    painted markers is limited by the view size rather than by the number of points. Markers of a few pixels are
+    drawn as dots in one pass. Selected points are highlighted.
+
+    Parameters
+    ----------
+    markerRect : QRectF
+        Marker (circle) relative to a point.
+    pen : QPen
+        Marker pen.
+    """
+
+    PEN_SELECTED = QtGui.QPen(QtGui.QColor(255, 140, 0), 2, QtCore.Qt.SolidLine, QtCore.Qt.SquareCap,
+                              QtCore.Qt.BevelJoin)
+
+    def __init__(self, markerRect, pen, *args):
+
+        QtWidgets.QGraphicsItem.__init__(self, *args)
+
+        self.setFlag(QtWidgets.QGraphicsItem.ItemUsesExtendedStyleOption, True)
+
+        self.__pointArray = datapoints.DDDataPointArray()
+        self.__markerRect = QtCore.QRectF(markerRect)
+        self.__pen = QtGui.QPen(pen)
+        self.__boundingRect = QtCore.QRectF()
+        self.__lodCache = None  # (cell size, decimated coordinates)
+        self.__selectedPointIds = numpy.zeros(0, dtype=numpy.int64)
+
+    def getPointArray(self):
+
+        return self.__pointArray
+
+    def getPen(self):
+
+        return QtGui.QPen(self.__pen)
+
+    def setPen(self, pen):
+
+        self.__pen = QtGui.QPen(pen)
+        self.pointsChanged()  # marker radius depends on pen width
+
+    def getMarkerRadius(self):
+
+        return 0.5 * self.__markerRect.width() + 0.5 * self.__pen.widthF()
+
+    def pointsChanged(self):
+
+        self.__lodCache = None
+        self.prepareGeometryChange()
+        self.__boundingRect = calcBoundingRectArr(self.__pointArray.getCoords(), self.getMarkerRadius())
+        self.update()
+
+    def setCoords(self, coordsArr, pointIds=None):
+
+        self.__pointArray.setCoords(coordsArr, pointIds)
+        self.pointsChanged()
+
+    def restorePoints(self, coordsArr, pointIds):
+
+        self.__pointArray.restorePoints(coordsArr, pointIds)
+        self.pointsChanged()
+
+    def addPoint(self, x, y):
+
+        pointId = self.__pointArray.addPoint(x, y)
+
+        # Extend bounding rectangle by new marker only
+        radius = self.getMarkerRadius()
+        self.__lodCache = None
+        self.prepareGeometryChange()
+        self.__boundingRect = self.__boundingRect.united(QtCore.QRectF(x - radius, y - radius, 2.0 * radius,
+                                                                       2.0 * radius))
+        self.update()
+
+        return pointId
+
+    def addPoints(self, coordsArr):
+
+        pointIds = self.__pointArray.addPoints(coordsArr)
+        self.pointsChanged()
+
+        return pointIds
+
+    def removeSlots(self, slots):
+
+        # Bounding rectangle is kept (removal does not enlarge it)
+        self.__pointArray.removeSlots(slots)
+        self.__lodCache = None
+        self.update()
+
+    def removePoints(self, pointIds):
+
+        self.__pointArray.removePoints(pointIds)
+        self.__lodCache = None
+        self.update()
+
+    def setPointsCoords(self, pointIds, coordsArr):
+
+        self.__pointArray.setPointsCoords(pointIds, coordsArr)
+        self.pointsChanged()
+
+    def getSelectedPoints(self):
+
+        # removed points are dropped from the selection
+        slots = self.__pointArray.findSlots(self.__selectedPointIds)
+
+        return self.__selectedPointIds[slots >= 0]
+
+    def setSelectedPoints(self, pointIds):
+
+        self.__selectedPointIds = numpy.unique(numpy.asarray(pointIds, dtype=numpy.int64))
+        self.update()
+
+    def findPoint(self, x, y, tolerance=0.0):
+
+        return self.__pointArray.findPoint(x, y, self.getMarkerRadius() + tolerance)
+
+    def boundingRect(self):
+
+        return self.__boundingRect
+
+    def shape(self):
+
+        return QtGui.QPainterPath()
+
+    def getLodCoords(self, levelOfDetail):
+        """Coordinates of the markers drawn at a level of detail.
+
+        Parameters
+        ----------
+        levelOfDetail : float
+            Scale of the view (screen pixels per scene unit).
+
+        Returns
+        -------
+        out : numpy-array
+            All coordinates from LOD_EXACT on, otherwise one point per screen cell of half the marker size,
+            shape (N, 2).
+        """
+
+        if (levelOfDetail >= LOD_EXACT) or (levelOfDetail <= 0.0):
+            return self.__pointArray.getCoords()
+
+        # Cell sizes are rounded to powers of 2, so the decimation is reused for nearby zoom factors
+        cellPixels = max(LOD_CELL_PIXELS, self.getMarkerRadius() * levelOfDetail)
+        cellSize = 2.0 ** numpy.ceil(numpy.log2(cellPixels / levelOfDetail))
+
+        if (self.__lodCache is None) or (self.__lodCache[0] != cellSize):
+            coordsArr = self.__pointArray.getCoords()
+            self.__lodCache = (cellSize, coordsArr[datapoints.decimateToGrid(coordsArr, cellSize)])
+
+        return self.__lodCache[1]
+
+    def drawMarkers(self, painter, coordsArr, pen, levelOfDetail, exposedRect):
+
+        # draw visible markers only
+        radius = self.getMarkerRadius()
+        visibleArr = coordsArr[selectPointsInRect(coordsArr, exposedRect.adjusted(-radius, -radius, radius, radius))]
+
+        # small markers: dots of marker size
+        if (2.0 * radius * levelOfDetail < LOD_DOT_PIXELS):
+            penDot = QtGui.QPen(pen.color(), max(1.0, 2.0 * radius * levelOfDetail), QtCore.Qt.SolidLine,
+                                QtCore.Qt.SquareCap, QtCore.Qt.MiterJoin)
+            penDot.setCosmetic(True)
+            painter.setPen(penDot)
+            painter.drawPoints(arrToPolygonF(visibleArr))
+            return
+
+        painter.setPen(pen)
+        painter.setBrush(QtCore.Qt.NoBrush)
+
+        markerRect = QtCore.QRectF(self.__markerRect)
+        for (x, y) in visibleArr.tolist():
+            markerRect.moveCenter(QtCore.QPointF(x, y))
+            painter.drawEllipse(markerRect)
+
+    def paint(self, painter, option, widget=None):
+
+        # markers decimated according to zoom
+        levelOfDetail = option.levelOfDetailFromTransform(painter.worldTransform())
+        self.drawMarkers(painter, self.getLodCoords(levelOfDetail), self.__pen, levelOfDetail, option.exposedRect)
+
+        # selection on top
+        if (len(self.__selectedPointIds) > 0):
+            selectedArr = self.__pointArray.getPointsCoords(self.__selectedPointIds)
+
+            if (levelOfDetail < LOD_EXACT) and (levelOfDetail > 0.0):
+                selectedArr = selectedArr[datapoints.decimateToGrid(selectedArr, LOD_CELL_PIXELS / levelOfDetail)]
+
+            self.drawMarkers(painter, selectedArr, DDDataPointsItem.PEN_SELECTED, levelOfDetail, option.exposedRect)
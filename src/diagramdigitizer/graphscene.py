@@ -8,16 +8,33 @@
 """
 
 # Imports
+import functools
+import math
 import numpy
 import pickle
 from PyQt5 import QtCore, QtGui, QtWidgets
 
+from . import axisdetection
+from . import background
+from . import calibration
+from . import clustering
+from . import executor
+from . import extraction
+from . import graphitems
+from . import history
+from . import loader
+from . import lrucache
+from . import matching
+from . import pipeline
+from . import preprocessing
+
 
 class DDGraphicsScene(QtWidgets.QGraphicsScene):
     """ Graphics scene
 
         Class attributes:
-            * Operation modes (watch mode, axes add modes, axes delete modes, data mode)
+            * Operation modes (watch mode, axes add modes, axes delete modes, data mode, selection mode,
+              color pick mode, trace mode, marker box mode, calibration point mode)
             * Presented axes (x axis, y axis)
             * Axes scale types (linear/logarithmic)    
             * Basic graphical items (data points, axes points, axes lines)
@@ -28,31 +45,48 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
         Basic scene setup { new, save, load }
 
-        Data { line: new, remove, show; point: add, remove }
+        Background { preprocessing: set, deskew angle }
+
+        Data { line: new, remove, show; point: add, remove;
+               points: add, extract by color(s), trace from seed, detect markers; curve colors: propose;
+               color mask: preview, clear }
     
-        Axes { points: add, remove; lines: update }
+        Axes { points: add, remove, set, detect; lines: update; calibration points: pick, add, fit, clear }
+
+        Selection { rectangle, lasso; points: delete, translate, move to data set }
+
+        History { undo, redo }
+
+        Overlay { reference points: set, clear, update }
 
         Mouse { press, move }
 
-        Calculation { coordinates }
+        Calculation { calibration, coordinates }
     """
 
     class OPERATION_MODES:
         (OP_WATCH, OP_AXIS_X0, OP_DEL_AXIS_X0, OP_AXIS_X1, OP_DEL_AXIS_X1,
-         OP_AXIS_Y0, OP_DEL_AXIS_Y0, OP_AXIS_Y1, OP_DEL_AXIS_Y1, OP_DATA) = range(10)
+         OP_AXIS_Y0, OP_DEL_AXIS_Y0, OP_AXIS_Y1, OP_DEL_AXIS_Y1, OP_DATA, OP_SELECT, OP_PICK_COLOR,
+         OP_TRACE, OP_MARKER, OP_CALIBRATION) = range(15)
+
+    class SELECTION_SHAPES:
+        (SEL_RECT, SEL_LASSO) = range(2)
 
     class PRESENTED_AXES:
         (AXIS_X, AXIS_Y) = range(2)
 
-    class SCALETYPE_AXES:
-        (AXIS_LIN_X, AXIS_LOG_X, AXIS_LIN_Y, AXIS_LOG_Y) = range(4)
+    SCALETYPE_AXES = calibration.SCALETYPE_AXES
 
     # Graphical items
     PEN_WIDTH = 2
     PEN_AXIS = QtGui.QPen(QtCore.Qt.blue, PEN_WIDTH, QtCore.Qt.SolidLine, QtCore.Qt.SquareCap, QtCore.Qt.MiterJoin)
     PEN_POINT = QtGui.QPen(QtCore.Qt.red, PEN_WIDTH, QtCore.Qt.SolidLine, QtCore.Qt.SquareCap, QtCore.Qt.BevelJoin)
+    PEN_SELECTION = QtGui.QPen(QtCore.Qt.darkGray, 1, QtCore.Qt.DashLine)
+    PEN_SELECTION.setCosmetic(True)
 
     BASITEM_POINT_CONF = {"x": -5.0, "y": -5.0, "d": 10.0}  # for circle
+    PICK_TOLERANCE = 3.0  # distance of mouse to data point marker for hit
+    PREVIEW_MASK_RGBA = (255, 0, 255, 160)  # highlight of the pixels an extraction would use
     BASITEM_AXES_CONF = {"basis": 16, "height": 20}  # for triangle
 
     BASITEM_POINT = QtCore.QRectF(BASITEM_POINT_CONF["x"], BASITEM_POINT_CONF["y"], BASITEM_POINT_CONF["d"],
@@ -75,23 +109,68 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     BASITEMS_DEL_AXES = {OPERATION_MODES.OP_DEL_AXIS_X0, OPERATION_MODES.OP_DEL_AXIS_X1,
                          OPERATION_MODES.OP_DEL_AXIS_Y0, OPERATION_MODES.OP_DEL_AXIS_Y1}
 
-    # Signal: Mouse moved
-    mouseMovedSignal = QtCore.pyqtSignal(str, str)
+    # Signal: Mouse moved (real coordinates, NaN if not available), at most once per update interval
+    mouseMovedSignal = QtCore.pyqtSignal(float, float)
+    MOUSE_UPDATE_INTERVAL = 16  # ms, i.e. one update per frame
+
+    # Signal: Data sets added or removed by undo/redo
+    dataSetsChangedSignal = QtCore.pyqtSignal()
+
+    # Signal: Background color (r, g, b) picked in color pick mode
+    colorPickedSignal = QtCore.pyqtSignal(int, int, int)
+
+    # Signal: Seed point (scene coordinates) picked in trace mode
+    seedPickedSignal = QtCore.pyqtSignal(float, float)
+
+    # Signal: Marker boxed (left, top, right, bottom in scene coordinates) in marker box mode
+    markerBoxedSignal = QtCore.pyqtSignal(float, float, float, float)
+
+    # Signal: Calibration point (scene coordinates) picked in calibration point mode, its real value is entered next
+    calibrationPointPickedSignal = QtCore.pyqtSignal(float, float)
 
     def __init__(self, *args):
 
         QtWidgets.QGraphicsScene.__init__(self, *args)
 
+        # Hit tolerance for data points
+        self.__pickTolerance = DDGraphicsScene.PICK_TOLERANCE
+
+        # Coalescing of mouse move events
+        self.__mouseScenePos = None
+        self.__mouseTimer = QtCore.QTimer(self)
+        self.__mouseTimer.setSingleShot(True)
+        self.__mouseTimer.setInterval(DDGraphicsScene.MOUSE_UPDATE_INTERVAL)
+        self.__mouseTimer.timeout.connect(self.emitMouseCoords)
+
+        # Undo/redo history of changes (cleared with the scene)
+        self.__history = history.DDUndoStack()
+
+        # Tile-parallel pixel analysis (extraction, marker detection), shared by all backgrounds
+        self.__analysisExecutor = executor.DDAnalysisExecutor()
+
+        # Staged color extraction, intermediate results cached for re-extraction with changed parameters
+        self.__extractionPipeline = pipeline.DDExtractionPipeline()
+
         # Initialize scene
+        self.__background = None
         self.resetScene()
 
     def resetScene(self):
 
         self.clear()
+        self.__history.clear()
 
         # Background data
         self.__background = None
         self.__backgroundFilepath = None
+        self.__backgroundPage = 0
+        self.__backgroundImage = None  # decoded image of a pixmap background (not tiled)
+        self.__backgroundArr = None  # its pixels, when needed
+
+        # Preprocessing of the background image, results (pixmap, pixels) memoized per parameters
+        self.__dictPreprocessing = {}
+        self.__preprocessedCache = lrucache.DDLruCache(preprocessing.PREPROCESSED_CACHE_BUDGET)
+        self.__preprocessedArr = None  # pixels shown, None if not preprocessed
 
         # Re-init: watch mode
         self.__operationMode = DDGraphicsScene.OPERATION_MODES.OP_WATCH
@@ -101,6 +180,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
         # Graphical items data
         self.__dictLinesOfDataPoints = {}
+        self.__namesVisibleLines = set()  # shown data sets, so switching does not touch the hidden ones
         self.__dictAxesPointItems = {}
         self.__dictAxesItems = {}
 
@@ -114,6 +194,29 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
         self.__scaleX = DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_X
         self.__scaleY = DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_Y
 
+        # Axes calibration (built on demand), optionally fitted to calibration points
+        self.__calibration = None
+        self.__calibrationError = None  # message of a failed calibration, not retried until the axes change
+        self.__dictCalibrationPoints = None
+
+        # Calibration points picked on the image: {kind (CALIBRATION_POINTS): ([(x, y), ...], [real value, ...])}
+        self.__calibrationPointKind = calibration.CALIBRATION_POINTS.POINTS_XY
+        self.__dictPickedCalibrationPoints = {}
+        self.__calibrationPointItems = []
+
+        # Overlay of reference data (real coordinates)
+        self.__overlayItem = None
+        self.__overlayRealCoords = None
+
+        # Preview of the pixels of a color extraction, cached stages of the extraction
+        self.__previewItem = None
+        self.__extractionPipeline.clear()
+
+        # Selection of data points: rubber band (rectangle or lasso) while the mouse is dragged
+        self.__selectionShape = DDGraphicsScene.SELECTION_SHAPES.SEL_RECT
+        self.__selectionBandItem = None
+        self.__selectionBandPath = []
+
     def getBackgroundStatus(self):
 
         return not (self.__background is None)
@@ -131,8 +234,23 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
         return nameList
 
+    def setPickTolerance(self, tolerance):
+
+        self.__pickTolerance = tolerance
+
+    def getPickTolerance(self):
+
+        return self.__pickTolerance
+
+    def get_nameCurrentSingleLine(self):
+
+        return self.__nameCurrentSingleLine
+
     def set_nameCurrentSingleLine(self, nameSingleLine):
 
+        # selection belongs to the current data set
+        self.clearDataPointSelection()
+
         self.__nameCurrentSingleLine = nameSingleLine
 
     def get_x0Real(self):
@@ -142,6 +260,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def set_x0Real(self, x0):
 
         self.__x0Real = x0
+        self.invalidateCalibration()
 
     def get_x1Real(self):
 
@@ -150,6 +269,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def set_x1Real(self, x1):
 
         self.__x1Real = x1
+        self.invalidateCalibration()
 
     def get_y0Real(self):
 
@@ -158,6 +278,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def set_y0Real(self, y0):
 
         self.__y0Real = y0
+        self.invalidateCalibration()
 
     def get_y1Real(self):
 
@@ -166,6 +287,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def set_y1Real(self, y1):
 
         self.__y1Real = y1
+        self.invalidateCalibration()
 
     def getScaleX(self):
 
@@ -174,6 +296,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def setScaleX(self, scaleType):
 
         self.__scaleX = scaleType
+        self.invalidateCalibration()
 
     def getScaleY(self):
 
@@ -182,14 +305,15 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def setScaleY(self, scaleType):
 
         self.__scaleY = scaleType
+        self.invalidateCalibration()
 
-    def newScene(self, filename):
+    def newScene(self, filename, image=None, pyramidArrs=None, page=0):
 
         # Reset everything
         self.resetScene()
 
-        # Setup background from file
-        self.setupBackgroundFromFile(filename)
+        # Setup background from file (optionally decoded already)
+        self.setupBackgroundFromFile(filename, image, pyramidArrs, page)
 
     def saveScene(self, filename):
 
@@ -197,6 +321,8 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
         # Image file name
         dumpDict["Image"] = self.__backgroundFilepath
+        dumpDict["ImagePage"] = self.__backgroundPage
+        dumpDict["Preprocessing"] = dict(self.__dictPreprocessing)
 
         # Axes        
         dumpDict["x0"] = self.__x0Real
@@ -212,6 +338,9 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
         # Transform data point items scene coordinates
         dumpDict["LinesOfDataPointsCoords"] = self.trafo_itemsToCoords_dataPoints()
 
+        # Calibration points of fitted calibration
+        dumpDict["CalibrationPoints"] = self.__dictCalibrationPoints
+
         try:
             pickle.dump(dumpDict, open(filename, "wb"))
         except OSError as e:
@@ -220,39 +349,179 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
     def loadScene(self, filename):
 
         try:
+            self.loadSceneFromDict(pickle.load(open(filename, "rb")))
 
-            # Reset everything
-            self.resetScene()
+        except OSError as e:
+            print("OS ERROR: ", e.errno)
 
-            dumpDict = pickle.load(open(filename, "rb"))
+    def loadSceneFromDict(self, dumpDict, image=None, pyramidArrs=None):
 
-            # Image file name
-            self.setupBackgroundFromFile(dumpDict["Image"])
+        # Reset everything
+        self.resetScene()
 
-            # Axes   
-            self.__x0Real = dumpDict["x0"]
-            self.__x1Real = dumpDict["x1"]
-            self.__y0Real = dumpDict["y0"]
-            self.__y1Real = dumpDict["y1"]
-            self.__scaleX = dumpDict["scaleX"]
-            self.__scaleY = dumpDict["scaleY"]
+        # Image file name (image optionally decoded already)
+        self.setupBackgroundFromFile(dumpDict["Image"], image, pyramidArrs, dumpDict.get("ImagePage", 0))
+        self.setPreprocessing(dumpDict.get("Preprocessing", {}))
 
-            # Transform axes point scene coordinates to items 
-            self.trafo_coordsToItems_axesPoints(dumpDict["AxesPointItemsCoords"])
+        # Axes   
+        self.__x0Real = dumpDict["x0"]
+        self.__x1Real = dumpDict["x1"]
+        self.__y0Real = dumpDict["y0"]
+        self.__y1Real = dumpDict["y1"]
+        self.__scaleX = dumpDict["scaleX"]
+        self.__scaleY = dumpDict["scaleY"]
+        self.__dictCalibrationPoints = dumpDict.get("CalibrationPoints")
+        self.trafo_coordsToItems_calibrationPoints(self.__dictCalibrationPoints or {})
+        self.invalidateCalibration()
 
-            self.updateAxis()
+        # Transform axes point scene coordinates to items 
+        self.trafo_coordsToItems_axesPoints(dumpDict["AxesPointItemsCoords"])
 
-            # Transform data point scene coordinates to items 
-            self.trafo_coordsToItems_dataPoints(dumpDict["LinesOfDataPointsCoords"])
+        self.updateAxis()
 
-        except OSError as e:
-            print("OS ERROR: ", e.errno)
+        # Transform data point scene coordinates (lists or arrays) to items 
+        self.trafo_coordsToItems_dataPoints(dumpDict["LinesOfDataPointsCoords"])
 
-    def setupBackgroundFromFile(self, filepath):
+    def setupBackgroundFromFile(self, filepath, image=None, pyramidArrs=None, page=0):
 
         self.__backgroundFilepath = filepath
-        pixmap = QtGui.QPixmap(filepath)
-        self.__background = self.addPixmap(pixmap)
+        self.__backgroundPage = page
+        reader = background.openImageReader(filepath, page)
+        imageSize = reader.size()
+
+        # Large images: visible tiles only, sliced from the pyramid level matching the zoom
+        if (imageSize.width() * imageSize.height() >= background.TILED_MIN_PIXELS):
+            if (pyramidArrs is None):
+                pyramidArrs = loader.decodeBackgroundImage(filepath, page=page)[1]
+
+            self.__background = background.DDTiledImageItem(pyramidArrs)
+            self.addItem(self.__background)
+        else:
+            self.__backgroundImage = reader.read() if (image is None) else image
+            pixmap = QtGui.QPixmap.fromImage(self.__backgroundImage)
+            self.__preprocessedCache.put(preprocessing.calcParamsKey({}), (pixmap, None),
+                                         4 * pixmap.width() * pixmap.height())
+            self.__background = self.addPixmap(pixmap)
+
+    def getBackgroundPage(self):
+
+        return self.__backgroundPage
+
+    def getBackgroundPixels(self):
+        """Pixels of the background image as decoded (without preprocessing).
+
+        Returns
+        -------
+        out : numpy-array
+            RGBA pixels, shape (H, W, 4), dtype uint8; memory-mapped for tiled backgrounds, None without
+            background.
+        """
+
+        if isinstance(self.__background, background.DDTiledImageItem):
+            return self.__background.getPyramidArrs()[0]
+
+        if (self.__backgroundArr is None) and not (self.__backgroundImage is None):
+            self.__backgroundArr = background.imageToArr(self.__backgroundImage)
+
+        return self.__backgroundArr
+
+    def isBackgroundTiled(self):
+
+        return isinstance(self.__background, background.DDTiledImageItem)
+
+    def getAnalysisPixels(self):
+        """Pixels of the background image as shown (preprocessed), analysed by color picking, extraction, tracing,
+        marker and axis detection, so their results lie on the image the user clicks on.
+
+        Returns
+        -------
+        out : numpy-array
+            RGBA pixels, shape (H, W, 4), dtype uint8; see :meth:`getBackgroundPixels`.
+        """
+
+        if (self.__preprocessedArr is None):
+            return self.getBackgroundPixels()
+
+        return self.__preprocessedArr
+
+    def getBackgroundColor(self, mousePos):
+
+        pixelArr = self.getAnalysisPixels()
+        (col, row) = (int(numpy.floor(mousePos.x())), int(numpy.floor(mousePos.y())))
+
+        if (pixelArr is None) or not ((0 <= row < pixelArr.shape[0]) and (0 <= col < pixelArr.shape[1])):
+            return None
+
+        return tuple(int(val) for val in pixelArr[row, col, :3])
+
+    def getPlotAreaRect(self):
+        """Plot area: rectangle spanned by the axes reference points.
+
+        Returns
+        -------
+        out : tuple
+            (left, top, right, bottom) in scene coordinates, None if the axes points are not complete.
+        """
+
+        if not self.isAxisPointItemsComplete():
+            return None
+
+        xArr = numpy.array([self.buildAxesPointVec(opMode)[0] for opMode in (
+            DDGraphicsScene.OPERATION_MODES.OP_AXIS_X0, DDGraphicsScene.OPERATION_MODES.OP_AXIS_X1)])
+        yArr = numpy.array([self.buildAxesPointVec(opMode)[1] for opMode in (
+            DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y0, DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y1)])
+
+        return (xArr.min(), yArr.min(), xArr.max(), yArr.max())
+
+    def getPreprocessing(self):
+
+        return dict(self.__dictPreprocessing)
+
+    def setPreprocessing(self, dictParams):
+        """Show and analyse the background image preprocessed. Results are memoized per parameters, so switching
+        between parameters used before is instant. Tiled backgrounds are shown as decoded.
+
+        Parameters
+        ----------
+        dictParams : dict
+            Parameters {step: value}, see :class:`preprocessing.PREPROCESSING_STEPS` (empty: no preprocessing).
+        """
+
+        self.__dictPreprocessing = dict(dictParams)
+
+        if (self.__backgroundImage is None):
+            return
+
+        key = preprocessing.calcParamsKey(self.__dictPreprocessing)
+        preprocessed = self.__preprocessedCache.get(key)
+
+        if (preprocessed is None):
+            pixelArr = preprocessing.preprocessImage(self.getBackgroundPixels(), self.__dictPreprocessing)
+            pixmap = QtGui.QPixmap.fromImage(background.arrToImage(pixelArr))
+            preprocessed = (pixmap, None if (pixelArr is self.getBackgroundPixels()) else pixelArr)
+            self.__preprocessedCache.put(key, preprocessed, 4 * pixmap.width() * pixmap.height() + (
+                0 if (preprocessed[1] is None) else pixelArr.nbytes))
+
+        (pixmap, self.__preprocessedArr) = preprocessed
+        self.__background.setPixmap(pixmap)
+
+    def estimateBackgroundSkew(self):
+        """Rotation deskewing the background image, see :func:`preprocessing.estimateSkewAngle`.
+
+        Returns
+        -------
+        out : float
+            Angle in degrees, 0.0 for tiled backgrounds.
+        """
+
+        pixelArr = self.getBackgroundPixels()
+
+        return 0.0 if (pixelArr is None) else preprocessing.estimateSkewAngle(pixelArr)
+
+    def setBackgroundCacheBudget(self, budget):
+
+        if isinstance(self.__background, background.DDTiledImageItem):
+            self.__background.setTileCacheBudget(budget)
 
     def trafo_itemsToCoords_axesPoints(self):
 
@@ -276,90 +545,375 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
             item.setPos(QtCore.QPointF(x, y))
             self.__dictAxesPointItems[opMode] = item
 
+        self.invalidateCalibration()
+
     def trafo_itemsToCoords_dataPoints(self):
 
         dictLinesOfDataPoints_coords = {}
 
         for absName in self.__dictLinesOfDataPoints.keys():
-            dictLinesOfDataPoints_coords[absName] = []
-            for item in self.__dictLinesOfDataPoints[absName]:
-                itemPos = item.scenePos()
-                (x, y) = (itemPos.x(), itemPos.y())
-                dictLinesOfDataPoints_coords[absName].append((x, y))
+            coordsArr = self.__dictLinesOfDataPoints[absName].getPointArray().getCoords()
+            dictLinesOfDataPoints_coords[absName] = [(x, y) for (x, y) in coordsArr.tolist()]
 
         return dictLinesOfDataPoints_coords
 
+    def trafo_itemsToArr_dataPoints(self, nameSingleLine):
+
+        return self.__dictLinesOfDataPoints[nameSingleLine].getPointArray().getCoords().copy()
+
     def trafo_coordsToItems_dataPoints(self, dictLinesOfDataPoints_coords):
 
         self.__dictLinesOfDataPoints = {}
+        self.__namesVisibleLines = set()
 
         for absName in dictLinesOfDataPoints_coords.keys():
 
-            self.__dictLinesOfDataPoints[absName] = []
+            item = self.createDataPointsItem(absName)
+            item.setCoords(numpy.array(dictLinesOfDataPoints_coords[absName], dtype=float).reshape(-1, 2))
+
+    def createDataPointsItem(self, nameSingleLine):
+
+        # One item per data set: showing, hiding and restyling a set is a single operation on it
+        item = graphitems.DDDataPointsItem(DDGraphicsScene.BASITEM_POINT, DDGraphicsScene.PEN_POINT)
+        self.addItem(item)
+
+        self.__dictLinesOfDataPoints[nameSingleLine] = item
+        self.__namesVisibleLines.add(nameSingleLine)
 
-            for (x, y) in dictLinesOfDataPoints_coords[absName]:
-                item = self.addEllipse(DDGraphicsScene.BASITEM_POINT, DDGraphicsScene.PEN_POINT)
-                item.setPos(QtCore.QPointF(x, y))
-                self.__dictLinesOfDataPoints[absName].append(item)
+        return item
 
     def newLineOfDataPoints(self, nameSingleLine):
 
         self.__nameCurrentSingleLine = nameSingleLine
 
-        # Empty list
-        self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine] = []
+        # Empty data point array
+        self.createDataPointsItem(nameSingleLine)
 
     def removeLineOfDataPoints(self, nameSingleLine):
 
         if ((len(nameSingleLine) > 0) and (nameSingleLine in self.__dictLinesOfDataPoints.keys())):
 
-            # Remove all corresponding items from scene
-            for item in self.__dictLinesOfDataPoints[nameSingleLine]:
-                self.removeItem(item)
+            pointArray = self.__dictLinesOfDataPoints[nameSingleLine].getPointArray()
+            self.__history.push((history.CHANGE_REMOVE_LINE, nameSingleLine, pointArray.getPointIds().copy(),
+                                 pointArray.getCoords().copy()))
+
+            # Remove corresponding item from scene
+            self.removeItem(self.__dictLinesOfDataPoints[nameSingleLine])
 
             self.__dictLinesOfDataPoints.pop(nameSingleLine)
+            self.__namesVisibleLines.discard(nameSingleLine)
             self.__nameCurrentSingleLine = None
 
     def showLineOfDataPoints(self, nameSingleLine):
 
         if ((len(nameSingleLine) > 0) and (nameSingleLine in self.__dictLinesOfDataPoints.keys())):
 
-            # hide all others
-            for absName in self.__dictLinesOfDataPoints.keys():
-                for item in self.__dictLinesOfDataPoints[absName]:
-                    item.setVisible(False)
+            # hide all others (only the shown ones have to be touched)
+            for absName in self.__namesVisibleLines - {nameSingleLine}:
+                self.__dictLinesOfDataPoints[absName].setVisible(False)
 
             # show respective line
-            for item in self.__dictLinesOfDataPoints[nameSingleLine]:
-                item.setVisible(True)
+            self.__dictLinesOfDataPoints[nameSingleLine].setVisible(True)
+            self.__namesVisibleLines = {nameSingleLine}
 
     def showAllLinesOfDataPoints(self):
 
-        for absName in self.__dictLinesOfDataPoints.keys():
-            for item in self.__dictLinesOfDataPoints[absName]:
-                item.setVisible(True)
+        for absName in self.__dictLinesOfDataPoints.keys() - self.__namesVisibleLines:
+            self.__dictLinesOfDataPoints[absName].setVisible(True)
+
+        self.__namesVisibleLines = set(self.__dictLinesOfDataPoints.keys())
+
+    def getNamesVisibleLinesOfDataPoints(self):
+
+        return sorted(self.__namesVisibleLines)
+
+    def setPenLineOfDataPoints(self, nameSingleLine, pen):
+
+        if (nameSingleLine in self.__dictLinesOfDataPoints.keys()):
+            self.__dictLinesOfDataPoints[nameSingleLine].setPen(pen)
 
     def addDataPoint(self, mousePos):
 
         if (self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_DATA and not (
                 self.__nameCurrentSingleLine is None)):
-            item = self.addEllipse(DDGraphicsScene.BASITEM_POINT, DDGraphicsScene.PEN_POINT)
-            item.setPos(mousePos)
-            self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine].append(item)
+            pointId = self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine].addPoint(mousePos.x(), mousePos.y())
+            self.__history.push((history.CHANGE_ADD_POINTS, self.__nameCurrentSingleLine, numpy.array([pointId]),
+                                 numpy.array([[mousePos.x(), mousePos.y()]])))
+
+    def addDataPoints(self, coordsArr, nameSingleLine=None):
+        """Bulk insert of data points, recorded as one change.
+
+        Parameters
+        ----------
+        coordsArr : numpy-array
+            Scene coordinates, shape (N, 2).
+        nameSingleLine : str
+            Data set (None: current data set).
+
+        Returns
+        -------
+        out : numpy-array
+            Ids of the added points (empty if the data set does not exist).
+        """
+
+        if (nameSingleLine is None):
+            nameSingleLine = self.__nameCurrentSingleLine
+
+        coordsArr = numpy.asarray(coordsArr, dtype=float).reshape(-1, 2)
+
+        if (len(coordsArr) == 0) or not (nameSingleLine in self.__dictLinesOfDataPoints.keys()):
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        pointIds = self.__dictLinesOfDataPoints[nameSingleLine].addPoints(coordsArr)
+        self.__history.push((history.CHANGE_ADD_POINTS, nameSingleLine, pointIds, coordsArr.copy()))
+
+        return pointIds
+
+    def extractDataPointsByColor(self, color, tolerance=extraction.EXTRACT_COLOR_TOLERANCE):
+        """Extract the curve drawn in a color (within the plot area) into the current data set.
+
+        Parameters
+        ----------
+        color : tuple
+            (r, g, b) of the curve.
+        tolerance : float
+            Maximum RGB distance of curve pixels to the color.
+
+        Returns
+        -------
+        out : int
+            Number of added points.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+
+        if (pixelArr is None) or (self.__nameCurrentSingleLine is None):
+            return 0
+
+        extractionPipeline = self.getExtractionPipeline()
+
+        if not (extractionPipeline is None):
+            coordsArr = extractionPipeline.getPoints(self.getPlotAreaRect(), color, tolerance)
+        else:
+            # column bands: the runs of a column are never split at a seam
+            kernel = functools.partial(extraction.extractColorCurve, pixelArr, color, tolerance)
+            coordsArr = self.__analysisExecutor.mapPoints(kernel, pixelArr.shape[1], pixelArr.shape[0],
+                                                          self.getPlotAreaRect(), isColumnBands=True)
+
+        return len(self.addDataPoints(coordsArr))
+
+    def proposeCurveColors(self, numCurves):
+        """Colors of the curves (within the plot area), see :func:`clustering.proposeCurveColors`.
+
+        Parameters
+        ----------
+        numCurves : int
+            Number of curves.
+
+        Returns
+        -------
+        out : list
+            (r, g, b) per curve, most frequent first; empty for tiled backgrounds.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+
+        if (pixelArr is None):
+            return []
+
+        return clustering.proposeCurveColors(pixelArr, numCurves, self.getPlotAreaRect())
+
+    def extractDataPointsByColors(self, colorList, nameList, tolerance=extraction.EXTRACT_COLOR_TOLERANCE):
+        """Extract the curves drawn in several colors (within the plot area) at once, each into a data set.
+
+        Parameters
+        ----------
+        colorList : list
+            (r, g, b) per curve.
+        nameList : list
+            Name of the (existing) data set per curve.
+        tolerance : float
+            Maximum RGB distance of curve pixels to the color.
+
+        Returns
+        -------
+        out : list
+            Number of added points per curve.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+
+        if (pixelArr is None):
+            return [0] * len(nameList)
+
+        kernel = functools.partial(extraction.extractColorCurves, pixelArr, colorList, tolerance)
+        coordsList = self.__analysisExecutor.mapPoints(kernel, pixelArr.shape[1], pixelArr.shape[0],
+                                                       self.getPlotAreaRect(), isColumnBands=True,
+                                                       numResults=len(colorList))
+
+        return [len(self.addDataPoints(coordsArr, nameSingleLine))
+                for (coordsArr, nameSingleLine) in zip(coordsList, nameList)]
+
+    def traceDataPointsFromSeed(self, x, y, tolerance=extraction.EXTRACT_COLOR_TOLERANCE, arcStep=None):
+        """Trace the curve through a seed point (within the plot area) into the current data set.
+
+        Parameters
+        ----------
+        x, y : float
+            Seed point on the curve (scene coordinates), the curve color is taken from there.
+        tolerance : float
+            Maximum RGB distance of curve pixels to the color.
+        arcStep : float
+            Distance of the points along the curve (None: one point per column).
+
+        Returns
+        -------
+        out : int
+            Number of added points.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+        rect = self.getPlotAreaRect()
+
+        if (pixelArr is None) or (self.__nameCurrentSingleLine is None):
+            return 0
+
+        # seeds outside the plot area (e.g. on the axis labels) are ignored
+        if not (rect is None) and not ((rect[0] <= x <= rect[2]) and (rect[1] <= y <= rect[3])):
+            return 0
+
+        extractionPipeline = self.getExtractionPipeline()
+
+        if not (extractionPipeline is None):
+            coordsArr = extractionPipeline.traceCurve((x, y), tolerance, rect, arcStep)
+        else:
+            coordsArr = extraction.traceColorCurve(pixelArr, (x, y), tolerance, rect, arcStep)
+
+        return len(self.addDataPoints(coordsArr))
+
+    def getExtractionPipeline(self):
+        """Staged color extraction of the analysed background pixels, see :class:`pipeline.DDExtractionPipeline`.
 
-    def removeDataPoint(self, item):
+        Returns
+        -------
+        out : DDExtractionPipeline
+            Pipeline, None without background or if the plot area is too large for caching.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+
+        if (pixelArr is None):
+            return None
+
+        self.__extractionPipeline.setPixels(pixelArr)
+
+        if not self.__extractionPipeline.isCacheable(self.getPlotAreaRect()):
+            return None
+
+        return self.__extractionPipeline
+
+    def previewColorMask(self, color, tolerance=extraction.EXTRACT_COLOR_TOLERANCE):
+        """Highlight the pixels (within the plot area) an extraction by color would use, e.g. while the tolerance is
+        adjusted; only the changed stages of the extraction are recomputed.
+
+        Parameters
+        ----------
+        color : tuple
+            (r, g, b) of the curve.
+        tolerance : float
+            Maximum RGB distance of curve pixels to the color.
+
+        Returns
+        -------
+        out : bool
+            Whether the preview is shown (not for plot areas too large for caching).
+        """
+
+        extractionPipeline = self.getExtractionPipeline()
+
+        if (extractionPipeline is None):
+            self.clearColorMaskPreview()
+            return False
+
+        rect = self.getPlotAreaRect()
+        maskArr = extractionPipeline.getMask(rect, color, tolerance)
+        (col0, row0, _, _) = extractionPipeline.calcPixelRect(rect)
+
+        if (self.__previewItem is None):
+            self.__previewItem = self.addPixmap(QtGui.QPixmap())
+
+        pixmap = QtGui.QPixmap.fromImage(background.maskToImage(maskArr, DDGraphicsScene.PREVIEW_MASK_RGBA))
+        self.__previewItem.setPixmap(pixmap)
+        self.__previewItem.setOffset(col0, row0)
+
+        return True
+
+    def clearColorMaskPreview(self):
+
+        if not (self.__previewItem is None):
+            self.removeItem(self.__previewItem)
+
+        self.__previewItem = None
+
+    def detectMarkers(self, rect, threshold=matching.MATCH_THRESHOLD):
+        """Detect all markers matching a boxed one (within the plot area), their centers into the current data set.
+
+        Parameters
+        ----------
+        rect : tuple
+            (left, top, right, bottom) of the boxed marker (scene coordinates).
+        threshold : float
+            Minimum normalized cross-correlation of a marker with the boxed one.
+
+        Returns
+        -------
+        out : int
+            Number of added points.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+
+        if (pixelArr is None) or (self.__nameCurrentSingleLine is None):
+            return 0
+
+        # tiles overlap by twice the marker size, so each marker lies wholly within the tile owning its center
+        (left, top, right, bottom) = rect
+        size = math.ceil(max(right - left, bottom - top))
+        kernel = functools.partial(matching.findMarkers, pixelArr, rect, threshold, withScores=True)
+        coordsArr = self.__analysisExecutor.mapPoints(kernel, pixelArr.shape[1], pixelArr.shape[0],
+                                                      self.getPlotAreaRect(), overlap=2 * size,
+                                                      minDistance=max(1.0, min(right - left, bottom - top) / 2.0),
+                                                      hasScores=True)
+
+        return len(self.addDataPoints(coordsArr))
+
+    def findDataPoint(self, mousePos):
 
         if (self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_DATA and not (
                 self.__nameCurrentSingleLine is None)):
+            return self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine].findPoint(mousePos.x(), mousePos.y(),
+                                                                                        self.__pickTolerance)
 
-            if (item in self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine]):
-                self.removeItem(item)
-                self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine].remove(item)
+        return None
+
+    def removeDataPoint(self, slotDataPoint):
+
+        if (self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_DATA and not (
+                self.__nameCurrentSingleLine is None)):
+            item = self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine]
+            pointArray = item.getPointArray()
+            self.__history.push((history.CHANGE_REMOVE_POINTS, self.__nameCurrentSingleLine,
+                                 numpy.array([pointArray.getSlotPointId(slotDataPoint)]),
+                                 numpy.array([pointArray.getSlotCoords(slotDataPoint)])))
+
+            item.removeSlots([slotDataPoint])
 
     def addAxisPoint(self, mousePos):
 
         if (self.__operationMode in DDGraphicsScene.BASITEMS_AXES.keys()):
 
+            dictAxesPointsBefore = self.trafo_itemsToCoords_axesPoints()
+
             # remove old item if present
             if (self.__operationMode in self.__dictAxesPointItems.keys()):
                 item = self.__dictAxesPointItems[self.__operationMode]
@@ -373,6 +927,10 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
             self.__dictAxesPointItems[self.__operationMode] = item
             self.__operationMode = self.__operationMode + 1  # internal delete mode
             self.updateAxis()
+            self.invalidateCalibration()
+
+            self.__history.push((history.CHANGE_AXES_POINTS, dictAxesPointsBefore,
+                                 self.trafo_itemsToCoords_axesPoints()))
 
     def removeAxisPoint(self, item):
 
@@ -380,13 +938,23 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
                 self.__operationMode - 1) in self.__dictAxesPointItems.keys()):
 
             if (item == self.__dictAxesPointItems[self.__operationMode - 1]):
+                dictAxesPointsBefore = self.trafo_itemsToCoords_axesPoints()
+
                 self.removeItem(item)
                 self.__dictAxesPointItems.pop(self.__operationMode - 1)
                 self.__operationMode = self.__operationMode - 1  # internal add mode
                 self.updateAxis()
+                self.invalidateCalibration()
+
+                self.__history.push((history.CHANGE_AXES_POINTS, dictAxesPointsBefore,
+                                     self.trafo_itemsToCoords_axesPoints()))
 
     def removeAllAxisPoints(self):
 
+        dictAxesPointsBefore = self.trafo_itemsToCoords_axesPoints()
+        if (len(dictAxesPointsBefore) > 0):
+            self.__history.push((history.CHANGE_AXES_POINTS, dictAxesPointsBefore, {}))
+
         for opMode in DDGraphicsScene.BASITEMS_AXES.keys():
 
             if (opMode in self.__dictAxesPointItems.keys()):
@@ -396,6 +964,65 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
         self.__operationMode = DDGraphicsScene.OPERATION_MODES.OP_WATCH
         self.updateAxis()
+        self.invalidateCalibration()
+
+    def restoreAxesPoints(self, dictAxesPointItems_coords):
+
+        for item in self.__dictAxesPointItems.values():
+            self.removeItem(item)
+
+        self.trafo_coordsToItems_axesPoints(dictAxesPointItems_coords)
+        self.updateAxis()
+
+        # keep add/delete mode of an axis point consistent with its presence
+        if (self.__operationMode in DDGraphicsScene.BASITEMS_DEL_AXES):
+            opModeAdd = self.__operationMode - 1
+        elif (self.__operationMode in DDGraphicsScene.BASITEMS_AXES.keys()):
+            opModeAdd = self.__operationMode
+        else:
+            return
+
+        if (opModeAdd in self.__dictAxesPointItems.keys()):
+            self.__operationMode = opModeAdd + 1  # internal delete mode
+        else:
+            self.__operationMode = opModeAdd
+
+    def setAxesPoints(self, dictAxesPointItems_coords):
+        """Replace all axes reference points (one undoable change).
+
+        Parameters
+        ----------
+        dictAxesPointItems_coords : dict
+            {operation mode (OP_AXIS_*): (x, y)} in scene coordinates.
+        """
+
+        dictAxesPointsBefore = self.trafo_itemsToCoords_axesPoints()
+
+        self.restoreAxesPoints(dictAxesPointItems_coords)
+
+        self.__history.push((history.CHANGE_AXES_POINTS, dictAxesPointsBefore,
+                             self.trafo_itemsToCoords_axesPoints()))
+
+    def detectAxesPoints(self):
+        """Proposal of the axes reference points from the axis lines in the background image,
+        see :func:`axisdetection.detectAxesPoints`.
+
+        Returns
+        -------
+        out : dict
+            {operation mode (OP_AXIS_*): (x, y)} in scene coordinates, None if no axes are found.
+        """
+
+        pixelArr = self.getAnalysisPixels()
+        dictPoints = None if (pixelArr is None) else axisdetection.detectAxesPoints(pixelArr)
+
+        if (dictPoints is None):
+            return None
+
+        return {DDGraphicsScene.OPERATION_MODES.OP_AXIS_X0: dictPoints["X0"],
+                DDGraphicsScene.OPERATION_MODES.OP_AXIS_X1: dictPoints["X1"],
+                DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y0: dictPoints["Y0"],
+                DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y1: dictPoints["Y1"]}
 
     def updateAxis(self):
 
@@ -424,6 +1051,274 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
                 self.removeItem(self.__dictAxesItems[axis])
                 self.__dictAxesItems.pop(axis)
 
+    def setOverlayRealCoords(self, realCoordsArr):
+
+        if (self.__overlayItem is None):
+            self.__overlayItem = graphitems.DDOverlayItem()
+            self.addItem(self.__overlayItem)
+
+        self.__overlayRealCoords = numpy.asarray(realCoordsArr, dtype=float).reshape(-1, 2)
+        self.updateOverlay()
+
+    def clearOverlay(self):
+
+        if not (self.__overlayItem is None):
+            self.removeItem(self.__overlayItem)
+
+        self.__overlayItem = None
+        self.__overlayRealCoords = None
+
+    def updateOverlay(self):
+
+        if (self.__overlayItem is None):
+            return
+
+        axesCalibration = self.getCalibration()
+
+        if (axesCalibration is None):
+            self.__overlayItem.setVisible(False)
+            return
+
+        try:
+            self.__overlayItem.setCoords(axesCalibration.calculateSceneCoordinatesArr(self.__overlayRealCoords))
+            self.__overlayItem.setVisible(True)
+        except ValueError as e:
+            self.__overlayItem.setVisible(False)
+            print(str(e))
+
+    def setHistoryDepth(self, depth):
+
+        self.__history.setMaxDepth(depth)
+
+    def getHistoryDepth(self):
+
+        return self.__history.getMaxDepth()
+
+    def canUndo(self):
+
+        return self.__history.canUndo()
+
+    def canRedo(self):
+
+        return self.__history.canRedo()
+
+    def undo(self):
+
+        change = self.__history.undo()
+
+        if not (change is None):
+            self.applyChange(change, True)
+
+    def redo(self):
+
+        change = self.__history.redo()
+
+        if not (change is None):
+            self.applyChange(change, False)
+
+    def applyChange(self, change, isRevert):
+        """Apply or revert a recorded change (see history.CHANGE_*), without recording it again.
+        """
+
+        changeType = change[0]
+
+        if (changeType == history.CHANGE_AXES_POINTS):
+            (dictAxesPointsBefore, dictAxesPointsAfter) = change[1:]
+            self.restoreAxesPoints(dictAxesPointsBefore if isRevert else dictAxesPointsAfter)
+            return
+
+        if (changeType == history.CHANGE_TRANSFER_POINTS):
+            (nameSource, nameTarget, pointIds, coordsArr) = change[1:]
+            if isRevert:
+                (nameSource, nameTarget) = (nameTarget, nameSource)
+
+            if ((nameSource in self.__dictLinesOfDataPoints.keys()) and (
+                    nameTarget in self.__dictLinesOfDataPoints.keys())):
+                self.__dictLinesOfDataPoints[nameSource].removePoints(pointIds)
+                self.__dictLinesOfDataPoints[nameTarget].restorePoints(coordsArr, pointIds)
+            return
+
+        if (changeType == history.CHANGE_MOVE_POINTS):
+            (nameSingleLine, pointIds, coordsBefore, coordsAfter) = change[1:]
+
+            if (nameSingleLine in self.__dictLinesOfDataPoints.keys()):
+                self.__dictLinesOfDataPoints[nameSingleLine].setPointsCoords(pointIds,
+                                                                            coordsBefore if isRevert else coordsAfter)
+            return
+
+        (nameSingleLine, pointIds, coordsArr) = change[1:]
+
+        if (changeType == history.CHANGE_REMOVE_LINE):
+            # a set of the same name created meanwhile is replaced, not orphaned in the scene
+            if (nameSingleLine in self.__dictLinesOfDataPoints.keys()):
+                self.removeItem(self.__dictLinesOfDataPoints[nameSingleLine])
+
+            if isRevert:
+                item = self.createDataPointsItem(nameSingleLine)
+                item.setCoords(coordsArr, pointIds)
+                self.__nameCurrentSingleLine = nameSingleLine
+                self.showLineOfDataPoints(nameSingleLine)
+            elif (nameSingleLine in self.__dictLinesOfDataPoints.keys()):
+                self.__dictLinesOfDataPoints.pop(nameSingleLine)
+                self.__namesVisibleLines.discard(nameSingleLine)
+                if (self.__nameCurrentSingleLine == nameSingleLine):
+                    self.__nameCurrentSingleLine = None
+
+            self.dataSetsChangedSignal.emit()
+            return
+
+        if not (nameSingleLine in self.__dictLinesOfDataPoints.keys()):
+            return
+
+        item = self.__dictLinesOfDataPoints[nameSingleLine]
+
+        if ((changeType == history.CHANGE_ADD_POINTS) != isRevert):
+            item.restorePoints(coordsArr, pointIds)
+        else:
+            item.removePoints(pointIds)
+
+    def getSelectionShape(self):
+
+        return self.__selectionShape
+
+    def setSelectionShape(self, shape):
+
+        self.__selectionShape = shape
+
+    def getCurrentDataPointsItem(self):
+
+        if (self.__nameCurrentSingleLine in self.__dictLinesOfDataPoints.keys()):
+            return self.__dictLinesOfDataPoints[self.__nameCurrentSingleLine]
+
+        return None
+
+    def startSelectionBand(self, mousePos):
+
+        self.__selectionBandPath = [(mousePos.x(), mousePos.y())]
+        self.__selectionBandItem = self.addPath(QtGui.QPainterPath(), DDGraphicsScene.PEN_SELECTION)
+
+    def updateSelectionBand(self, mousePos):
+
+        if (self.__selectionShape == DDGraphicsScene.SELECTION_SHAPES.SEL_LASSO):
+            self.__selectionBandPath.append((mousePos.x(), mousePos.y()))
+        else:
+            self.__selectionBandPath = self.__selectionBandPath[:1] + [(mousePos.x(), mousePos.y())]
+
+        self.__selectionBandItem.setPath(self.buildSelectionPath())
+
+    def finishSelectionBand(self, isAdding):
+
+        polygonArr = self.buildSelectionPolygon()
+
+        self.removeItem(self.__selectionBandItem)
+        self.__selectionBandItem = None
+        self.__selectionBandPath = []
+
+        self.selectDataPointsInPolygon(polygonArr, isAdding)
+
+    def finishMarkerBand(self):
+
+        polygonArr = self.buildSelectionPolygon()
+
+        self.removeItem(self.__selectionBandItem)
+        self.__selectionBandItem = None
+        self.__selectionBandPath = []
+
+        # one box per activation, then back to data mode
+        self.__operationMode = DDGraphicsScene.OPERATION_MODES.OP_DATA
+        if (len(polygonArr) > 1):
+            self.markerBoxedSignal.emit(*polygonArr.min(axis=0), *polygonArr.max(axis=0))
+
+    def buildSelectionPolygon(self):
+
+        pathArr = numpy.array(self.__selectionBandPath, dtype=float).reshape(-1, 2)
+
+        isRect = ((self.__selectionShape == DDGraphicsScene.SELECTION_SHAPES.SEL_RECT) or
+                  (self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_MARKER))
+
+        if isRect and (len(pathArr) > 1):
+            ((x0, y0), (x1, y1)) = (pathArr[0], pathArr[-1])
+            pathArr = numpy.array([(x0, y0), (x1, y0), (x1, y1), (x0, y1)])
+
+        return pathArr
+
+    def buildSelectionPath(self):
+
+        path = QtGui.QPainterPath()
+        path.addPolygon(graphitems.arrToPolygonF(self.buildSelectionPolygon()))
+        path.closeSubpath()
+
+        return path
+
+    def selectDataPointsInPolygon(self, polygonArr, isAdding=False):
+
+        item = self.getCurrentDataPointsItem()
+
+        if not (item is None):
+            pointIds = item.getPointArray().findPointsInPolygon(polygonArr)
+
+            if isAdding:
+                pointIds = numpy.union1d(item.getSelectedPoints(), pointIds)
+
+            item.setSelectedPoints(pointIds)
+
+    def clearDataPointSelection(self):
+
+        item = self.getCurrentDataPointsItem()
+
+        if not (item is None):
+            item.setSelectedPoints([])
+
+    def getSelectedDataPointIds(self):
+
+        item = self.getCurrentDataPointsItem()
+
+        if (item is None):
+            return numpy.zeros(0, dtype=numpy.int64)
+
+        return item.getSelectedPoints()
+
+    def removeSelectedDataPoints(self):
+
+        pointIds = self.getSelectedDataPointIds()
+
+        if (len(pointIds) > 0):
+            item = self.getCurrentDataPointsItem()
+            self.__history.push((history.CHANGE_REMOVE_POINTS, self.__nameCurrentSingleLine, pointIds,
+                                 item.getPointArray().getPointsCoords(pointIds)))
+
+            item.removePoints(pointIds)
+            item.setSelectedPoints([])
+
+    def translateSelectedDataPoints(self, dx, dy):
+
+        pointIds = self.getSelectedDataPointIds()
+
+        if (len(pointIds) > 0):
+            item = self.getCurrentDataPointsItem()
+            coordsBefore = item.getPointArray().getPointsCoords(pointIds)
+            coordsAfter = coordsBefore + numpy.array([dx, dy])
+            self.__history.push((history.CHANGE_MOVE_POINTS, self.__nameCurrentSingleLine, pointIds, coordsBefore,
+                                 coordsAfter))
+
+            item.setPointsCoords(pointIds, coordsAfter)
+
+    def moveSelectedDataPointsToLine(self, nameTargetLine):
+
+        pointIds = self.getSelectedDataPointIds()
+
+        if ((len(pointIds) > 0) and (nameTargetLine in self.__dictLinesOfDataPoints.keys()) and (
+                nameTargetLine != self.__nameCurrentSingleLine)):
+            item = self.getCurrentDataPointsItem()
+            coordsArr = item.getPointArray().getPointsCoords(pointIds)
+            self.__history.push((history.CHANGE_TRANSFER_POINTS, self.__nameCurrentSingleLine, nameTargetLine,
+                                 pointIds, coordsArr))
+
+            # point ids are unique across data sets and are kept
+            item.removePoints(pointIds)
+            item.setSelectedPoints([])
+            self.__dictLinesOfDataPoints[nameTargetLine].restorePoints(coordsArr, pointIds)
+
     def mousePressEvent(self, event):
 
         QtWidgets.QGraphicsScene.mousePressEvent(self, event)
@@ -431,70 +1326,262 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
         mousePos = event.scenePos();
         item = self.itemAt(mousePos, QtGui.QTransform())
 
+        if ((self.__operationMode in (DDGraphicsScene.OPERATION_MODES.OP_SELECT,
+                                      DDGraphicsScene.OPERATION_MODES.OP_MARKER)) and (
+                event.button() == QtCore.Qt.LeftButton)):
+            self.startSelectionBand(mousePos)
+            return
+
+        if ((self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_PICK_COLOR) and (
+                event.button() == QtCore.Qt.LeftButton)):
+            color = self.getBackgroundColor(mousePos)
+
+            # one pick per activation, then back to data mode
+            self.__operationMode = DDGraphicsScene.OPERATION_MODES.OP_DATA
+            if not (color is None):
+                self.colorPickedSignal.emit(*color)
+            return
+
+        if ((self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_TRACE) and (
+                event.button() == QtCore.Qt.LeftButton)):
+
+            # one trace per activation, then back to data mode
+            self.__operationMode = DDGraphicsScene.OPERATION_MODES.OP_DATA
+            self.seedPickedSignal.emit(mousePos.x(), mousePos.y())
+            return
+
+        if ((self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_CALIBRATION) and (
+                event.button() == QtCore.Qt.LeftButton)):
+
+            # calibration points are picked until another mode is chosen
+            self.calibrationPointPickedSignal.emit(mousePos.x(), mousePos.y())
+            return
+
         if not (self.__background is None):
 
+            # data points are hit-tested on their coordinate arrays
+            slotDataPoint = self.findDataPoint(mousePos)
+
             if event.button() == QtCore.Qt.LeftButton:  # add
-                if (item is self.__background):
+                if ((item is self.__background) and (slotDataPoint is None)):
                     self.addAxisPoint(mousePos)
                     self.addDataPoint(mousePos)
 
             elif event.button() == QtCore.Qt.RightButton:  # remove
                 if not (item is self.__background):
                     self.removeAxisPoint(item)
-                    self.removeDataPoint(item)
+                if not (slotDataPoint is None):
+                    self.removeDataPoint(slotDataPoint)
 
     def mouseMoveEvent(self, event):
 
         QtWidgets.QGraphicsScene.mouseMoveEvent(self, event)
 
-        if (self.isAxisPointItemsComplete() and self.isAxisRealReady()):
+        if not (self.__selectionBandItem is None):
+            self.updateSelectionBand(event.scenePos())
 
-            realCoords = self.calculateRealCoordinates(event.scenePos())
+        # Keep latest position only, emit on timeout
+        self.__mouseScenePos = event.scenePos()
 
-            self.mouseMovedSignal.emit(str(realCoords[0]), str(realCoords[1]))
+        if not self.__mouseTimer.isActive():
+            self.__mouseTimer.start()
 
-        else:
-            self.mouseMovedSignal.emit("", "")
+    def mouseReleaseEvent(self, event):
 
-    def calculateRealCoordinates(self, mousePos):
+        QtWidgets.QGraphicsScene.mouseReleaseEvent(self, event)
 
-        # X axes vectors
-        XOvec_sc = self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_X0)
-        X1vec_sc = self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_X1)
-        (len_X0X1_sc, evec_X0X1_sc) = self.calcLenEvec(X1vec_sc - XOvec_sc)
+        if not (self.__selectionBandItem is None):
+            self.updateSelectionBand(event.scenePos())
 
-        # Y axes vectors
-        YOvec_sc = self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y0)
-        Y1vec_sc = self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y1)
-        (len_Y0Y1_sc, evec_Y0Y1_sc) = self.calcLenEvec(Y1vec_sc - YOvec_sc)
+            if (self.__operationMode == DDGraphicsScene.OPERATION_MODES.OP_MARKER):
+                self.finishMarkerBand()
+                return
 
-        # Mouse Vector
-        mouseVec_sc = self.buildPointVec(mousePos)
+            self.finishSelectionBand(bool(event.modifiers() & QtCore.Qt.ControlModifier))
 
-        # relative vector
-        mouseVec_sc_rel_X0 = mouseVec_sc - XOvec_sc
-        mouseVec_sc_rel_Y0 = mouseVec_sc - YOvec_sc
+            # one selection per activation, then back to data mode
+            self.__operationMode = DDGraphicsScene.OPERATION_MODES.OP_DATA
 
-        # projection
-        xProj_sc = numpy.dot(mouseVec_sc_rel_X0, evec_X0X1_sc)
-        yProj_sc = numpy.dot(mouseVec_sc_rel_Y0, evec_Y0Y1_sc)
+    @QtCore.pyqtSlot()
+    def emitMouseCoords(self):
+
+        axesCalibration = self.getCalibration()
+
+        if not ((axesCalibration is None) or (self.__mouseScenePos is None)):
+
+            realCoords = axesCalibration.calculateRealCoordinates(self.__mouseScenePos.x(), self.__mouseScenePos.y())
+
+            self.mouseMovedSignal.emit(float(realCoords[0]), float(realCoords[1]))
 
-        # scaling to real coordinates
-        if (self.__scaleX == DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_X):
-            scaleX = (self.__x1Real - self.__x0Real) / len_X0X1_sc
-            xReal = self.__x0Real + scaleX * xProj_sc
         else:
-            scaleX = (numpy.log(self.__x1Real) - numpy.log(self.__x0Real)) / len_X0X1_sc
-            xReal = numpy.exp(numpy.log(self.__x0Real) + scaleX * xProj_sc)
+            self.mouseMovedSignal.emit(numpy.nan, numpy.nan)
+
+    def invalidateCalibration(self):
+
+        self.__calibration = None
+        self.__calibrationError = None
+        self.updateOverlay()
+
+    def setCalibrationPoints(self, dictCalibrationPoints):
+
+        # Check fit before use
+        calibration.fitCalibrationPoints(dictCalibrationPoints,
+                                         self.__scaleX == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X,
+                                         self.__scaleY == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_Y)
+
+        self.__dictCalibrationPoints = dictCalibrationPoints
+        self.invalidateCalibration()
+
+    def clearCalibrationPoints(self):
+
+        for item in self.__calibrationPointItems:
+            self.removeItem(item)
+
+        self.__calibrationPointItems = []
+        self.__dictPickedCalibrationPoints = {}
+        self.__dictCalibrationPoints = None
+        self.invalidateCalibration()
+
+    def startCalibrationPoints(self, kind):
+        """Pick calibration points on the image (calibration point mode), see :func:`addCalibrationPoint`.
+
+        Parameters
+        ----------
+        kind : str
+            Reference points of the x or y axis or control points, see :class:`calibration.CALIBRATION_POINTS`.
+        """
+
+        self.__calibrationPointKind = kind
+        self.setOperationMode(DDGraphicsScene.OPERATION_MODES.OP_CALIBRATION)
+
+    def getCalibrationPointKind(self):
+
+        return self.__calibrationPointKind
+
+    def addCalibrationPoint(self, x, y, real):
+        """Add a picked calibration point of the current kind, it is marked on the image.
+
+        Parameters
+        ----------
+        x, y : float
+            Scene coordinates.
+        real : float or tuple
+            Real value on the axis (reference points) or real coordinates (x, y) (control points).
+        """
+
+        (coordsList, realList) = self.__dictPickedCalibrationPoints.setdefault(self.__calibrationPointKind, ([], []))
+        coordsList.append((x, y))
+        realList.append(real)
+
+        self.addCalibrationPointItem(x, y)
+
+    def addCalibrationPointItem(self, x, y):
 
-        if (self.__scaleY == DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_Y):
-            scaleY = (self.__y1Real - self.__y0Real) / len_Y0Y1_sc
-            yReal = self.__y0Real + scaleY * yProj_sc
+        (half, path) = (DDGraphicsScene.BASITEM_POINT_CONF["d"] / 2.0, QtGui.QPainterPath())
+        path.moveTo(-half, -half)
+        path.lineTo(half, half)
+        path.moveTo(-half, half)
+        path.lineTo(half, -half)
+
+        item = self.addPath(path, DDGraphicsScene.PEN_AXIS)
+        item.setPos(QtCore.QPointF(x, y))
+        self.__calibrationPointItems.append(item)
+
+    def getPickedCalibrationPoints(self):
+
+        return {kind: (list(coordsList), list(realList))
+                for (kind, (coordsList, realList)) in self.__dictPickedCalibrationPoints.items()}
+
+    def trafo_coordsToItems_calibrationPoints(self, dictCalibrationPoints):
+
+        for item in self.__calibrationPointItems:
+            self.removeItem(item)
+
+        self.__calibrationPointItems = []
+        self.__dictPickedCalibrationPoints = {}
+
+        for (kind, (scenePosArr, realArr)) in dictCalibrationPoints.items():
+            coordsList = [tuple(float(val) for val in pos) for pos in numpy.asarray(scenePosArr).reshape(-1, 2)]
+            realList = [tuple(real) if (kind == calibration.CALIBRATION_POINTS.POINTS_XY) else float(real)
+                        for real in numpy.asarray(realArr).tolist()]
+            self.__dictPickedCalibrationPoints[kind] = (coordsList, realList)
+            for (x, y) in coordsList:
+                self.addCalibrationPointItem(x, y)
+
+    def fitPickedCalibrationPoints(self):
+        """Fit the axes calibration to the picked calibration points: to the control points if there are any, else
+        to the reference points of both axes.
+
+        Returns
+        -------
+        out : DDAxesCalibration
+            Fitted calibration including residuals.
+        """
+
+        dictPicked = self.__dictPickedCalibrationPoints
+
+        if (calibration.CALIBRATION_POINTS.POINTS_XY in dictPicked):
+            kinds = (calibration.CALIBRATION_POINTS.POINTS_XY,)
         else:
-            scaleY = (numpy.log(self.__y1Real) - numpy.log(self.__y0Real)) / len_Y0Y1_sc
-            yReal = numpy.exp(numpy.log(self.__y0Real) + scaleY * yProj_sc)
+            kinds = (calibration.CALIBRATION_POINTS.POINTS_X, calibration.CALIBRATION_POINTS.POINTS_Y)
+            if not all(kind in dictPicked for kind in kinds):
+                raise ValueError("Reference points of both axes or control points are required.")
+
+        self.setCalibrationPoints({kind: (numpy.array(dictPicked[kind][0], dtype=float),
+                                          numpy.array(dictPicked[kind][1], dtype=float)) for kind in kinds})
+
+        return self.getCalibration()
+
+    def getCalibrationPoints(self):
+
+        return self.__dictCalibrationPoints
+
+    def getCalibration(self):
+
+        # built once per axes setup; a failure is reported once and not retried until the axes change
+        if not ((self.__calibration is None) and (self.__calibrationError is None)):
+            return self.__calibration
+
+        try:
+            if not (self.__dictCalibrationPoints is None):
+
+                self.__calibration = calibration.fitCalibrationPoints(
+                    self.__dictCalibrationPoints,
+                    self.__scaleX == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X,
+                    self.__scaleY == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_Y)
+
+            elif (self.isAxisPointItemsComplete() and self.isAxisRealReady()):
+
+                self.__calibration = calibration.buildAxesCalibration(
+                    self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_X0),
+                    self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_X1),
+                    self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y0),
+                    self.buildAxesPointVec(DDGraphicsScene.OPERATION_MODES.OP_AXIS_Y1),
+                    self.__x0Real, self.__x1Real, self.__y0Real, self.__y1Real,
+                    self.__scaleX == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X,
+                    self.__scaleY == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_Y)
 
-        return (xReal, yReal)
+        except ValueError as e:
+            self.__calibrationError = str(e)
+            print(self.__calibrationError)
+
+        return self.__calibration
+
+    def getCalibrationError(self):
+
+        return self.__calibrationError
+
+    def calculateRealCoordinates(self, mousePos):
+
+        return self.getCalibration().calculateRealCoordinates(mousePos.x(), mousePos.y())
+
+    def calculateRealCoordinatesArr(self, scenePosArr):
+
+        return self.getCalibration().calculateRealCoordinatesArr(scenePosArr)
+
+    def calculateSceneCoordinatesArr(self, realCoordsArr):
+
+        return self.getCalibration().calculateSceneCoordinatesArr(realCoordsArr)
 
     def buildAxesPointVec(self, opMode):
 
@@ -504,33 +1591,18 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
         return numpy.array([scrPos.x(), scrPos.y()])
 
-    def calcLenEvec(self, vec):
-
-        len_vec = numpy.sqrt(numpy.dot(vec, vec))
-        evec = vec / len_vec
-
-        return (len_vec, evec)
-
     def determineDataPointsRealCoords(self):
 
         dictRealCoords = {}
 
-        if (self.isAxisPointItemsComplete() and self.isAxisRealReady()):
-
-            for nameSingleLine in self.__dictLinesOfDataPoints.keys():
-
-                numItems = len(self.__dictLinesOfDataPoints[nameSingleLine])
-                dictRealCoords[nameSingleLine] = numpy.zeros((numItems, 2))
+        axesCalibration = self.getCalibration()
 
-                ii = -1
-                for item in self.__dictLinesOfDataPoints[nameSingleLine]:
-                    ii = ii + 1
+        if not (axesCalibration is None):
 
-                    itemPos = item.scenePos()
-                    (x, y) = self.calculateRealCoordinates(itemPos)
+            for nameSingleLine in self.__dictLinesOfDataPoints.keys():
 
-                    dictRealCoords[nameSingleLine][ii, 0] = x
-                    dictRealCoords[nameSingleLine][ii, 1] = y
+                scenePosArr = self.trafo_itemsToArr_dataPoints(nameSingleLine)
+                dictRealCoords[nameSingleLine] = axesCalibration.calculateRealCoordinatesArr(scenePosArr)
 
         return dictRealCoords
 
@@ -547,18 +1619,7 @@ class DDGraphicsScene(QtWidgets.QGraphicsScene):
 
     def isAxisRealReady(self):
 
-        areValsPres = not ((self.__x0Real is None) or (self.__x1Real is None) or (self.__y0Real is None) or (
-                self.__y1Real is None))
-        areValsOK = (self.__x0Real != self.__x1Real) and (self.__y0Real != self.__y1Real)
-
-        if (self.__scaleX == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X):
-            areLogValsValid_x = (self.__x0Real > 0.0) and (self.__x1Real > 0.0)
-        else:
-            areLogValsValid_x = True
-
-        if (self.__scaleY == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_Y):
-            areLogValsValid_y = (self.__y0Real > 0.0) and (self.__y1Real > 0.0)
-        else:
-            areLogValsValid_y = True
-
-        return (areValsPres and areValsOK and areLogValsValid_x and areLogValsValid_y)
+        return (calibration.isAxisRealValid(self.__x0Real, self.__x1Real,
+                                            self.__scaleX == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X) and
+                calibration.isAxisRealValid(self.__y0Real, self.__y1Real,
+                                            self.__scaleY == DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_Y))
@@ -0,0 +1,111 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: history
+   :synopsis: Undo/redo history of scene changes.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import collections
+
+# Constants
+HISTORY_DEPTH = 100  # default number of undoable changes
+
+# Changes (first element of a change tuple)
+#   (CHANGE_ADD_POINTS, name of data set, point ids, coordinates)
+#   (CHANGE_REMOVE_POINTS, name of data set, point ids, coordinates)
+#   (CHANGE_AXES_POINTS, axes points before {mode: (x, y)}, axes points after {mode: (x, y)})
+#   (CHANGE_REMOVE_LINE, name of data set, point ids, coordinates)
+#   (CHANGE_MOVE_POINTS, name of data set, point ids, coordinates before, coordinates after)
+#   (CHANGE_TRANSFER_POINTS, name of source data set, name of target data set, point ids, coordinates)
+(CHANGE_ADD_POINTS, CHANGE_REMOVE_POINTS, CHANGE_AXES_POINTS, CHANGE_REMOVE_LINE, CHANGE_MOVE_POINTS,
+ CHANGE_TRANSFER_POINTS) = range(6)
+
+
+class DDUndoStack:
+    """Undo/redo stacks of changes.
+
+    A change is a tuple holding the delta only (e.g. ids and coordinates of the added points), it is applied and
+    reverted by the owner of the data. The oldest changes are dropped once the history depth is exceeded.
+
+    Parameters
+    ----------
+    maxDepth : int
+        Maximum number of undoable changes.
+    """
+
+    def __init__(self, maxDepth=HISTORY_DEPTH):
+
+        self.__undoStack = collections.deque(maxlen=maxDepth)
+        self.__redoStack = collections.deque(maxlen=maxDepth)
+
+    def getMaxDepth(self):
+
+        return self.__undoStack.maxlen
+
+    def setMaxDepth(self, maxDepth):
+
+        # keep the latest changes
+        self.__undoStack = collections.deque(self.__undoStack, maxlen=maxDepth)
+        self.__redoStack = collections.deque(self.__redoStack, maxlen=maxDepth)
+
+    def clear(self):
+
+        self.__undoStack.clear()
+        self.__redoStack.clear()
+
+    def canUndo(self):
+
+        return len(self.__undoStack) > 0
+
+    def canRedo(self):
+
+        return len(self.__redoStack) > 0
+
+    def push(self, change):
+        """Record a change that has been applied. Redo is not possible after a new change.
+
+        Parameters
+        ----------
+        change : tuple
+            Change, see CHANGE_*.
+        """
+
+        self.__undoStack.append(change)
+        self.__redoStack.clear()
+
+    def undo(self):
+        """Change to be reverted.
+
+        Returns
+        -------
+        out : tuple
+            Latest change, None if there is nothing to undo.
+        """
+
+        if not self.canUndo():
+            return None
+
+        change = self.__undoStack.pop()
+        self.__redoStack.append(change)
+
+        return change
+
+    def redo(self):
+        """Change to be applied again.
+
+        Returns
+        -------
+        out : tuple
+            Latest undone change, None if there is nothing to redo.
+        """
+
+        if not self.canRedo():
+            return None
+
+        change = self.__redoStack.pop()
+        self.__undoStack.append(change)
+
+        return change
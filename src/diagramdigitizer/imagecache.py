@@ -0,0 +1,222 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: imagecache
+   :synopsis: On-disk cache of decoded images.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import glob
+import hashlib
+import os
+import numpy
+
+# Constants
+IMAGE_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")), "diagramdigitizer",
+                               "images")
+IMAGE_CACHE_MAX_BYTES = 4 * 2 ** 30
+HASH_CHUNK_SIZE = 2 ** 20  # bytes hashed at the head and at the tail of a file
+
+
+def calcImageKey(filepath, page=0):
+    """Cache key of an image file: hash of modification time, size, page and a sample of the content (head and
+    tail), so the key of a large file is calculated without reading the whole file.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+    page : int
+        Page of a multi-page image.
+
+    Returns
+    -------
+    out : str
+        Key (hex digest).
+    """
+
+    fileStat = os.stat(filepath)
+    hashObj = hashlib.sha1()
+    hashObj.update("{}:{}:{}".format(fileStat.st_mtime_ns, fileStat.st_size, page).encode())
+
+    with open(filepath, "rb") as fp:
+        hashObj.update(fp.read(HASH_CHUNK_SIZE))
+
+        if (fileStat.st_size > HASH_CHUNK_SIZE):
+            fp.seek(max(HASH_CHUNK_SIZE, fileStat.st_size - HASH_CHUNK_SIZE))
+            hashObj.update(fp.read(HASH_CHUNK_SIZE))
+
+    return hashObj.hexdigest()
+
+
+def calcHalfResolution(pixelArr):
+    """Image downscaled by 2 (mean of 2x2 pixels, last row/column repeated for odd sizes).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        Pixels, shape (H, W, C), dtype uint8.
+
+    Returns
+    -------
+    out : numpy-array
+        Pixels, shape (ceil(H / 2), ceil(W / 2), C), dtype uint8.
+    """
+
+    pixelArr = numpy.asarray(pixelArr)
+    (height, width) = pixelArr.shape[:2]
+
+    padArr = numpy.pad(pixelArr, ((0, height % 2), (0, width % 2), (0, 0)), mode='edge').astype(numpy.uint16)
+    sumArr = padArr[0::2, 0::2] + padArr[1::2, 0::2] + padArr[0::2, 1::2] + padArr[1::2, 1::2]
+
+    return ((sumArr + 2) // 4).astype(numpy.uint8)
+
+
+class DDImageCache:
+    """Decoded images (pyramid levels of RGBA pixels) stored as .npy files, read back memory-mapped.
+
+    An entry is written to temporary files and renamed when complete, so an interrupted write leaves no entry.
+    The least recently used entries are removed once the cache exceeds its size limit, except the entry just
+    written (kept even if it exceeds the limit on its own).
+
+    Parameters
+    ----------
+    cacheDir : str
+        Cache directory (created when needed).
+    maxBytes : int
+        Size limit of the cache.
+    """
+
+    def __init__(self, cacheDir=IMAGE_CACHE_DIR, maxBytes=IMAGE_CACHE_MAX_BYTES):
+
+        self.__cacheDir = os.path.expanduser(cacheDir)
+        self.__maxBytes = maxBytes
+
+    def getCacheDir(self):
+
+        return self.__cacheDir
+
+    def getMaxBytes(self):
+
+        return self.__maxBytes
+
+    def setMaxBytes(self, maxBytes):
+
+        self.__maxBytes = maxBytes
+        self.evict()
+
+    def buildPath(self, key, level, isTemp=False):
+
+        return os.path.join(self.__cacheDir, "{}.{}.npy{}".format(key, level, ".tmp" if isTemp else ""))
+
+    def openEntry(self, key, numLevels=1):
+        """Pixels of a cached image.
+
+        Parameters
+        ----------
+        key : str
+            Key, see :func:`calcImageKey`.
+        numLevels : int
+            Number of pyramid levels required.
+
+        Returns
+        -------
+        out : list
+            Read-only memory-mapped pixel arrays of levels 0 ... numLevels - 1, None if not cached.
+        """
+
+        levelPaths = [self.buildPath(key, level) for level in range(numLevels)]
+
+        if not all(os.path.isfile(levelPath) for levelPath in levelPaths):
+            return None
+
+        try:
+            levelArrs = [numpy.load(levelPath, mmap_mode='r') for levelPath in levelPaths]
+        except (OSError, ValueError) as e:
+            print(str(e))
+            return None
+
+        # mark as recently used
+        for levelPath in levelPaths:
+            os.utime(levelPath)
+
+        return levelArrs
+
+    def beginEntry(self, key, shapes):
+        """Writable memory-mapped pixel arrays of a new entry.
+
+        Parameters
+        ----------
+        key : str
+            Key, see :func:`calcImageKey`.
+        shapes : list
+            Shapes (H, W, 4) of the pyramid levels.
+
+        Returns
+        -------
+        out : list
+            Pixel arrays (dtype uint8) to be filled, then passed to :meth:`commitEntry`.
+        """
+
+        os.makedirs(self.__cacheDir, exist_ok=True)
+
+        return [numpy.lib.format.open_memmap(self.buildPath(key, level, True), mode='w+', dtype=numpy.uint8,
+                                             shape=shape) for (level, shape) in enumerate(shapes)]
+
+    def commitEntry(self, key, levelArrs):
+        """Complete a new entry.
+
+        Parameters
+        ----------
+        key : str
+            Key, see :func:`calcImageKey`.
+        levelArrs : list
+            Filled pixel arrays from :meth:`beginEntry`. The list is emptied, so the files are closed when no other
+            references exist.
+        """
+
+        numLevels = len(levelArrs)
+
+        for levelArr in levelArrs:
+            levelArr.flush()
+        levelArrs.clear()
+
+        for level in range(numLevels):
+            os.replace(self.buildPath(key, level, True), self.buildPath(key, level))
+
+        self.evict(key)
+
+    def abortEntry(self, key):
+
+        for tempPath in glob.glob(os.path.join(glob.escape(self.__cacheDir), key + ".*.npy.tmp")):
+            os.remove(tempPath)
+
+    def clear(self):
+
+        for filePath in glob.glob(os.path.join(glob.escape(self.__cacheDir), "*.npy")):
+            os.remove(filePath)
+
+    def evict(self, keepKey=None):
+
+        # size and last use of entries
+        dictEntries = {}
+        for filePath in glob.glob(os.path.join(glob.escape(self.__cacheDir), "*.npy")):
+            key = os.path.basename(filePath).split(".")[0]
+            fileStat = os.stat(filePath)
+            (size, lastUse, filePaths) = dictEntries.get(key, (0, 0.0, []))
+            dictEntries[key] = (size + fileStat.st_size, max(lastUse, fileStat.st_mtime), filePaths + [filePath])
+
+        totalSize = sum(size for (size, _, _) in dictEntries.values())
+
+        for (key, (size, _, filePaths)) in sorted(dictEntries.items(), key=lambda entry: entry[1][1]):
+            if (totalSize <= self.__maxBytes):
+                break
+
+            if (key == keepKey):
+                continue
+
+            for filePath in filePaths:
+                os.remove(filePath)
+            totalSize = totalSize - size
@@ -0,0 +1,299 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: loader
+   :synopsis: Loading of images and projects on a worker thread.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import numpy
+import tempfile
+from PyQt5 import QtCore, QtGui
+
+from . import background
+from . import calibration
+from . import imagecache
+
+# Constants
+PYRAMID_STRIP_ROWS = 2 * background.TILE_SIZE  # rows of a level processed at once when building the pyramid
+DECODE_STRIP_BYTES = 256 * 2 ** 20  # decoded pixels read from file at once (clipped reads restart decoding)
+
+
+def allocatePyramid(pyramidShapes):
+    """Pixel arrays of the pyramid levels of an image not cached, memory-mapped from temporary files (deleted when
+    the arrays are released), so a large image does not have to fit into memory.
+
+    Parameters
+    ----------
+    pyramidShapes : list
+        Shapes of the levels, see :func:`background.calcPyramidShapes`.
+
+    Returns
+    -------
+    out : list
+        Writable memory-mapped pixel arrays, dtype uint8.
+    """
+
+    return [numpy.memmap(tempfile.TemporaryFile(), dtype=numpy.uint8, mode="w+", shape=shape)
+            for shape in pyramidShapes]
+
+
+def decodePyramid(filepath, pyramidArrs, progressCallback=None, isCancelled=None, page=0):
+    """Decode an image into the pyramid levels strip by strip, so the image is never decoded as a whole.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+    pyramidArrs : list
+        Pixel arrays of the levels to be filled, see :func:`background.calcPyramidShapes`.
+    progressCallback : function
+        Called with the completed fraction.
+    isCancelled : function
+        Returns True if decoding is to be stopped.
+    page : int
+        Page of a multi-page image.
+
+    Returns
+    -------
+    out : bool
+        True if the pyramid is complete.
+    """
+
+    (height, width) = pyramidArrs[0].shape[:2]
+    decodeRows = max(PYRAMID_STRIP_ROWS, DECODE_STRIP_BYTES // (4 * width) // PYRAMID_STRIP_ROWS * PYRAMID_STRIP_ROWS)
+    numStrips = -(-height // decodeRows) + sum(-(-levelArr.shape[0] // PYRAMID_STRIP_ROWS)
+                                               for levelArr in pyramidArrs[:-1])
+    countStrips = 0
+
+    # level 0 decoded from file, as few strips as possible
+    for row0 in range(0, height, decodeRows):
+        if not (isCancelled is None) and isCancelled():
+            return False
+
+        reader = background.openImageReader(filepath, page)
+        reader.setClipRect(QtCore.QRect(0, row0, width, min(decodeRows, height - row0)))
+        stripImage = reader.read()
+
+        if stripImage.isNull():
+            raise OSError(reader.errorString())
+
+        pyramidArrs[0][row0:row0 + stripImage.height()] = background.imageToArr(stripImage)
+
+        countStrips = countStrips + 1
+        if not (progressCallback is None):
+            progressCallback(countStrips / numStrips)
+
+    # coarser levels from the finer ones (strips of even row count)
+    for level in range(1, len(pyramidArrs)):
+        for row0 in range(0, pyramidArrs[level - 1].shape[0], PYRAMID_STRIP_ROWS):
+            if not (isCancelled is None) and isCancelled():
+                return False
+
+            halfArr = imagecache.calcHalfResolution(pyramidArrs[level - 1][row0:row0 + PYRAMID_STRIP_ROWS])
+            pyramidArrs[level][row0 // 2:row0 // 2 + len(halfArr)] = halfArr
+
+            countStrips = countStrips + 1
+            if not (progressCallback is None):
+                progressCallback(countStrips / numStrips)
+
+    return True
+
+
+def decodeBackgroundImage(filepath, imageCache=None, progressCallback=None, isCancelled=None, page=0):
+    """Decode an image to be shown as background (thread-safe, no pixmap).
+
+    With an image cache, decoded pixels are read from the cache if the file has been decoded before, otherwise
+    they are stored in the cache. Large images are decoded strip by strip into a pyramid for the tiled background,
+    which is used memory-mapped from the cache (or from temporary files without cache), so painting never decodes
+    the image file. Cached pixels of small images are copied into the returned image: the cache saves decoding them,
+    not memory.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+    imageCache : imagecache.DDImageCache
+        Cache of decoded images (None: no caching).
+    progressCallback : function
+        Called with the completed fraction.
+    isCancelled : function
+        Returns True if decoding is to be stopped.
+    page : int
+        Page of a multi-page image, the other pages are not decoded.
+
+    Returns
+    -------
+    out : tuple
+        (decoded image, None for large images; read-only memory-mapped pyramid levels of large images, None for
+        small images), (None, None) if decoding has been cancelled.
+    """
+
+    reader = background.openImageReader(filepath, page)
+    imageSize = reader.size()
+    key = None
+
+    if not (imageCache is None):
+        try:
+            key = imagecache.calcImageKey(filepath, page)
+        except OSError as e:
+            print(str(e))
+
+    # Large images: tiles are sliced from the pyramid
+    if (imageSize.width() * imageSize.height() >= background.TILED_MIN_PIXELS):
+        pyramidShapes = background.calcPyramidShapes(imageSize.width(), imageSize.height())
+        pyramidArrs = None
+
+        if not (key is None):
+            pyramidArrs = imageCache.openEntry(key, len(pyramidShapes))
+
+            if (pyramidArrs is None):
+                try:
+                    pyramidArrs = imageCache.beginEntry(key, pyramidShapes)
+
+                    if not decodePyramid(filepath, pyramidArrs, progressCallback, isCancelled, page):
+                        imageCache.abortEntry(key)
+                        return (None, None)
+
+                    imageCache.commitEntry(key, pyramidArrs)
+                    pyramidArrs = imageCache.openEntry(key, len(pyramidShapes))
+
+                except OSError as e:
+                    print(str(e))
+                    pyramidArrs = None
+                    imageCache.abortEntry(key)
+
+        # Not cached (no cache or caching failed): pyramid in temporary files
+        if (pyramidArrs is None):
+            pyramidArrs = allocatePyramid(pyramidShapes)
+
+            if not decodePyramid(filepath, pyramidArrs, progressCallback, isCancelled, page):
+                return (None, None)
+
+            for levelArr in pyramidArrs:
+                levelArr.flags.writeable = False
+
+        return (None, pyramidArrs)
+
+    # Cached pixels: copy without decoding
+    if not (key is None):
+        pixelArrs = imageCache.openEntry(key)
+
+        if not (pixelArrs is None):
+            return (background.arrToImage(pixelArrs[0]), None)
+
+    image = reader.read()
+
+    if image.isNull():
+        raise OSError(reader.errorString())
+
+    if not (key is None):
+        try:
+            pixelArr = background.imageToArr(image)
+            pixelArrs = imageCache.beginEntry(key, [pixelArr.shape])
+            pixelArrs[0][:] = pixelArr
+            imageCache.commitEntry(key, pixelArrs)
+        except OSError as e:
+            print(str(e))
+            imageCache.abortEntry(key)
+
+    return (image, None)
+
+
+class DDLoaderThread(QtCore.QThread):
+    """Worker thread: reads a project file and/or decodes its image. The result is taken over by the GUI thread
+    when the thread has finished, a cancelled load has no result.
+
+    Parameters
+    ----------
+    imagePath : str
+        Image of a new project (None if a project is loaded).
+    projectPath : str
+        Project file (*.mydig) to be loaded (None for a new project).
+    imageCache : imagecache.DDImageCache
+        Cache of decoded images (None: no caching).
+    imagePage : int
+        Page of a multi-page image of a new project.
+    """
+
+    # Signal: progress in percent, description of the current step
+    progressSignal = QtCore.pyqtSignal(int, str)
+
+    def __init__(self, imagePath=None, projectPath=None, imageCache=None, imagePage=0, *args):
+
+        QtCore.QThread.__init__(self, *args)
+
+        self.__imagePath = imagePath
+        self.__imagePage = imagePage
+        self.__projectPath = projectPath
+        self.__imageCache = imageCache
+        self.__result = None
+        self.__error = None
+
+    def getImagePath(self):
+
+        return self.__imagePath
+
+    def getImagePage(self):
+
+        return self.__imagePage
+
+    def getProjectPath(self):
+
+        return self.__projectPath
+
+    def getResult(self):
+        """Loaded data.
+
+        Returns
+        -------
+        out : tuple
+            (project content (None for a new project), decoded image (None for large images), pyramid levels of
+            large images (None for small images)), None if the load failed or has been cancelled.
+        """
+
+        return self.__result
+
+    def getError(self):
+
+        return self.__error
+
+    def run(self):
+
+        try:
+            dumpDict = None
+
+            if not (self.__projectPath is None):
+                self.progressSignal.emit(0, "Reading project")
+                dumpDict = calibration.loadProjectDict(self.__projectPath)
+                self.__imagePath = dumpDict["Image"]
+                self.__imagePage = dumpDict.get("ImagePage", 0)
+
+                if self.isInterruptionRequested():
+                    return
+
+                # coordinate lists to arrays
+                self.progressSignal.emit(30, "Reading data points")
+                dumpDict["LinesOfDataPointsCoords"] = {
+                    absName: numpy.array(coordsList, dtype=float).reshape(-1, 2)
+                    for (absName, coordsList) in dumpDict["LinesOfDataPointsCoords"].items()}
+
+                if self.isInterruptionRequested():
+                    return
+
+            self.progressSignal.emit(50, "Decoding image")
+            (image, pyramidArrs) = decodeBackgroundImage(
+                self.__imagePath, self.__imageCache,
+                lambda fraction: self.progressSignal.emit(50 + int(50 * fraction), "Decoding image"),
+                self.isInterruptionRequested, self.__imagePage)
+
+            if self.isInterruptionRequested():
+                return
+
+            self.progressSignal.emit(100, "Done")
+            self.__result = (dumpDict, image, pyramidArrs)
+
+        except Exception as e:
+            self.__error = str(e)
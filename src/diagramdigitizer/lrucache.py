@@ -0,0 +1,100 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: lrucache
+   :synopsis: Least recently used cache with a memory budget.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import collections
+
+
+class DDLruCache:
+    """Cache of values with sizes (e.g. bytes), the least recently used values are dropped once the sum of sizes
+    exceeds the budget.
+
+    Parameters
+    ----------
+    budget : int
+        Maximum sum of sizes of the cached values.
+    """
+
+    def __init__(self, budget):
+
+        self.__budget = budget
+        self.__entries = collections.OrderedDict()  # key: (value, size), least recently used first
+        self.__totalSize = 0
+
+    def __len__(self):
+
+        return len(self.__entries)
+
+    def __contains__(self, key):
+
+        return key in self.__entries
+
+    def getBudget(self):
+
+        return self.__budget
+
+    def setBudget(self, budget):
+
+        self.__budget = budget
+        self.evict()
+
+    def getTotalSize(self):
+
+        return self.__totalSize
+
+    def clear(self):
+
+        self.__entries.clear()
+        self.__totalSize = 0
+
+    def get(self, key, default=None):
+
+        if not (key in self.__entries):
+            return default
+
+        self.__entries.move_to_end(key)
+
+        return self.__entries[key][0]
+
+    def put(self, key, value, size):
+        """Insert a value as most recently used.
+
+        Parameters
+        ----------
+        key : hashable
+            Key.
+        value : object
+            Value.
+        size : int
+            Size of the value. A value exceeding the budget on its own is not cached.
+        """
+
+        self.pop(key)
+
+        if (size > self.__budget):
+            return
+
+        self.__entries[key] = (value, size)
+        self.__totalSize = self.__totalSize + size
+        self.evict()
+
+    def pop(self, key):
+
+        if (key in self.__entries):
+            (value, size) = self.__entries.pop(key)
+            self.__totalSize = self.__totalSize - size
+            return value
+
+        return None
+
+    def evict(self):
+
+        while (self.__totalSize > self.__budget):
+            (_, (_, size)) = self.__entries.popitem(last=False)
+            self.__totalSize = self.__totalSize - size
@@ -0,0 +1,288 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: matching
+   :synopsis: Detection of scatter plot markers by template matching.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import math
+import numpy
+
+from . import extraction
+from . import preprocessing
+
+# Constants
+MATCH_THRESHOLD = 0.8  # minimum normalized cross-correlation of a detected marker
+MATCH_MIN_STDDEV = 1.0  # gray value deviation below which a window is flat (no match)
+MATCH_FFT_TILE = 256  # minimum side of the FFT tiles of the correlation (overlap-save)
+
+
+def calcFastFftSize(size):
+    """Smallest FFT size >= size without prime factors above 5.
+
+    Parameters
+    ----------
+    size : int
+        Minimum size.
+
+    Returns
+    -------
+    out : int
+        FFT size.
+    """
+
+    while True:
+        rest = size
+        for factor in (2, 3, 5):
+            while (rest % factor == 0):
+                rest = rest // factor
+        if (rest == 1):
+            return size
+        size = size + 1
+
+
+def calcRunningSums(arr, size, dtype=numpy.int64):
+    """Sums over all runs of a length along the rows.
+
+    Parameters
+    ----------
+    arr : numpy-array
+        Values, shape (H, W).
+    size : int
+        Run length.
+    dtype : numpy-dtype
+        Integer type of the sums; cumulated values wrap around, the sums are exact if they fit into the type.
+
+    Returns
+    -------
+    out : numpy-array
+        Sums of the runs by first column, shape (H, W - size + 1).
+    """
+
+    cumSumArr = numpy.cumsum(arr, axis=1, dtype=dtype)
+    sumArr = numpy.empty((arr.shape[0], arr.shape[1] - size + 1), dtype=dtype)
+    sumArr[:, 0] = cumSumArr[:, size - 1]
+    numpy.subtract(cumSumArr[:, size:], cumSumArr[:, :-size], out=sumArr[:, 1:])
+
+    return sumArr
+
+
+def calcWindowSums(arr, height, width, dtype=numpy.int64):
+    """Sums over all windows of a size (separable running sums, cumulated along contiguous rows for speed).
+
+    Parameters
+    ----------
+    arr : numpy-array
+        Values, shape (H, W).
+    height, width : int
+        Window size.
+    dtype : numpy-dtype
+        Integer type of the sums; cumulated values wrap around, the sums are exact if they fit into the type.
+
+    Returns
+    -------
+    out : numpy-array
+        Sums of the windows by top left corner, shape (H - height + 1, W - width + 1).
+    """
+
+    rowSumArr = calcRunningSums(arr, width, dtype)
+
+    return calcRunningSums(numpy.ascontiguousarray(rowSumArr.T), height, dtype).T
+
+
+def calcNormCrossCorrelation(imageArr, templateArr):
+    """Normalized cross-correlation of a template at all positions within an image (FFT).
+
+    The correlation with the zero-mean template is computed by FFT on overlapping tiles (overlap-save: the wrapped
+    part of each circular convolution is discarded); the window deviations of the image are exact integer sums.
+
+    Parameters
+    ----------
+    imageArr : numpy-array
+        Gray values, shape (H, W), dtype uint8.
+    templateArr : numpy-array
+        Gray values, shape (h, w), h <= H, w <= W, dtype uint8.
+
+    Returns
+    -------
+    out : numpy-array
+        Correlation in [-1, 1] by top left corner, shape (H - h + 1, W - w + 1), dtype float32; 0 for flat windows.
+    """
+
+    (height, width) = imageArr.shape
+    (tHeight, tWidth) = templateArr.shape
+    numPixels = tHeight * tWidth
+
+    templateArr = templateArr.astype(numpy.float32)
+    templateArr -= templateArr.mean()
+    templateNorm = numpy.sqrt(numpy.sum(templateArr.astype(float) ** 2))
+
+    if (templateNorm == 0.0):
+        return numpy.zeros((height - tHeight + 1, width - tWidth + 1), dtype=numpy.float32)
+
+    # numerator: correlation with the zero-mean template, overlap-save over tiles (image mean removed for precision)
+    tileSize = calcFastFftSize(max(MATCH_FFT_TILE, 4 * max(tHeight, tWidth)))
+    (stepRows, stepCols) = (tileSize - tHeight + 1, tileSize - tWidth + 1)
+    kernelArr = numpy.fft.rfft2(templateArr[::-1, ::-1], (tileSize, tileSize))
+    imageMean = numpy.float32(imageArr.mean())
+    nccArr = numpy.empty((height - tHeight + 1, width - tWidth + 1), dtype=numpy.float32)
+
+    for row0 in range(0, nccArr.shape[0], stepRows):
+        for col0 in range(0, nccArr.shape[1], stepCols):
+            tileArr = imageArr[row0:row0 + tileSize, col0:col0 + tileSize].astype(numpy.float32) - imageMean
+            corrArr = numpy.fft.irfft2(numpy.fft.rfft2(tileArr, (tileSize, tileSize)) * kernelArr, (tileSize, tileSize))
+            outArr = nccArr[row0:row0 + stepRows, col0:col0 + stepCols]
+            outArr[...] = corrArr[tHeight - 1:tHeight - 1 + outArr.shape[0], tWidth - 1:tWidth - 1 + outArr.shape[1]]
+
+    # denominator: numPixels * deviation of the window, exact up to the conversion
+    dtype = numpy.int32 if (numPixels * 255 ** 2 < 2 ** 31) else numpy.int64
+    sumArr = calcWindowSums(imageArr, tHeight, tWidth, dtype)
+    deviationArr = numpy.multiply(calcWindowSums(numpy.square(imageArr, dtype=dtype), tHeight, tWidth, dtype),
+                                  float(numPixels))
+    deviationArr -= numpy.square(sumArr, dtype=float)
+    deviationArr = deviationArr.astype(numpy.float32)
+    del sumArr
+
+    isFlatArr = deviationArr <= (numPixels * MATCH_MIN_STDDEV) ** 2
+    deviationArr[isFlatArr] = 1.0
+    nccArr *= numpy.float32(numpy.sqrt(numPixels) / templateNorm)
+    nccArr /= numpy.sqrt(deviationArr)
+    nccArr[isFlatArr] = 0.0
+
+    return numpy.clip(nccArr, -1.0, 1.0, out=nccArr)
+
+
+def findPeaks(scoreArr, threshold, minDistance):
+    """Local maxima of a score above a threshold, at least minDistance apart, refined to sub-pixel positions.
+
+    Parameters
+    ----------
+    scoreArr : numpy-array
+        Scores, shape (H, W).
+    threshold : float
+        Minimum score.
+    minDistance : float
+        Minimum distance of peaks; of closer peaks the one with the higher score is kept.
+
+    Returns
+    -------
+    out : tuple
+        (positions (column, row), shape (N, 2), scores, shape (N,)), sorted by descending score.
+    """
+
+    (height, width) = scoreArr.shape
+    paddedArr = numpy.pad(scoreArr, 1, mode='constant', constant_values=-numpy.inf)
+
+    # candidates above the threshold that are 3x3 local maxima
+    (rowArr, colArr) = numpy.nonzero(scoreArr >= threshold)
+    valueArr = scoreArr[rowArr, colArr]
+    isMaxArr = numpy.ones(len(rowArr), dtype=bool)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if (dx != 0) or (dy != 0):
+                isMaxArr &= valueArr >= paddedArr[rowArr + 1 + dy, colArr + 1 + dx]
+
+    orderArr = numpy.argsort(-valueArr[isMaxArr], kind='stable')
+    (rowArr, colArr, valueArr) = (rowArr[isMaxArr][orderArr], colArr[isMaxArr][orderArr], valueArr[isMaxArr][orderArr])
+
+    # suppression of weaker peaks nearby: kept peaks block a disk of radius minDistance
+    radius = max(0, int(math.ceil(minDistance)) - 1)
+    (dyArr, dxArr) = numpy.mgrid[-radius:radius + 1, -radius:radius + 1]
+    diskArr = dxArr ** 2 + dyArr ** 2 < minDistance ** 2
+    isBlockedArr = numpy.zeros((height + 2 * radius, width + 2 * radius), dtype=bool)
+    isKeptArr = numpy.zeros(len(rowArr), dtype=bool)
+
+    for ii in range(len(rowArr)):
+        (row, col) = (rowArr[ii], colArr[ii])
+        if not isBlockedArr[row + radius, col + radius]:
+            isBlockedArr[row:row + 2 * radius + 1, col:col + 2 * radius + 1] |= diskArr
+            isKeptArr[ii] = True
+
+    (rowArr, colArr, valueArr) = (rowArr[isKeptArr], colArr[isKeptArr], valueArr[isKeptArr])
+
+    # sub-pixel refinement: parabola through the peak and its neighbors per axis
+    def calcOffset(lowArr, highArr):
+        curvatureArr = lowArr - 2.0 * valueArr + highArr
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            offsetArr = numpy.where(curvatureArr < 0.0, 0.5 * (lowArr - highArr) / curvatureArr, 0.0)
+        return numpy.clip(numpy.nan_to_num(offsetArr), -0.5, 0.5)
+
+    (leftArr, rightArr) = (paddedArr[rowArr + 1, colArr], paddedArr[rowArr + 1, colArr + 2])
+    (topArr, bottomArr) = (paddedArr[rowArr, colArr + 1], paddedArr[rowArr + 2, colArr + 1])
+    colOffsetArr = calcOffset(numpy.where(colArr > 0, leftArr, valueArr),
+                              numpy.where(colArr < width - 1, rightArr, valueArr))
+    rowOffsetArr = calcOffset(numpy.where(rowArr > 0, topArr, valueArr),
+                              numpy.where(rowArr < height - 1, bottomArr, valueArr))
+
+    return (numpy.column_stack((colArr + colOffsetArr, rowArr + rowOffsetArr)), valueArr)
+
+
+def calcTemplateCenter(templateArr):
+    """Center of the marker in a template: centroid of the deviation from the background (median of the border).
+
+    Parameters
+    ----------
+    templateArr : numpy-array
+        Gray values, shape (h, w).
+
+    Returns
+    -------
+    out : tuple
+        (x, y) within the template in pixels, the center of the template if it is uniform.
+    """
+
+    (height, width) = templateArr.shape
+    borderArr = numpy.concatenate((templateArr[0], templateArr[-1], templateArr[:, 0], templateArr[:, -1]))
+    weightArr = numpy.abs(templateArr.astype(float) - numpy.median(borderArr))
+    total = weightArr.sum()
+
+    if (total == 0.0):
+        return (width / 2.0, height / 2.0)
+
+    return (float(numpy.dot(weightArr.sum(axis=0), numpy.arange(width) + 0.5) / total),
+            float(numpy.dot(weightArr.sum(axis=1), numpy.arange(height) + 0.5) / total))
+
+
+def findMarkers(pixelArr, templateRect, threshold=MATCH_THRESHOLD, rect=None, withScores=False):
+    """Centers of all markers matching a boxed marker.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped, only the rectangles are read).
+    templateRect : tuple
+        (left, top, right, bottom) of the boxed marker in image pixels.
+    threshold : float
+        Minimum normalized cross-correlation.
+    rect : tuple
+        (left, top, right, bottom) in image pixels searched, e.g. the plot area (None: whole image).
+    withScores : bool
+        Return the correlations, too.
+
+    Returns
+    -------
+    out : numpy-array
+        Marker centers in image pixels, shape (N, 2), sorted by descending correlation (with scores: tuple of these
+        and the correlations, shape (N,)).
+    """
+
+    (imageHeight, imageWidth) = pixelArr.shape[:2]
+    (tCol0, tRow0, tCol1, tRow1) = extraction.calcPixelRect(templateRect, imageWidth, imageHeight)
+    (col0, row0, col1, row1) = extraction.calcPixelRect(rect, imageWidth, imageHeight)
+    (tWidth, tHeight) = (tCol1 - tCol0, tRow1 - tRow0)
+
+    if (tWidth < 2) or (tHeight < 2) or (col1 - col0 < tWidth) or (row1 - row0 < tHeight):
+        return (numpy.zeros((0, 2)), numpy.zeros(0)) if withScores else numpy.zeros((0, 2))
+
+    templateArr = preprocessing.calcGray(pixelArr[tRow0:tRow1, tCol0:tCol1])
+    imageArr = preprocessing.calcGray(pixelArr[row0:row1, col0:col1])
+
+    nccArr = calcNormCrossCorrelation(imageArr, templateArr)
+    (posArr, scoreArr) = findPeaks(nccArr, threshold, max(1.0, min(tWidth, tHeight) / 2.0))
+    (centerX, centerY) = calcTemplateCenter(templateArr)
+    posArr = posArr + numpy.array([col0 + centerX, row0 + centerY])
+
+    return (posArr, scoreArr) if withScores else posArr
@@ -0,0 +1,122 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: pageselector
+   :synopsis: Selection of a page of a multi-page image with thumbnail previews.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from . import background
+
+# Constants
+THUMBNAIL_SIZE = 128  # pixels of the longer side of a thumbnail
+
+
+class DDThumbnailThread(QtCore.QThread):
+    """Worker thread: decodes downscaled previews of the pages of an image file, one page at a time.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+    numPages : int
+        Number of pages.
+    """
+
+    # Signal: page, thumbnail image
+    thumbnailSignal = QtCore.pyqtSignal(int, QtGui.QImage)
+
+    def __init__(self, filepath, numPages, *args):
+
+        QtCore.QThread.__init__(self, *args)
+
+        self.__filepath = filepath
+        self.__numPages = numPages
+
+    def run(self):
+
+        for page in range(self.__numPages):
+            if self.isInterruptionRequested():
+                return
+
+            try:
+                reader = background.openImageReader(self.__filepath, page)
+                reader.setScaledSize(reader.size().scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, QtCore.Qt.KeepAspectRatio))
+                thumbnail = reader.read()
+            except OSError as e:
+                print(str(e))
+                continue
+
+            if not thumbnail.isNull():
+                self.thumbnailSignal.emit(page, thumbnail)
+
+
+class DDPageSelectorDialog(QtWidgets.QDialog):
+    """Dialog selecting a page of a multi-page image (e.g. TIFF). Thumbnails are decoded in the background and
+    shown when ready; they are stopped when the dialog is closed, so only the selected page is decoded afterwards.
+
+    Parameters
+    ----------
+    filepath : str
+        Image file.
+    numPages : int
+        Number of pages, see :func:`background.countImagePages`.
+    """
+
+    def __init__(self, filepath, numPages, *args):
+
+        QtWidgets.QDialog.__init__(self, *args)
+
+        self.setWindowTitle("Select page of " + filepath)
+
+        # Pages with placeholders until the thumbnails are decoded
+        placeholder = QtGui.QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        placeholder.fill(QtCore.Qt.lightGray)
+
+        self.__listWidget = QtWidgets.QListWidget(self)
+        self.__listWidget.setViewMode(QtWidgets.QListView.IconMode)
+        self.__listWidget.setIconSize(QtCore.QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.__listWidget.setResizeMode(QtWidgets.QListView.Adjust)
+        self.__listWidget.setMovement(QtWidgets.QListView.Static)
+        self.__listWidget.setUniformItemSizes(True)
+
+        for page in range(numPages):
+            QtWidgets.QListWidgetItem(QtGui.QIcon(placeholder), "Page " + str(page + 1), self.__listWidget)
+
+        self.__listWidget.setCurrentRow(0)
+        self.__listWidget.itemDoubleClicked.connect(self.accept)
+
+        buttonBox = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel,
+                                               parent=self)
+        buttonBox.accepted.connect(self.accept)
+        buttonBox.rejected.connect(self.reject)
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.__listWidget)
+        layout.addWidget(buttonBox)
+        self.resize(6 * THUMBNAIL_SIZE, 4 * THUMBNAIL_SIZE)
+
+        self.__thumbnailThread = DDThumbnailThread(filepath, numPages, self)
+        self.__thumbnailThread.thumbnailSignal.connect(self.setThumbnail)
+        self.__thumbnailThread.start()
+
+    def getPage(self):
+
+        return max(0, self.__listWidget.currentRow())
+
+    @QtCore.pyqtSlot(int, QtGui.QImage)
+    def setThumbnail(self, page, thumbnail):
+
+        self.__listWidget.item(page).setIcon(QtGui.QIcon(QtGui.QPixmap.fromImage(thumbnail)))
+
+    def done(self, result):
+
+        # no decoding of further pages
+        self.__thumbnailThread.requestInterruption()
+        self.__thumbnailThread.wait()
+
+        QtWidgets.QDialog.done(self, result)
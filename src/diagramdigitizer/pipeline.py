@@ -0,0 +1,255 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: pipeline
+   :synopsis: Color extraction in stages with cached intermediate results, for interactive re-extraction.
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import numpy
+
+from . import extraction
+from . import lrucache
+
+# Constants
+PIPELINE_CACHE_BUDGET = 512 * 2 ** 20  # bytes of cached intermediate results
+PIPELINE_MAX_PIXELS = 2 ** 24  # larger areas are not cached (extracted tile-wise instead)
+
+
+class EXTRACTION_STAGES:
+    """Stages of the color extraction, each depends on the parameters of its own and all earlier stages:
+    channels (rectangle), distance (color), mask (tolerance), points and skeleton (none).
+    """
+    (CHANNELS, DISTANCE, MASK, POINTS, SKELETON) = ("channels", "distance", "mask", "points", "skeleton")
+
+
+def calcChannels(pixelArr, rect=None):
+    """RGB channels of a rectangle as separate planes (contiguous reads for the later stages).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped, only the rectangle is read).
+    rect : tuple
+        (left, top, right, bottom) in image pixels (None: whole image).
+
+    Returns
+    -------
+    out : numpy-array
+        Channels, shape (3, h, w), dtype uint8.
+    """
+
+    (col0, row0, col1, row1) = extraction.calcPixelRect(rect, pixelArr.shape[1], pixelArr.shape[0])
+    channelArr = numpy.empty((3, max(0, row1 - row0), max(0, col1 - col0)), dtype=numpy.uint8)
+
+    for stripRow0 in range(row0, row1, extraction.EXTRACT_STRIP_ROWS):
+        stripArr = numpy.asarray(pixelArr[stripRow0:min(row1, stripRow0 + extraction.EXTRACT_STRIP_ROWS), col0:col1])
+        channelArr[:, stripRow0 - row0:stripRow0 - row0 + len(stripArr)] = numpy.moveaxis(stripArr[..., :3], 2, 0)
+
+    return channelArr
+
+
+def calcColorDistance(channelArr, color):
+    """Squared RGB distances to a color (in-place integer arithmetic, one channel plane at a time).
+
+    Parameters
+    ----------
+    channelArr : numpy-array
+        Channels, shape (3, h, w), dtype uint8, see :func:`calcChannels`.
+    color : tuple
+        (r, g, b).
+
+    Returns
+    -------
+    out : numpy-array
+        Squared distances, shape (h, w), dtype int32.
+    """
+
+    distArr = numpy.zeros(channelArr.shape[1:], dtype=numpy.int32)
+    diffArr = numpy.empty(channelArr.shape[1:], dtype=numpy.int32)
+
+    for (planeArr, value) in zip(channelArr, color[:3]):
+        numpy.subtract(planeArr, numpy.int32(value), out=diffArr, dtype=numpy.int32)
+        numpy.multiply(diffArr, diffArr, out=diffArr)
+        distArr += diffArr
+
+    return distArr
+
+
+def calcDistanceMask(distArr, tolerance):
+    """Pixels within a distance, as :func:`extraction.calcColorMask`.
+
+    Parameters
+    ----------
+    distArr : numpy-array
+        Squared distances, see :func:`calcColorDistance`.
+    tolerance : float
+        Maximum distance.
+
+    Returns
+    -------
+    out : numpy-array
+        Mask, shape (h, w), dtype bool.
+    """
+
+    if (tolerance < 0.0):
+        return numpy.zeros(distArr.shape, dtype=bool)
+
+    # squared distances are integers
+    return distArr <= numpy.int32(min(numpy.floor(tolerance ** 2), 3 * 255 ** 2))
+
+
+class DDExtractionPipeline:
+    """Color extraction of one image in stages, the result of every stage is cached per parameters of it and the
+    stages before it. Changing a late parameter (e.g. the tolerance) recomputes the late stages only, switching back
+    to parameters used before is instant.
+
+    The stages cost 3 bytes per pixel of the rectangle for the channels, plus 4 for the distances and 1 for each
+    mask per color: at PIPELINE_MAX_PIXELS about 48 MB, plus 64 MB per color, in addition to the image itself.
+
+    Parameters
+    ----------
+    budget : int
+        Bytes of cached results, the least recently used are dropped.
+    """
+
+    def __init__(self, budget=PIPELINE_CACHE_BUDGET):
+
+        self.__cache = lrucache.DDLruCache(budget)
+        self.__pixelArr = None
+
+    def getPixels(self):
+
+        return self.__pixelArr
+
+    def setPixels(self, pixelArr):
+        """Image the stages work on, the cache is cleared if it changes.
+
+        Parameters
+        ----------
+        pixelArr : numpy-array
+            RGBA pixels, shape (H, W, 4), dtype uint8 (may be memory-mapped).
+        """
+
+        if not (pixelArr is self.__pixelArr):
+            self.__cache.clear()
+            self.__pixelArr = pixelArr
+
+    def clear(self):
+
+        self.__cache.clear()
+        self.__pixelArr = None
+
+    def getCacheSize(self):
+
+        return self.__cache.getTotalSize()
+
+    def calcPixelRect(self, rect):
+        """Pixel range of a rectangle in the image, see :func:`extraction.calcPixelRect`."""
+
+        return extraction.calcPixelRect(rect, self.__pixelArr.shape[1], self.__pixelArr.shape[0])
+
+    def isCacheable(self, rect):
+        """Whether the stages of a rectangle are cached (at most PIPELINE_MAX_PIXELS)."""
+
+        (col0, row0, col1, row1) = self.calcPixelRect(rect)
+
+        return max(0, col1 - col0) * max(0, row1 - row0) <= PIPELINE_MAX_PIXELS
+
+    def getChannels(self, rect):
+
+        pixelRect = self.calcPixelRect(rect)
+
+        return self.__getStage((EXTRACTION_STAGES.CHANNELS, pixelRect),
+                               lambda: calcChannels(self.__pixelArr, pixelRect))
+
+    def getDistance(self, rect, color):
+
+        key = (EXTRACTION_STAGES.DISTANCE, self.calcPixelRect(rect), tuple(int(val) for val in color[:3]))
+
+        return self.__getStage(key, lambda: calcColorDistance(self.getChannels(rect), key[2]))
+
+    def getMask(self, rect, color, tolerance):
+        """Mask of the pixels of a rectangle within tolerance of a color, see :func:`extraction.calcColorMask`.
+
+        Parameters
+        ----------
+        rect : tuple
+            (left, top, right, bottom) in image pixels (None: whole image).
+        color : tuple
+            (r, g, b).
+        tolerance : float
+            Maximum RGB distance.
+
+        Returns
+        -------
+        out : numpy-array
+            Mask of the pixel range of the rectangle, shape (h, w), dtype bool (not to be modified).
+        """
+
+        key = (EXTRACTION_STAGES.MASK, self.calcPixelRect(rect), tuple(int(val) for val in color[:3]),
+               float(tolerance))
+
+        return self.__getStage(key, lambda: calcDistanceMask(self.getDistance(rect, color), tolerance))
+
+    def getPoints(self, rect, color, tolerance):
+        """Points of a curve drawn in a color, as :func:`extraction.extractColorCurve`.
+
+        Returns
+        -------
+        out : numpy-array
+            Coordinates in image pixels, shape (N, 2), sorted by x (not to be modified).
+        """
+
+        pixelRect = self.calcPixelRect(rect)
+        key = (EXTRACTION_STAGES.POINTS, pixelRect, tuple(int(val) for val in color[:3]), float(tolerance))
+
+        return self.__getStage(key, lambda: extraction.extractMaskPoints(self.getMask(rect, color, tolerance)) +
+                               numpy.array(pixelRect[:2]))
+
+    def getSkeleton(self, rect, color, tolerance):
+        """Skeleton of the mask of a color, see :func:`extraction.thinMask`.
+
+        Returns
+        -------
+        out : numpy-array
+            Skeleton mask of the pixel range of the rectangle, shape (h, w), dtype bool (not to be modified).
+        """
+
+        key = (EXTRACTION_STAGES.SKELETON, self.calcPixelRect(rect), tuple(int(val) for val in color[:3]),
+               float(tolerance))
+
+        return self.__getStage(key, lambda: extraction.thinMask(self.getMask(rect, color, tolerance)))
+
+    def traceCurve(self, seed, tolerance, rect=None, arcStep=None):
+        """Points of the curve through a clicked point, as :func:`extraction.traceColorCurve`.
+
+        Returns
+        -------
+        out : numpy-array
+            Coordinates in image pixels in curve order, shape (N, 2).
+        """
+
+        seedColor = extraction.findSeedColor(self.__pixelArr, seed[0], seed[1])
+        (col0, row0, col1, row1) = self.calcPixelRect(rect)
+
+        if (seedColor is None) or (col1 <= col0) or (row1 <= row0):
+            return numpy.zeros((0, 2))
+
+        (color, (seedCol, seedRow)) = seedColor
+        skeletonArr = self.getSkeleton(rect, color, tolerance)
+        pathArr = extraction.traceSkeletonPath(skeletonArr, (seedCol - col0, seedRow - row0))
+
+        return extraction.resamplePath(pathArr, arcStep) + numpy.array([col0, row0])
+
+    def __getStage(self, key, calc):
+
+        valueArr = self.__cache.get(key)
+
+        if (valueArr is None):
+            valueArr = calc()
+            self.__cache.put(key, valueArr, valueArr.nbytes)
+
+        return valueArr
@@ -0,0 +1,315 @@
+# This file is part of DiagramDigitizer.
+
+"""
+.. module:: preprocessing
+   :synopsis: Preprocessing of scanned images (deskew, grayscale, contrast, binarization).
+
+.. moduleauthor:: Michael Fischer
+"""
+
+# Imports
+import math
+import numpy
+
+# Constants
+CONTRAST_CLIP_PERCENT = 1.0  # darkest/brightest values saturated by the contrast stretch
+SKEW_MAX_ANGLE = 5.0  # degrees searched by the skew estimation
+SKEW_PRECISION = 0.05  # degrees
+SKEW_MAX_SIZE = 1024  # pixels of the downsampled image used for the skew estimation
+ROTATE_STRIP_ROWS = 256  # rows interpolated at once, bounding the temporary arrays
+PREPROCESSED_CACHE_BUDGET = 256 * 2 ** 20  # bytes of memoized preprocessed images
+
+
+class PREPROCESSING_STEPS:
+    """Keys of the preprocessing parameters, steps are applied in this order:
+    deskew (rotation angle in degrees), grayscale (True), contrast (clip percent), binarize (threshold, None: Otsu).
+    """
+    (DESKEW, GRAYSCALE, CONTRAST, BINARIZE) = ("deskew", "grayscale", "contrast", "binarize")
+
+
+def calcParamsKey(dictParams):
+    """Hashable key of preprocessing parameters, e.g. for memoization.
+
+    Parameters
+    ----------
+    dictParams : dict
+        Parameters {step: value}, see PREPROCESSING_STEPS.
+
+    Returns
+    -------
+    out : tuple
+        Sorted (step, value) pairs.
+    """
+
+    return tuple(sorted(dictParams.items()))
+
+
+def calcGray(pixelArr):
+    """Luminance of RGBA pixels (ITU-R BT.601 weights, integer arithmetic).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+
+    Returns
+    -------
+    out : numpy-array
+        Gray values, shape (H, W), dtype uint8.
+    """
+
+    rgbArr = numpy.asarray(pixelArr)[..., :3].astype(numpy.uint16)
+
+    return ((77 * rgbArr[..., 0] + 150 * rgbArr[..., 1] + 29 * rgbArr[..., 2] + 128) >> 8).astype(numpy.uint8)
+
+
+def calcOtsuThreshold(grayArr):
+    """Threshold separating dark and bright pixels with maximum between-class variance (Otsu).
+
+    Parameters
+    ----------
+    grayArr : numpy-array
+        Gray values, dtype uint8.
+
+    Returns
+    -------
+    out : int
+        Threshold, pixels above are bright.
+    """
+
+    histArr = numpy.bincount(numpy.asarray(grayArr).ravel(), minlength=256).astype(float)
+
+    weightArr = numpy.cumsum(histArr)
+    momentArr = numpy.cumsum(histArr * numpy.arange(256))
+    total = weightArr[-1]
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        varianceArr = (momentArr[-1] * weightArr - momentArr * total) ** 2 / (weightArr * (total - weightArr))
+
+    if not numpy.any(numpy.isfinite(varianceArr)):
+        return 127
+
+    return int(numpy.nanargmax(numpy.where(numpy.isfinite(varianceArr), varianceArr, numpy.nan)))
+
+
+def convertToGrayscale(pixelArr):
+    """Gray image (alpha kept).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+
+    Returns
+    -------
+    out : numpy-array
+        RGBA pixels with equal color channels.
+    """
+
+    outArr = numpy.array(pixelArr)
+    outArr[..., :3] = calcGray(pixelArr)[..., numpy.newaxis]
+
+    return outArr
+
+
+def stretchContrast(pixelArr, clipPercent=CONTRAST_CLIP_PERCENT):
+    """Linear contrast stretch of the color channels, the given share of darkest/brightest values is saturated.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    clipPercent : float
+        Percentage of values saturated at either end.
+
+    Returns
+    -------
+    out : numpy-array
+        RGBA pixels (alpha kept).
+    """
+
+    rgbArr = numpy.asarray(pixelArr)[..., :3]
+
+    # limits from the cumulative histogram
+    cumHistArr = numpy.cumsum(numpy.bincount(rgbArr.ravel(), minlength=256))
+    low = int(numpy.searchsorted(cumHistArr, cumHistArr[-1] * clipPercent / 100.0, side='right'))
+    high = int(numpy.searchsorted(cumHistArr, cumHistArr[-1] * (1.0 - clipPercent / 100.0), side='left'))
+
+    outArr = numpy.array(pixelArr)
+
+    if (high <= low):
+        return outArr
+
+    lutArr = numpy.clip(numpy.round((numpy.arange(256) - low) * 255.0 / (high - low)), 0, 255).astype(numpy.uint8)
+    outArr[..., :3] = lutArr[rgbArr]
+
+    return outArr
+
+
+def binarize(pixelArr, threshold=None):
+    """Black and white image (alpha kept).
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    threshold : int
+        Gray value, pixels above become white (None: see :func:`calcOtsuThreshold`).
+
+    Returns
+    -------
+    out : numpy-array
+        RGBA pixels with color channels 0 or 255.
+    """
+
+    grayArr = calcGray(pixelArr)
+
+    if (threshold is None):
+        threshold = calcOtsuThreshold(grayArr)
+
+    outArr = numpy.array(pixelArr)
+    outArr[..., :3] = numpy.where(grayArr > threshold, 255, 0).astype(numpy.uint8)[..., numpy.newaxis]
+
+    return outArr
+
+
+def rotateImage(pixelArr, angle, fillValue=255):
+    """Image rotated about its center (bilinear interpolation), size unchanged.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    angle : float
+        Rotation in degrees, counter-clockwise as shown (y axis downwards).
+    fillValue : int
+        Value of all channels outside of the source image.
+
+    Returns
+    -------
+    out : numpy-array
+        RGBA pixels.
+    """
+
+    pixelArr = numpy.asarray(pixelArr)
+    (height, width) = pixelArr.shape[:2]
+    (cx, cy) = ((width - 1) / 2.0, (height - 1) / 2.0)
+    (cosA, sinA) = (math.cos(math.radians(angle)), math.sin(math.radians(angle)))
+
+    # pixels gathered as 32 bit words, interpolated with 8 bit fixed-point weights
+    wordArr = numpy.ascontiguousarray(pixelArr).view(numpy.uint32).reshape(-1)
+    outArr = numpy.empty_like(pixelArr)
+    dxArr = numpy.arange(width, dtype=numpy.float32)[numpy.newaxis, :] - cx
+
+    def gather(indArr):
+        return wordArr[indArr].view(numpy.uint8).reshape(indArr.shape + (4,)).astype(numpy.int32)
+
+    for row0 in range(0, height, ROTATE_STRIP_ROWS):
+        dyArr = numpy.arange(row0, min(height, row0 + ROTATE_STRIP_ROWS), dtype=numpy.float32)[:, numpy.newaxis] - cy
+
+        # source position of each target pixel (inverse rotation)
+        srcXArr = cx + dxArr * cosA - dyArr * sinA
+        srcYArr = cy + dxArr * sinA + dyArr * cosA
+        isInsideArr = (srcXArr >= 0) & (srcXArr <= width - 1) & (srcYArr >= 0) & (srcYArr <= height - 1)
+
+        x0Arr = numpy.clip(numpy.floor(srcXArr).astype(numpy.intp), 0, width - 1)
+        y0Arr = numpy.clip(numpy.floor(srcYArr).astype(numpy.intp), 0, height - 1)
+        dx1Arr = (x0Arr < width - 1).astype(numpy.intp)
+        dy1Arr = numpy.where(y0Arr < height - 1, width, 0)
+        fxArr = numpy.clip(numpy.round((srcXArr - x0Arr) * 256), 0, 256).astype(numpy.int32)[..., numpy.newaxis]
+        fyArr = numpy.clip(numpy.round((srcYArr - y0Arr) * 256), 0, 256).astype(numpy.int32)[..., numpy.newaxis]
+
+        indArr = y0Arr * width + x0Arr
+        topArr = gather(indArr) * (256 - fxArr) + gather(indArr + dx1Arr) * fxArr
+        bottomArr = gather(indArr + dy1Arr) * (256 - fxArr) + gather(indArr + dy1Arr + dx1Arr) * fxArr
+        stripArr = ((topArr * (256 - fyArr) + bottomArr * fyArr + 32768) >> 16).astype(numpy.uint8)
+        stripArr[~isInsideArr] = fillValue
+
+        outArr[row0:row0 + len(stripArr)] = stripArr
+
+    return outArr
+
+
+def estimateSkewAngle(pixelArr, maxAngle=SKEW_MAX_ANGLE, precision=SKEW_PRECISION):
+    """Rotation deskewing an image: the angle that aligns most dark pixels in rows (sharpest projection profile).
+
+    The image is downsampled, the rows of the dark pixels after small-angle rotation are approximated by a shear,
+    the angles are searched coarse to fine.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    maxAngle : float
+        Largest skew searched in degrees.
+    precision : float
+        Step of the finest search in degrees.
+
+    Returns
+    -------
+    out : float
+        Angle in degrees for :func:`rotateImage`, 0.0 if the image has no dark pixels.
+    """
+
+    pixelArr = numpy.asarray(pixelArr)
+    stride = max(1, math.ceil(max(pixelArr.shape[:2]) / SKEW_MAX_SIZE))
+    grayArr = calcGray(pixelArr[::stride, ::stride])
+
+    (yArr, xArr) = numpy.nonzero(grayArr <= calcOtsuThreshold(grayArr))
+    if (len(yArr) == 0) or (len(yArr) == grayArr.size):
+        return 0.0
+
+    xArr = xArr - grayArr.shape[1] / 2.0
+
+    def calcScore(angle):
+        rowArr = numpy.round(yArr - xArr * math.tan(math.radians(angle))).astype(numpy.intp)
+        profileArr = numpy.bincount(rowArr - rowArr.min()).astype(float)
+        return numpy.sum(profileArr ** 2)
+
+    (bestAngle, step, halfRange) = (0.0, max(precision, maxAngle / 10.0), maxAngle)
+
+    while True:
+        angleArr = bestAngle + numpy.arange(-halfRange, halfRange + step / 2.0, step)
+        angleArr = angleArr[numpy.abs(angleArr) <= maxAngle + 1e-9]
+        scoreArr = numpy.array([calcScore(angle) for angle in angleArr])
+
+        # center of equally sharp angles (shears of less than a pixel are not distinguished)
+        bestAngle = float(numpy.mean(angleArr[scoreArr == scoreArr.max()]))
+
+        if (step <= precision):
+            return round(bestAngle / precision) * precision
+
+        (halfRange, step) = (step, max(precision, step / 10.0))
+
+
+def preprocessImage(pixelArr, dictParams):
+    """Apply the preprocessing steps in the order of PREPROCESSING_STEPS.
+
+    Parameters
+    ----------
+    pixelArr : numpy-array
+        RGBA pixels, shape (H, W, 4), dtype uint8.
+    dictParams : dict
+        Parameters {step: value} of the steps to apply, see PREPROCESSING_STEPS.
+
+    Returns
+    -------
+    out : numpy-array
+        RGBA pixels (the input if no step is applied).
+    """
+
+    outArr = pixelArr
+
+    if (dictParams.get(PREPROCESSING_STEPS.DESKEW, 0.0) != 0.0):
+        outArr = rotateImage(outArr, dictParams[PREPROCESSING_STEPS.DESKEW])
+
+    if dictParams.get(PREPROCESSING_STEPS.GRAYSCALE, False):
+        outArr = convertToGrayscale(outArr)
+
+    if (PREPROCESSING_STEPS.CONTRAST in dictParams):
+        outArr = stretchContrast(outArr, dictParams[PREPROCESSING_STEPS.CONTRAST])
+
+    if (PREPROCESSING_STEPS.BINARIZE in dictParams):
+        outArr = binarize(outArr, dictParams[PREPROCESSING_STEPS.BINARIZE])
+
+    return outArr
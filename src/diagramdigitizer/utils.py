@@ -19,6 +19,8 @@ DATA_DICT_NO_CONTENT = 0
 DATA_DICT_PART = 1
 DATA_DICT_FILLED = 2
 
+COORD_PRECISION = 6
+
 
 def sortNameListWithTag(nameList):
     """Sort list of entries [str][number] according to number.
@@ -194,3 +196,74 @@ def trafoDictKeys(dataDict):
         dataDictNew[index] = dataDict[nameLine]
 
     return dataDictNew
+
+
+def readCoordsFromText(filepath):
+    """Read (x,y)-coordinates from a text or CSV file. The delimiter (";", ",", tab or whitespace) is detected
+    from the first data line. The last two columns of each line are used, lines starting with "#" are skipped.
+    Files exported in CSV format ([name];x;y) can be read directly.
+
+    Parameters
+    ----------
+    filepath : str
+        File path.
+
+    Returns
+    -------
+    out : numpy-array
+        Coordinates, shape (N, 2).
+    """
+
+    deli = None
+    numCols = 0
+
+    with open(filepath, 'r') as fp:
+        for line in fp:
+            line = line.strip()
+            if ((len(line) > 0) and not line.startswith('#')):
+                for delih in (';', ',', '\t'):
+                    if (delih in line):
+                        deli = delih
+                        break
+                numCols = len(line.split(deli))
+                break
+
+    if (numCols < 2):
+        return numpy.zeros((0, 2))
+
+    coordsArr = numpy.loadtxt(filepath, delimiter=deli, comments='#', usecols=(numCols - 2, numCols - 1),
+                              ndmin=2)
+
+    return coordsArr
+
+
+def formatCoordinate(val, precision=COORD_PRECISION):
+    """Format a coordinate value with a given number of significant digits.
+
+    Parameters
+    ----------
+    val : float
+        Coordinate value (NaN if not available).
+    precision : int
+        Number of significant digits.
+
+    Returns
+    -------
+    out : str
+        Formatted value, empty string for NaN.
+
+    Example
+    -------
+    Basic example.
+
+    >>> from diagramdigitizer import utils
+    >>> utils.formatCoordinate(3.14159265, 4)
+    '3.142'
+    >>> utils.formatCoordinate(float('nan'))
+    ''
+    """
+
+    if (val != val):  # NaN
+        return ''
+
+    return '{:.{prec}g}'.format(val, prec=precision)
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.axisdetection import detectAxesPoints
+from src.diagramdigitizer.axisdetection import findLines
+from src.diagramdigitizer.axisdetection import findRuns
+from src.diagramdigitizer.axisdetection import selectAxisLine
+from src.diagramdigitizer.axisdetection import snapAxisEnd
+from src.diagramdigitizer.preprocessing import rotateImage
+
+
+def buildFrameImage():
+
+    # plot frame (2 pixels wide) with ticks, a grid line, a curve and a label
+    pixelArr = numpy.full((300, 400, 4), 255, dtype=numpy.uint8)
+    pixelArr[[40, 41, 250, 251], 50:361, :3] = 0
+    pixelArr[40:252, [50, 51, 359, 360], :3] = 0
+    pixelArr[252:258, 60:360:30, :3] = 0
+    pixelArr[150, 50:360:6, :3] = 0
+    xArr = numpy.arange(60, 350)
+    pixelArr[(150 + 80 * numpy.sin(xArr / 40.0)).astype(int), xArr, :3] = (200, 0, 0)
+    pixelArr[270:280, 150:220, :3] = 0
+
+    return pixelArr
+
+
+class Test_axisdetection(unittest.TestCase):
+
+    def test_findRuns(self):
+
+        maskArr = numpy.array([[1, 1, 0, 1, 0, 0, 0, 1],
+                               [0, 0, 0, 0, 0, 0, 0, 0],
+                               [1, 1, 1, 1, 1, 1, 1, 1]], dtype=bool)
+
+        (rowArr, startArr, endArr) = findRuns(maskArr)
+        self.assertEqual(rowArr.tolist(), [0, 0, 0, 2])
+        self.assertEqual(startArr.tolist(), [0, 3, 7, 0])
+        self.assertEqual(endArr.tolist(), [2, 4, 8, 8])
+
+        # small gaps bridged
+        (rowArr, startArr, endArr) = findRuns(maskArr, 1)
+        self.assertEqual(list(zip(rowArr, startArr, endArr)), [(0, 0, 4), (0, 7, 8), (2, 0, 8)])
+
+    def test_findLines(self):
+
+        maskArr = numpy.zeros((20, 50), dtype=bool)
+        maskArr[4:6, 5:45] = True
+        maskArr[12, 10:30] = True
+        maskArr[12, 31:40] = True
+        maskArr[16, 0:10] = True
+
+        lineArr = findLines(maskArr, 25, 2)
+        self.assertTrue(numpy.array_equal(lineArr, [[5.0, 5, 45], [12.5, 10, 40]]))
+        self.assertEqual(findLines(maskArr, 100).shape, (0, 3))
+
+    def test_selectAxisLine(self):
+
+        lineArr = numpy.array([[5.0, 0, 100], [12.0, 10, 95], [30.0, 0, 20]])
+
+        self.assertEqual(selectAxisLine(lineArr, True)[0], 12.0)
+        self.assertEqual(selectAxisLine(lineArr, False)[0], 5.0)
+        self.assertIsNone(selectAxisLine(numpy.zeros((0, 3)), True))
+
+    def test_snapAxisEnd(self):
+
+        lineArr = numpy.array([[97.0, 10, 200], [120.0, 10, 200], [100.0, 150, 200]])
+
+        self.assertEqual(snapAxisEnd(99.5, lineArr, 100.0), 97.0)
+        self.assertEqual(snapAxisEnd(110.0, lineArr, 100.0), 110.0)
+
+    def test_detectAxesPoints(self):
+
+        pixelArr = buildFrameImage()
+
+        dictPoints = detectAxesPoints(pixelArr)
+        self.assertEqual(dictPoints["X0"], (51.0, 251.0))
+        self.assertEqual(dictPoints["Y0"], (51.0, 251.0))
+        self.assertEqual(dictPoints["X1"], (360.0, 251.0))
+        self.assertEqual(dictPoints["Y1"], (51.0, 41.0))
+
+        # skewed scan, points on the rotated frame
+        dictPoints = detectAxesPoints(rotateImage(pixelArr, 1.0))
+        (angle, center) = (numpy.radians(1.0), numpy.array([200.0, 150.0]))
+        rotArr = numpy.array([[numpy.cos(angle), numpy.sin(angle)], [-numpy.sin(angle), numpy.cos(angle)]])
+        for (flag, point) in (("X0", (51.0, 251.0)), ("X1", (360.0, 251.0)), ("Y1", (51.0, 41.0))):
+            expectedArr = center + rotArr @ (numpy.array(point) - center)
+            self.assertLess(numpy.hypot(*(numpy.array(dictPoints[flag]) - expectedArr)), 1.5)
+
+        self.assertIsNone(detectAxesPoints(numpy.full((50, 60, 4), 255, dtype=numpy.uint8)))
@@ -0,0 +1,141 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from src.diagramdigitizer.background import TILE_SIZE
+from src.diagramdigitizer.background import DDTiledImageItem
+from src.diagramdigitizer.background import countImagePages
+from src.diagramdigitizer.background import imageToArr
+from src.diagramdigitizer.background import openImageReader
+from src.diagramdigitizer.graphscene import DDGraphicsScene
+from src.diagramdigitizer.imagecache import calcHalfResolution
+
+APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def writeMultiPageTiff(filepath, pixelArrs):
+
+    # uncompressed RGB pages, one strip each (little endian TIFF, IFDs chained)
+    data = bytearray(b"II*\x00\x00\x00\x00\x00")
+    nextIfdPos = 4
+
+    for pixelArr in pixelArrs:
+        (height, width) = pixelArr.shape[:2]
+        stripPos = len(data)
+        data += numpy.ascontiguousarray(pixelArr[..., :3]).tobytes()
+        bitsPos = len(data)
+        data += struct.pack("<3H", 8, 8, 8)
+
+        # (tag, type (3: short, 4: long), count, value or offset)
+        tags = [(256, 4, 1, width), (257, 4, 1, height), (258, 3, 3, bitsPos), (259, 3, 1, 1), (262, 3, 1, 2),
+                (273, 4, 1, stripPos), (277, 3, 1, 3), (278, 4, 1, height), (279, 4, 1, bitsPos - stripPos),
+                (284, 3, 1, 1)]
+
+        ifdPos = len(data)
+        struct.pack_into("<I", data, nextIfdPos, ifdPos)
+        data += struct.pack("<H", len(tags))
+        for (tag, fieldType, count, value) in tags:
+            isShortValue = (fieldType == 3) and (count == 1)
+            data += struct.pack("<HHI", tag, fieldType, count)
+            data += struct.pack("<HH", value, 0) if isShortValue else struct.pack("<I", value)
+        nextIfdPos = len(data)
+        data += b"\x00\x00\x00\x00"
+
+    with open(filepath, "wb") as fp:
+        fp.write(data)
+
+
+class Test_tiledImage(unittest.TestCase):
+
+    def setUp(self):
+
+        self.pixelArr = numpy.random.default_rng(0).integers(0, 256, (2 * TILE_SIZE + 100, 3 * TILE_SIZE + 50, 4),
+                                                            dtype=numpy.uint8)
+        self.pixelArr[..., 3] = 255
+        self.pyramidArrs = [self.pixelArr, calcHalfResolution(self.pixelArr)]
+        self.pyramidArrs.append(calcHalfResolution(self.pyramidArrs[1]))
+
+    def test_getTile(self):
+
+        item = DDTiledImageItem(self.pyramidArrs)
+        self.assertEqual((item.getImageSize().width(), item.getImageSize().height()), (3 * TILE_SIZE + 50,
+                                                                                       2 * TILE_SIZE + 100))
+
+        # tiles sliced from the level, clipped at the image border
+        tile = item.getTile(0, 3, 1)
+        self.assertEqual((tile.width(), tile.height()), (50, TILE_SIZE))
+        numpy.testing.assert_array_equal(imageToArr(tile), self.pixelArr[TILE_SIZE:2 * TILE_SIZE, 3 * TILE_SIZE:])
+
+        tile = item.getTile(1, 1, 0)
+        numpy.testing.assert_array_equal(imageToArr(tile), self.pyramidArrs[1][:TILE_SIZE, TILE_SIZE:])
+
+        # sliced once, then taken from the tile cache
+        self.assertIn((1, 1, 0), item.getTileCache())
+        self.assertIs(item.getTile(1, 1, 0), tile)
+
+    def test_paint(self):
+
+        scene = QtWidgets.QGraphicsScene()
+        scene.addItem(DDTiledImageItem(self.pyramidArrs))
+
+        # whole image drawn at the coarsest level matching a quarter of the size
+        (height, width) = self.pyramidArrs[2].shape[:2]
+        image = QtGui.QImage(width, height, QtGui.QImage.Format_RGBA8888)
+        image.fill(0)
+        painter = QtGui.QPainter(image)
+        scene.render(painter, QtCore.QRectF(0, 0, width, height), scene.sceneRect())
+        painter.end()
+
+        numpy.testing.assert_allclose(imageToArr(image)[..., :3].astype(float).mean(),
+                                      self.pyramidArrs[2][..., :3].astype(float).mean(), atol=1.0)
+
+
+@unittest.skipUnless(b"tiff" in [bytes(imageFormat) for imageFormat in QtGui.QImageReader.supportedImageFormats()],
+                     "Qt TIFF plugin missing")
+class Test_multiPageImage(unittest.TestCase):
+
+    def setUp(self):
+
+        rng = numpy.random.default_rng(0)
+        self.pixelArrs = [rng.integers(0, 256, (40, 60, 4), dtype=numpy.uint8) for _ in range(3)]
+        for pixelArr in self.pixelArrs:
+            pixelArr[..., 3] = 255
+
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.tempDir.name, "pages.tif")
+        writeMultiPageTiff(self.filepath, self.pixelArrs)
+
+    def tearDown(self):
+
+        self.tempDir.cleanup()
+
+    def test_pages(self):
+
+        self.assertEqual(countImagePages(self.filepath), 3)
+
+        for (page, pixelArr) in enumerate(self.pixelArrs):
+            numpy.testing.assert_array_equal(imageToArr(openImageReader(self.filepath, page).read()), pixelArr)
+
+        with self.assertRaises(OSError):
+            openImageReader(self.filepath, 3)
+
+    def test_savePage(self):
+
+        scene = DDGraphicsScene()
+        scene.newScene(self.filepath, page=2)
+        numpy.testing.assert_array_equal(scene.getBackgroundPixels(), self.pixelArrs[2])
+
+        projectPath = os.path.join(self.tempDir.name, "project.mydig")
+        scene.saveScene(projectPath)
+
+        scene = DDGraphicsScene()
+        scene.loadScene(projectPath)
+        self.assertEqual(scene.getBackgroundPage(), 2)
+        numpy.testing.assert_array_equal(scene.getBackgroundPixels(), self.pixelArrs[2])
@@ -0,0 +1,264 @@
+import numpy
+import os
+import pickle
+import tempfile
+import unittest
+
+
+from src.diagramdigitizer.calibration import AXES_POINTS
+from src.diagramdigitizer.calibration import CALIBRATION_POINTS
+from src.diagramdigitizer.calibration import SCALETYPE_AXES
+from src.diagramdigitizer.calibration import buildAxesCalibration
+from src.diagramdigitizer.calibration import isAxisRealValid
+from src.diagramdigitizer.calibration import loadProjectDict
+from src.diagramdigitizer.calibration import determineProjectRealCoords
+from src.diagramdigitizer.calibration import fitAxesReferencePoints
+from src.diagramdigitizer.calibration import fitAxesControlPoints
+from src.diagramdigitizer.calibration import fitCalibrationPoints
+
+
+class Test_buildAxesCalibration(unittest.TestCase):
+
+    def setUp(self):
+
+        self.x0Vec = numpy.array([10., 300.])
+        self.x1Vec = numpy.array([400., 305.])
+        self.y0Vec = numpy.array([12., 300.])
+        self.y1Vec = numpy.array([8., 20.])
+
+    def calcReferenceCoords(self, posArr, x0Real, x1Real, y0Real, y1Real, logX, logY):
+
+        # per-point reference formula
+        refCoords = numpy.zeros((len(posArr), 2))
+
+        axesDefs = ((self.x0Vec, self.x1Vec, x0Real, x1Real, logX), (self.y0Vec, self.y1Vec, y0Real, y1Real, logY))
+        for axis, (vec0, vec1, real0, real1, isLog) in enumerate(axesDefs):
+            len_sc = numpy.sqrt(numpy.dot(vec1 - vec0, vec1 - vec0))
+            evec_sc = (vec1 - vec0) / len_sc
+            for ii in range(len(posArr)):
+                proj_sc = numpy.dot(posArr[ii] - vec0, evec_sc)
+                if (isLog):
+                    scale = (numpy.log(real1) - numpy.log(real0)) / len_sc
+                    refCoords[ii, axis] = numpy.exp(numpy.log(real0) + scale * proj_sc)
+                else:
+                    refCoords[ii, axis] = real0 + (real1 - real0) / len_sc * proj_sc
+
+        return refCoords
+
+    def test_buildAxesCalibration_lin(self):
+
+        posArr = numpy.random.default_rng(0).uniform(0.0, 400.0, (100, 2))
+        cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.y0Vec, self.y1Vec, -1.0, 3.0, 0.0, 5.0, False, False)
+        refCoords = self.calcReferenceCoords(posArr, -1.0, 3.0, 0.0, 5.0, False, False)
+
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr(posArr), refCoords, rtol=1e-12, atol=1e-12)
+
+    def test_buildAxesCalibration_log(self):
+
+        posArr = numpy.random.default_rng(1).uniform(0.0, 400.0, (100, 2))
+        cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.y0Vec, self.y1Vec, 1.0, 100.0, 0.1, 10.0, True, True)
+        refCoords = self.calcReferenceCoords(posArr, 1.0, 100.0, 0.1, 10.0, True, True)
+
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr(posArr), refCoords, rtol=1e-12)
+
+    def test_calculateRealCoordinates_matchesArr(self):
+
+        posArr = numpy.array([[50., 60.], [250., 10.]])
+        cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.y0Vec, self.y1Vec, 1.0, 100.0, 0.0, 5.0, True, False)
+        realArr = cal.calculateRealCoordinatesArr(posArr)
+
+        for ii in range(len(posArr)):
+            self.assertEqual(cal.calculateRealCoordinates(posArr[ii, 0], posArr[ii, 1]), tuple(realArr[ii]))
+
+    def test_calculateSceneCoordinatesArr(self):
+
+        posArr = numpy.random.default_rng(2).uniform(0.0, 400.0, (100, 2))
+
+        for (logX, logY) in ((False, False), (True, False), (False, True), (True, True)):
+            cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.y0Vec, self.y1Vec, 1.0, 100.0, 0.1, 10.0,
+                                       logX, logY)
+            realArr = cal.calculateRealCoordinatesArr(posArr)
+            numpy.testing.assert_allclose(cal.calculateSceneCoordinatesArr(realArr), posArr, rtol=1e-9)
+
+    def test_calculateSceneCoordinatesArr_invalidLog(self):
+
+        cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.y0Vec, self.y1Vec, 1.0, 100.0, 0.0, 5.0, True, False)
+        sceneArr = cal.calculateSceneCoordinatesArr(numpy.array([[-1.0, 2.0], [10.0, 2.0]]))
+
+        self.assertTrue(numpy.isnan(sceneArr[0]).all())
+        self.assertFalse(numpy.isnan(sceneArr[1]).any())
+
+    def test_calculateSceneCoordinatesArr_parallelAxes(self):
+
+        cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.x0Vec, self.x1Vec, 0.0, 1.0, 0.0, 1.0, False, False)
+
+        with self.assertRaises(ValueError):
+            cal.calculateSceneCoordinatesArr(numpy.array([[0.5, 0.5]]))
+
+    def test_shearedAxes(self):
+
+        tickVec = self.x0Vec + 0.3 * (self.x1Vec - self.x0Vec)
+        posArr = numpy.array([tickVec, tickVec + 0.5 * (self.y1Vec - self.y0Vec)])
+
+        # two-point calibration: projection onto the axes, as before
+        cal = buildAxesCalibration(self.x0Vec, self.x1Vec, self.y0Vec, self.y1Vec, 0.0, 10.0, 0.0, 5.0, False, False)
+        self.assertFalse(cal.isOblique())
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr(posArr),
+                                      self.calcReferenceCoords(posArr, 0.0, 10.0, 0.0, 5.0, False, False), rtol=1e-12)
+        numpy.testing.assert_allclose(cal.calculateSceneCoordinatesArr(cal.calculateRealCoordinatesArr(posArr)),
+                                      posArr, rtol=1e-12)
+
+        # fitted to the same points: a point straight above an x tick (along the y axis) has the x value of the tick
+        cal = fitAxesReferencePoints([self.x0Vec, self.x1Vec], [0.0, 10.0], [self.y0Vec, self.y1Vec], [0.0, 5.0],
+                                     False, False)
+        self.assertTrue(cal.isOblique())
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr(posArr)[:, 0], 3.0, rtol=1e-12)
+        numpy.testing.assert_allclose(cal.calculateSceneCoordinatesArr(cal.calculateRealCoordinatesArr(posArr)),
+                                      posArr, rtol=1e-12)
+
+
+class Test_isAxisRealValid(unittest.TestCase):
+
+    def test_isAxisRealValid(self):
+        self.assertTrue(isAxisRealValid(-1.0, 1.0, False))
+        self.assertFalse(isAxisRealValid(-1.0, 1.0, True))
+        self.assertFalse(isAxisRealValid(None, 1.0, False))
+        self.assertFalse(isAxisRealValid(1.0, 1.0, False))
+
+
+class Test_determineProjectRealCoords(unittest.TestCase):
+
+    def test_determineProjectRealCoords(self):
+
+        dumpDict = {"Image": "diagram.png", "x0": 0.0, "x1": 10.0, "y0": 1.0, "y1": 100.0,
+                    "scaleX": SCALETYPE_AXES.AXIS_LIN_X, "scaleY": SCALETYPE_AXES.AXIS_LOG_Y,
+                    "AxesPointItemsCoords": {AXES_POINTS.AXIS_X0: (0.0, 100.0), AXES_POINTS.AXIS_X1: (100.0, 100.0),
+                                             AXES_POINTS.AXIS_Y0: (0.0, 100.0), AXES_POINTS.AXIS_Y1: (0.0, 0.0)},
+                    "LinesOfDataPointsCoords": {"set1": [(50.0, 50.0), (100.0, 0.0)], "set2": []}}
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filepath = os.path.join(tmpDir, "project.mydig")
+            with open(filepath, "wb") as fp:
+                pickle.dump(dumpDict, fp)
+
+            dictRealCoords = determineProjectRealCoords(loadProjectDict(filepath))
+
+        numpy.testing.assert_allclose(dictRealCoords["set1"], numpy.array([[5.0, 10.0], [10.0, 100.0]]))
+        self.assertEqual(dictRealCoords["set2"].shape, (0, 2))
+
+    def test_determineProjectRealCoords_incomplete(self):
+
+        dumpDict = {"x0": 0.0, "x1": 10.0, "y0": None, "y1": None,
+                    "scaleX": SCALETYPE_AXES.AXIS_LIN_X, "scaleY": SCALETYPE_AXES.AXIS_LIN_Y,
+                    "AxesPointItemsCoords": {}, "LinesOfDataPointsCoords": {"set1": [(50.0, 50.0)]}}
+
+        self.assertDictEqual(determineProjectRealCoords(dumpDict), {})
+
+
+class Test_fitAxesCalibration(unittest.TestCase):
+
+    def setUp(self):
+
+        # skewed and rotated scan: x axis along (cos a, sin a), y axis along (-sin b, -cos b)
+        self.matLin = numpy.array([[0.05, 0.004], [0.003, -0.02]])
+        self.offsets = numpy.array([1.0, 2.0])
+        self.scenePosArr = numpy.random.default_rng(3).uniform(0.0, 500.0, (20, 2))
+
+    def linRealCoords(self, scenePosArr):
+
+        return scenePosArr @ self.matLin.T + self.offsets
+
+    def test_fitAxesReferencePoints_twoPoints(self):
+
+        x0Vec = numpy.array([10., 300.])
+        x1Vec = numpy.array([400., 305.])
+        y0Vec = numpy.array([12., 300.])
+        y1Vec = numpy.array([8., 20.])
+        calRef = buildAxesCalibration(x0Vec, x1Vec, y0Vec, y1Vec, 1.0, 100.0, 0.0, 5.0, True, False)
+        calFit = fitAxesReferencePoints(numpy.array([x0Vec, x1Vec]), numpy.array([1.0, 100.0]),
+                                        numpy.array([y0Vec, y1Vec]), numpy.array([0.0, 5.0]), True, False)
+
+        # exact at the reference points; on the axis lines the same as the two-point calibration (projection)
+        numpy.testing.assert_allclose(calFit.calculateRealCoordinatesArr([x0Vec, x1Vec])[:, 0], [1.0, 100.0],
+                                      rtol=1e-9)
+        numpy.testing.assert_allclose(calFit.calculateRealCoordinatesArr([y0Vec, y1Vec])[:, 1], [0.0, 5.0],
+                                      atol=1e-9)
+        numpy.testing.assert_allclose(calFit.getResidualsRms(), (0.0, 0.0), atol=1e-9)
+
+        xAxisArr = x0Vec + numpy.outer(numpy.linspace(-0.5, 1.5, 5), x1Vec - x0Vec)
+        yAxisArr = y0Vec + numpy.outer(numpy.linspace(-0.5, 1.5, 5), y1Vec - y0Vec)
+        numpy.testing.assert_allclose(calFit.calculateRealCoordinatesArr(xAxisArr)[:, 0],
+                                      calRef.calculateRealCoordinatesArr(xAxisArr)[:, 0], rtol=1e-9)
+        numpy.testing.assert_allclose(calFit.calculateRealCoordinatesArr(yAxisArr)[:, 1],
+                                      calRef.calculateRealCoordinatesArr(yAxisArr)[:, 1], rtol=1e-9, atol=1e-9)
+
+    def test_fitAxesReferencePoints_noisy(self):
+
+        rng = numpy.random.default_rng(4)
+        tArr = numpy.linspace(0.0, 1.0, 11)
+        xScenePosArr = numpy.column_stack((20.0 + 400.0 * tArr, 300.0 + 8.0 * tArr))
+        yScenePosArr = numpy.column_stack((20.0 - 6.0 * tArr, 300.0 - 280.0 * tArr))
+        noiseX = rng.normal(0.0, 0.01, len(tArr))
+
+        cal = fitAxesReferencePoints(xScenePosArr, 10.0 * tArr + noiseX, yScenePosArr, 2.0 * tArr, False, False)
+
+        self.assertAlmostEqual(numpy.sum(cal.getResiduals()[0]), 0.0)
+        self.assertLess(numpy.abs(cal.getResiduals()[0]).max(), 0.05)
+        self.assertGreater(cal.getResidualsRms()[0], 0.0)
+        numpy.testing.assert_allclose(cal.getResiduals()[1], 0.0, atol=1e-12)
+        self.assertEqual(len(cal.getResiduals()[0]), len(tArr))
+
+    def test_fitAxesReferencePoints_sheared(self):
+
+        # axes sheared by 10 degrees, ticks with real values along each axis
+        xDirection = numpy.array([1.0, 0.02])
+        yDirection = numpy.array([numpy.sin(numpy.radians(10.0)), -numpy.cos(numpy.radians(10.0))])
+        origin = numpy.array([50.0, 400.0])
+        tArr = numpy.array([0.0, 1.0, 2.0, 3.0, 4.0])
+        cal = fitAxesReferencePoints(origin + numpy.outer(80.0 * tArr, xDirection), 1.0 + 2.0 * tArr,
+                                     origin + numpy.outer(60.0 * tArr, yDirection), 10.0 ** tArr, False, True)
+
+        # points on lines parallel to the other axis keep the tick values
+        posArr = origin + numpy.array([2.5 * 80.0 * xDirection + 3.0 * 60.0 * yDirection,
+                                       1.0 * 80.0 * xDirection + 0.5 * 60.0 * yDirection])
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr(posArr), [[6.0, 1000.0], [3.0, 10.0 ** 0.5]],
+                                      rtol=1e-9)
+        numpy.testing.assert_allclose(cal.calculateSceneCoordinatesArr(cal.calculateRealCoordinatesArr(posArr)),
+                                      posArr, rtol=1e-9)
+        numpy.testing.assert_allclose(cal.getResidualsRms(), (0.0, 0.0), atol=1e-9)
+
+        # same transformation as control points with both values
+        calXY = fitAxesControlPoints(posArr.tolist() + [origin.tolist()], [[6.0, 1000.0], [3.0, 10.0 ** 0.5],
+                                                                          [1.0, 1.0]], False, True)
+        numpy.testing.assert_allclose(calXY.getAffineMatrix(), cal.getAffineMatrix(), atol=1e-9)
+
+    def test_fitAxesReferencePoints_parallel(self):
+
+        with self.assertRaises(ValueError):
+            fitAxesReferencePoints([[0.0, 0.0], [10.0, 0.0]], [0.0, 1.0], [[0.0, 5.0], [10.0, 5.0]], [0.0, 1.0],
+                                   False, False)
+
+    def test_fitAxesControlPoints(self):
+
+        realCoordsArr = self.linRealCoords(self.scenePosArr)
+        cal = fitAxesControlPoints(self.scenePosArr, realCoordsArr, False, False)
+
+        numpy.testing.assert_allclose(cal.getAffineMatrix(), numpy.column_stack((self.matLin, self.offsets)),
+                                      atol=1e-12)
+        numpy.testing.assert_allclose(cal.getResidualsRms(), (0.0, 0.0), atol=1e-12)
+        numpy.testing.assert_allclose(cal.calculateSceneCoordinatesArr(realCoordsArr), self.scenePosArr, rtol=1e-9)
+
+    def test_fitAxesControlPoints_log(self):
+
+        realCoordsArr = self.linRealCoords(self.scenePosArr)
+        realCoordsArr[:, 1] = numpy.exp(realCoordsArr[:, 1])
+        cal = fitCalibrationPoints({CALIBRATION_POINTS.POINTS_XY: (self.scenePosArr, realCoordsArr)}, False, True)
+
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr(self.scenePosArr), realCoordsArr, rtol=1e-9)
+
+    def test_fitAxesControlPoints_collinear(self):
+
+        scenePosArr = numpy.array([[0., 0.], [1., 1.], [2., 2.]])
+
+        with self.assertRaises(ValueError):
+            fitAxesControlPoints(scenePosArr, scenePosArr, False, False)
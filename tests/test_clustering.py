@@ -0,0 +1,88 @@
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.clustering import calcColorHistogram
+from src.diagramdigitizer.clustering import clusterColors
+from src.diagramdigitizer.clustering import findColorPeaks
+from src.diagramdigitizer.clustering import proposeCurveColors
+
+CURVE_COLORS = ((210, 30, 30), (30, 80, 210), (20, 150, 40))
+
+
+def buildCurvesImage():
+
+    # three noisy curves (5 pixels wide, anti-aliased edges) and black axes on white
+    rng = numpy.random.default_rng(1)
+    pixelArr = numpy.full((200, 300, 4), 255, dtype=numpy.uint8)
+    pixelArr[190, :, :3] = 0
+    pixelArr[:, 5, :3] = 0
+    xArr = numpy.arange(10, 290)
+
+    for (ii, color) in enumerate(CURVE_COLORS):
+        centerArr = (100 + 60 * numpy.sin(xArr / (30.0 + 10 * ii) + ii)).astype(int)
+        for dy in range(-2, 3):
+            alpha = 0.5 if (abs(dy) == 2) else 1.0
+            noisyArr = numpy.clip(numpy.array(color) + rng.normal(0.0, 6.0, (len(xArr), 3)), 0, 255)
+            pixelArr[centerArr + dy, xArr, :3] = (alpha * noisyArr + (1.0 - alpha) * 255).astype(numpy.uint8)
+
+    return pixelArr
+
+
+class Test_clustering(unittest.TestCase):
+
+    def test_calcColorHistogram(self):
+
+        pixelArr = numpy.full((10, 10, 4), 255, dtype=numpy.uint8)
+        pixelArr[2, :, :3] = (200, 20, 20)
+        pixelArr[3, :4, :3] = (20, 20, 200)
+        pixelArr[4, :, :3] = 0
+
+        (countArr, meanArr) = calcColorHistogram(pixelArr, bits=4)
+
+        # gray pixels not counted
+        self.assertEqual(countArr.shape, (16, 16, 16))
+        self.assertEqual(countArr.sum(), 14)
+        self.assertEqual(countArr[12, 1, 1], 10)
+        self.assertTrue(numpy.array_equal(meanArr[1, 1, 12], [20, 20, 200]))
+
+        # restricted to a rectangle, sampled
+        self.assertEqual(calcColorHistogram(pixelArr, rect=(0.0, 0.0, 10.0, 3.0))[0].sum(), 10)
+        self.assertEqual(calcColorHistogram(pixelArr, maxSamples=25)[0].sum(), 5)
+
+    def test_findColorPeaks(self):
+
+        countArr = numpy.zeros((8, 8, 8))
+        meanArr = numpy.indices((8, 8, 8)).transpose(1, 2, 3, 0) * 32.0 + 16.0
+        countArr[6, 1, 1] = 50
+        countArr[6, 2, 1] = 40
+        countArr[1, 1, 6] = 30
+        countArr[1, 6, 1] = 5
+
+        peakArr = findColorPeaks(countArr, meanArr, 3, 40.0)
+
+        # neighboring bins form one peak
+        self.assertTrue(numpy.array_equal(peakArr, [[208, 48, 48], [48, 48, 208], [48, 208, 48]]))
+        self.assertEqual(len(findColorPeaks(countArr, meanArr, 2, 40.0)), 2)
+
+    def test_clusterColors(self):
+
+        colorArr = numpy.array([[200, 0, 0], [210, 10, 0], [250, 200, 200], [0, 0, 200]])
+        weightArr = numpy.array([10, 10, 100, 5])
+
+        # distant colors (tints) ignored
+        (centerArr, clusterWeightArr) = clusterColors(colorArr, weightArr, [[190, 0, 0], [0, 0, 180]], 40.0)
+        self.assertTrue(numpy.allclose(centerArr, [[205, 5, 0], [0, 0, 200]]))
+        self.assertTrue(numpy.array_equal(clusterWeightArr, [20, 5]))
+
+    def test_proposeCurveColors(self):
+
+        pixelArr = buildCurvesImage()
+
+        colorList = proposeCurveColors(pixelArr, 3)
+        self.assertEqual(len(colorList), 3)
+        for color in CURVE_COLORS:
+            self.assertLess(min(numpy.hypot.reduce(numpy.subtract(color, proposed)) for proposed in colorList), 10.0)
+
+        # fewer colors than curves requested
+        self.assertEqual(len(proposeCurveColors(pixelArr, 3, rect=(0.0, 180.0, 300.0, 200.0))), 0)
@@ -0,0 +1,222 @@
+import numpy
+import unittest
+
+
+from src.diagramdigitizer.datapoints import DDDataPointArray
+from src.diagramdigitizer.datapoints import DDGridIndex
+from src.diagramdigitizer.datapoints import GRID_MAX_PENDING
+from src.diagramdigitizer.datapoints import decimateToGrid
+from src.diagramdigitizer.datapoints import newPointIds
+from src.diagramdigitizer.datapoints import selectPointsInPolygon
+
+
+class Test_newPointIds(unittest.TestCase):
+
+    def test_newPointIds(self):
+
+        pointIds1 = newPointIds(3)
+        pointIds2 = newPointIds(2)
+
+        self.assertListEqual(numpy.diff(pointIds1).tolist(), [1, 1])
+        self.assertEqual(pointIds2[0], pointIds1[-1] + 1)
+
+
+class Test_decimateToGrid(unittest.TestCase):
+
+    def test_decimateToGrid(self):
+
+        coordsArr = numpy.array([[0.5, 0.5], [1.5, 0.5], [9.0, 9.0], [0.1, 0.2], [-0.5, 0.5], [9.9, 9.1]])
+
+        self.assertListEqual(decimateToGrid(coordsArr, 10.0).tolist(), [0, 4])
+        self.assertListEqual(decimateToGrid(coordsArr, 1.0).tolist(), [0, 1, 2, 4])
+        self.assertEqual(len(decimateToGrid(numpy.zeros((0, 2)), 1.0)), 0)
+
+
+class Test_selectPointsInPolygon(unittest.TestCase):
+
+    def test_selectPointsInPolygon(self):
+
+        # concave polygon (U shape)
+        polygonArr = numpy.array([[0.0, 0.0], [3.0, 0.0], [3.0, 3.0], [2.0, 3.0], [2.0, 1.0], [1.0, 1.0], [1.0, 3.0],
+                                  [0.0, 3.0]])
+        coordsArr = numpy.array([[0.5, 0.5], [1.5, 0.5], [1.5, 2.0], [2.5, 2.5], [4.0, 1.0], [-1.0, 2.0]])
+
+        self.assertListEqual(selectPointsInPolygon(coordsArr, polygonArr).tolist(),
+                             [True, True, False, True, False, False])
+
+    def test_selectPointsInPolygon_rect(self):
+
+        rng = numpy.random.default_rng(7)
+        coordsArr = rng.uniform(-10.0, 10.0, (1000, 2))
+        polygonArr = numpy.array([[-2.0, -3.0], [4.0, -3.0], [4.0, 5.0], [-2.0, 5.0]])
+
+        isInRect = ((coordsArr[:, 0] > -2.0) & (coordsArr[:, 0] < 4.0) & (coordsArr[:, 1] > -3.0) &
+                    (coordsArr[:, 1] < 5.0))
+
+        self.assertListEqual(selectPointsInPolygon(coordsArr, polygonArr).tolist(), isInRect.tolist())
+        self.assertFalse(numpy.any(selectPointsInPolygon(coordsArr, polygonArr[:2])))
+
+
+class Test_DDGridIndex(unittest.TestCase):
+
+    def test_querySlots(self):
+
+        rng = numpy.random.default_rng(5)
+        coordsArr = rng.uniform(-500.0, 500.0, (5000, 2))
+        gridIndex = DDGridIndex(20.0)
+
+        for (x, y, radius) in ((0.0, 0.0, 5.0), (-250.5, 133.0, 45.0), (499.0, -499.0, 10.0)):
+            inCircle = numpy.nonzero(numpy.hypot(coordsArr[:, 0] - x, coordsArr[:, 1] - y) <= radius)[0]
+            slots = gridIndex.querySlots(coordsArr, x, y, radius)
+            self.assertTrue(set(inCircle.tolist()).issubset(set(slots.tolist())))
+
+    def test_querySlots_pending(self):
+
+        coordsArr = numpy.zeros((GRID_MAX_PENDING + 20, 2))
+        gridIndex = DDGridIndex(20.0)
+
+        gridIndex.querySlots(coordsArr[:10], 100.0, 100.0, 1.0)
+        self.assertListEqual(gridIndex.querySlots(coordsArr[:12], 100.0, 100.0, 1.0).tolist(), [10, 11])
+
+        # rebuild after many appended points
+        self.assertEqual(len(gridIndex.querySlots(coordsArr, 100.0, 100.0, 1.0)), 0)
+
+
+class Test_DDDataPointArray(unittest.TestCase):
+
+    def test_addPoint(self):
+
+        pointArray = DDDataPointArray()
+        pointIds = [pointArray.addPoint(float(ii), 2.0 * ii) for ii in range(200)]
+
+        self.assertEqual(len(pointArray), 200)
+        self.assertListEqual(pointArray.getCoords()[[0, 199]].tolist(), [[0.0, 0.0], [199.0, 398.0]])
+        self.assertListEqual(pointArray.getPointIds().tolist(), pointIds)
+
+    def test_addPoints(self):
+
+        pointArray = DDDataPointArray()
+        pointArray.addPoint(1.0, 1.0)
+        pointIds = pointArray.addPoints(numpy.array([[2.0, 2.0], [3.0, 3.0]]))
+
+        self.assertListEqual(pointArray.getCoords().tolist(), [[1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+        self.assertListEqual(pointArray.getPointIds()[1:].tolist(), pointIds.tolist())
+
+    def test_removeSlots(self):
+
+        pointArray = DDDataPointArray()
+        pointArray.setCoords(numpy.arange(10.0).reshape(5, 2))
+        pointArray.removeSlots([1, 3])
+
+        self.assertEqual(len(pointArray), 3)
+        self.assertListEqual(pointArray.getCoords().tolist(), [[0.0, 1.0], [4.0, 5.0], [8.0, 9.0]])
+
+    def test_removePoints(self):
+
+        pointArray = DDDataPointArray()
+        pointIds = pointArray.addPoints(numpy.arange(10.0).reshape(5, 2))
+        pointArray.removePoints(pointIds[[0, 4]])
+
+        self.assertFalse(pointArray.containsPoint(pointIds[0]))
+        self.assertTrue(pointArray.containsPoint(pointIds[1]))
+        self.assertListEqual(pointArray.getPointIds().tolist(), pointIds[1:4].tolist())
+
+        # removed twice, unknown id
+        pointArray.removePoints([pointIds[0], -5])
+        self.assertEqual(len(pointArray), 3)
+
+    def test_compaction(self):
+
+        pointArray = DDDataPointArray()
+        coordsArr = numpy.column_stack((numpy.arange(1000.0), numpy.zeros(1000)))
+        pointIds = pointArray.addPoints(coordsArr)
+
+        # remove in random order, one by one
+        order = numpy.random.default_rng(0).permutation(1000)[:900]
+        for ii in order:
+            slot = pointArray.findSlots([pointIds[ii]])[0]
+            pointArray.removeSlots([slot])
+
+        keep = numpy.sort(numpy.setdiff1d(numpy.arange(1000), order))
+        self.assertListEqual(pointArray.getCoords().tolist(), coordsArr[keep].tolist())
+        self.assertListEqual(pointArray.getPointIds().tolist(), pointIds[keep].tolist())
+        self.assertTrue((pointArray.findSlots(pointIds[keep]) >= 0).all())
+
+        pointArray.compact()
+        self.assertListEqual(pointArray.findSlots(pointIds[keep]).tolist(), list(range(100)))
+
+    def test_findPoint(self):
+
+        pointArray = DDDataPointArray()
+        self.assertIsNone(pointArray.findPoint(0.0, 0.0, 5.0))
+
+        pointArray.setCoords(numpy.array([[0.0, 0.0], [10.0, 0.0], [20.0, 0.0]]))
+
+        self.assertEqual(pointArray.findPoint(11.0, 1.0, 5.0), 1)
+        self.assertIsNone(pointArray.findPoint(15.0, 5.0, 5.0))
+
+        pointArray.removeSlots([1])
+        self.assertIsNone(pointArray.findPoint(11.0, 1.0, 5.0))
+
+    def test_getCoords_readOnly(self):
+
+        pointArray = DDDataPointArray()
+        pointArray.addPoint(1.0, 1.0)
+
+        with self.assertRaises(ValueError):
+            pointArray.getCoords()[0, 0] = 2.0
+
+    def test_findPoint_bruteForce(self):
+
+        rng = numpy.random.default_rng(6)
+        pointArray = DDDataPointArray()
+        pointArray.addPoints(rng.uniform(0.0, 1000.0, (3000, 2)))
+        pointArray.findPoint(0.0, 0.0, 1.0)  # build index
+        pointArray.addPoints(rng.uniform(0.0, 1000.0, (300, 2)))  # pending
+        pointArray.removeSlots(rng.choice(3300, 1000, replace=False))
+
+        coordsArr = pointArray.getCoords()
+        for (x, y) in rng.uniform(0.0, 1000.0, (200, 2)):
+            dist = numpy.hypot(coordsArr[:, 0] - x, coordsArr[:, 1] - y)
+            slot = pointArray.findPoint(x, y, 15.0)
+            if (dist.min() <= 15.0):
+                self.assertEqual(pointArray.getSlotCoords(slot), tuple(coordsArr[numpy.argmin(dist)]))
+            else:
+                self.assertIsNone(slot)
+
+    def test_restorePoints(self):
+
+        pointArray = DDDataPointArray()
+        pointIds = pointArray.addPoints([[float(i), 0.0] for i in range(200)])
+
+        # empty slots are reused
+        pointArray.removePoints(pointIds[[5, 7]])
+        pointArray.restorePoints([[7.0, 0.0], [5.0, 0.0]], pointIds[[7, 5]])
+        self.assertListEqual(pointArray.getPointIds().tolist(), pointIds.tolist())
+
+        # compacted points are inserted by id
+        pointArray.removePoints(pointIds[10:150])
+        pointArray.compact()
+        pointArray.restorePoints([[20.0, 0.0], [10.0, 0.0]], pointIds[[20, 10]])
+        self.assertListEqual(pointArray.getPointIds().tolist(), pointIds[list(range(11)) + [20] +
+                                                                         list(range(150, 200))].tolist())
+        self.assertEqual(pointArray.getSlotCoords(pointArray.findPoint(20.0, 0.0, 0.1)), (20.0, 0.0))
+
+        # appended after the last point
+        pointArray.removePoints(pointIds[199:])
+        pointArray.compact()
+        pointArray.restorePoints([[199.0, 0.0]], pointIds[199:])
+        self.assertEqual(pointArray.getPointIds()[-1], pointIds[199])
+        self.assertEqual(len(pointArray), 62)
+
+    def test_pointsCoords(self):
+
+        pointArray = DDDataPointArray()
+        pointIds = pointArray.addPoints([[float(i), float(i)] for i in range(10)])
+
+        pointArray.setPointsCoords(pointIds[[2, 3]], [[20.0, 0.0], [30.0, 0.0]])
+        self.assertListEqual(pointArray.getPointsCoords(pointIds[[3, 2]]).tolist(), [[30.0, 0.0], [20.0, 0.0]])
+        self.assertEqual(pointArray.getSlotCoords(pointArray.findPoint(30.0, 0.0, 0.1)), (30.0, 0.0))
+
+        self.assertListEqual(pointArray.findPointsInPolygon([[4.5, 4.5], [7.5, 4.5], [7.5, 7.5], [4.5, 7.5]]).tolist(),
+                             pointIds[5:8].tolist())
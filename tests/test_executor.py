@@ -0,0 +1,92 @@
+import functools
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.executor import DDAnalysisExecutor
+from src.diagramdigitizer.executor import selectCorePoints
+from src.diagramdigitizer.executor import splitTiles
+from src.diagramdigitizer.executor import suppressClosePoints
+from src.diagramdigitizer.extraction import extractColorCurve
+from src.diagramdigitizer.extraction import extractColorCurves
+from src.diagramdigitizer.matching import findMarkers
+
+
+class Test_executor(unittest.TestCase):
+
+    def test_splitTiles(self):
+
+        tileList = splitTiles((5.0, 10.0, 95.0, 60.0), 100, 80, 40, 30, 4)
+
+        # cores partition the rectangle, tiles extend them within the image
+        self.assertEqual([core for (_, core) in tileList],
+                         [(5, 10, 45, 40), (45, 10, 85, 40), (85, 10, 95, 40),
+                          (5, 40, 45, 60), (45, 40, 85, 60), (85, 40, 95, 60)])
+        self.assertEqual(tileList[0][0], (1, 6, 49, 44))
+        self.assertEqual(tileList[-1][0], (81, 36, 99, 64))
+
+        # column bands
+        self.assertEqual(splitTiles(None, 100, 80, 60, None), [((0, 0, 60, 80), (0, 0, 60, 80)),
+                                                               ((60, 0, 100, 80), (60, 0, 100, 80))])
+        self.assertEqual(splitTiles((10.0, 10.0, 10.0, 20.0), 100, 80, 40, 30), [])
+
+    def test_selectCorePoints(self):
+
+        coordsArr = numpy.array([[10.0, 10.0], [19.5, 10.0], [20.0, 10.0], [15.0, 30.0]])
+
+        self.assertTrue(numpy.array_equal(selectCorePoints(coordsArr, (10, 0, 20, 30)), coordsArr[:2]))
+        self.assertEqual(selectCorePoints(numpy.zeros((0, 2)), (10, 0, 20, 30)).shape, (0, 2))
+
+    def test_suppressClosePoints(self):
+
+        coordsArr = numpy.array([[10.0, 10.0], [12.0, 10.0], [30.0, 10.0], [10.0, 10.5], [14.5, 10.0]])
+
+        self.assertTrue(numpy.array_equal(suppressClosePoints(coordsArr, 3.0), coordsArr[[0, 2, 4]]))
+        self.assertTrue(numpy.array_equal(suppressClosePoints(coordsArr, 0.0), coordsArr))
+
+    def test_mapPoints(self):
+
+        # curve in red, markers (crosses) in black, tiles of 32 pixels
+        pixelArr = numpy.full((120, 200, 4), 255, dtype=numpy.uint8)
+        xArr = numpy.arange(200)
+        pixelArr[(60 + 40 * numpy.sin(xArr / 25.0)).astype(int), xArr, :3] = (200, 0, 0)
+        for (x, y) in ((20, 20), (63, 30), (96, 95), (128, 64), (170, 100)):
+            pixelArr[y - 1:y + 2, x - 4:x + 5, :3] = 0
+            pixelArr[y - 4:y + 5, x - 1:x + 2, :3] = 0
+        rect = (3.0, 2.0, 190.0, 115.0)
+
+        analysisExecutor = DDAnalysisExecutor(numWorkers=3, tileSize=32, minPixels=1000)
+
+        # column bands give the points of the whole rectangle
+        kernel = functools.partial(extractColorCurve, pixelArr, (200, 0, 0), 60.0)
+        self.assertTrue(numpy.array_equal(analysisExecutor.mapPoints(kernel, 200, 120, rect, isColumnBands=True),
+                                          extractColorCurve(pixelArr, (200, 0, 0), 60.0, rect)))
+
+        kernel = functools.partial(extractColorCurves, pixelArr, [(200, 0, 0), (0, 0, 0)], 60.0)
+        coordsList = analysisExecutor.mapPoints(kernel, 200, 120, rect, isColumnBands=True, numResults=2)
+        expectedList = extractColorCurves(pixelArr, [(200, 0, 0), (0, 0, 0)], 60.0, rect)
+        self.assertEqual(len(coordsList), 2)
+        for (coordsArr, expectedArr) in zip(coordsList, expectedList):
+            self.assertTrue(numpy.array_equal(coordsArr, expectedArr))
+
+        # one empty array per curve for an empty rectangle
+        coordsList = analysisExecutor.mapPoints(kernel, 200, 120, (50.0, 50.0, 50.0, 90.0), isColumnBands=True,
+                                                numResults=2)
+        self.assertEqual([coordsArr.shape for coordsArr in coordsList], [(0, 2), (0, 2)])
+
+        # markers at the seams found once
+        kernel = functools.partial(findMarkers, pixelArr, (15.0, 15.0, 26.0, 26.0), 0.8, withScores=True)
+        coordsArr = analysisExecutor.mapPoints(kernel, 200, 120, rect, overlap=22, minDistance=5.0, hasScores=True)
+        expectedArr = findMarkers(pixelArr, (15.0, 15.0, 26.0, 26.0), 0.8, rect)
+        self.assertEqual(len(coordsArr), 5)
+        self.assertTrue(numpy.allclose(numpy.array(sorted(map(tuple, coordsArr))),
+                                       numpy.array(sorted(map(tuple, expectedArr)))))
+
+        # of close points, the best-scoring is kept
+        def kernel(tile):
+            return (numpy.array([[31.0, 40.0], [33.0, 40.0], [70.0, 40.0]]), numpy.array([0.5, 0.9, 0.7]))
+
+        coordsArr = analysisExecutor.mapPoints(kernel, 200, 120, rect, minDistance=5.0, hasScores=True)
+        self.assertTrue(numpy.array_equal(coordsArr, [[33.0, 40.0], [70.0, 40.0]]))
+
+        analysisExecutor.shutdown()
@@ -0,0 +1,176 @@
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.extraction import calcColorMask
+from src.diagramdigitizer.extraction import calcPixelRect
+from src.diagramdigitizer.extraction import extractColorCurve
+from src.diagramdigitizer.extraction import extractColorCurves
+from src.diagramdigitizer.extraction import extractMaskPoints
+from src.diagramdigitizer.extraction import findSeedColor
+from src.diagramdigitizer.extraction import resamplePath
+from src.diagramdigitizer.extraction import thinMask
+from src.diagramdigitizer.extraction import traceColorCurve
+from src.diagramdigitizer.extraction import traceSkeletonPath
+
+
+def buildCurveImage(gapColumns=()):
+
+    # thick blue curve (7 pixels) on white, optional gap
+    pixelArr = numpy.full((200, 300, 4), 255, dtype=numpy.uint8)
+    centerArr = 100.0 + 50.0 * numpy.sin(numpy.arange(300) / 40.0)
+    maskArr = numpy.abs(numpy.arange(200)[:, numpy.newaxis] - centerArr) <= 3.5
+    maskArr[:, list(gapColumns)] = False
+    pixelArr[maskArr, :3] = (30, 120, 200)
+
+    return (pixelArr, centerArr)
+
+
+class Test_extraction(unittest.TestCase):
+
+    def test_calcPixelRect(self):
+
+        self.assertEqual(calcPixelRect(None, 10, 20), (0, 0, 10, 20))
+        self.assertEqual(calcPixelRect((1.5, -3.0, 8.2, 30.0), 10, 20), (1, 0, 9, 20))
+
+        # outside of the image: empty
+        (col0, row0, col1, row1) = calcPixelRect((12.0, 1.0, 15.0, 5.0), 10, 20)
+        self.assertLessEqual(col1, col0)
+
+    def test_calcColorMask(self):
+
+        pixelArr = numpy.zeros((2, 3, 4), dtype=numpy.uint8)
+        pixelArr[0, 0, :3] = (200, 30, 30)
+        pixelArr[0, 1, :3] = (180, 40, 30)
+        pixelArr[1, 2, :3] = (30, 30, 200)
+
+        maskArr = calcColorMask(pixelArr, (200, 30, 30), 25.0)
+        self.assertTrue(numpy.array_equal(maskArr, [[True, True, False], [False, False, False]]))
+
+    def test_extractMaskPoints(self):
+
+        maskArr = numpy.zeros((10, 4), dtype=bool)
+        maskArr[2:5, 0] = True
+        maskArr[0, 1] = True
+        maskArr[7:10, 1] = True
+        maskArr[4, 3] = True
+
+        coordsArr = extractMaskPoints(maskArr)
+
+        # one point per run, pixel centers
+        self.assertTrue(numpy.array_equal(coordsArr, [[0.5, 3.5], [1.5, 0.5], [1.5, 8.5], [3.5, 4.5]]))
+        self.assertEqual(extractMaskPoints(numpy.zeros((3, 3), dtype=bool)).shape, (0, 2))
+
+    def test_extractColorCurve(self):
+
+        # red curve y = x / 2 (3 pixels wide), blue line
+        pixelArr = numpy.full((60, 80, 4), 255, dtype=numpy.uint8)
+        for x in range(80):
+            pixelArr[x // 2 + 5:x // 2 + 8, x, :3] = (200, 30, 30)
+        pixelArr[2, :, :3] = (30, 30, 200)
+
+        coordsArr = extractColorCurve(pixelArr, (200, 30, 30))
+        self.assertEqual(len(coordsArr), 80)
+        self.assertTrue(numpy.allclose(coordsArr[:, 1], numpy.arange(80) // 2 + 6.5))
+
+        # restricted to a rectangle, coordinates of the image
+        coordsArr = extractColorCurve(pixelArr, (200, 30, 30), rect=(10.0, 0.0, 20.0, 60.0))
+        self.assertTrue(numpy.array_equal(coordsArr[:, 0], numpy.arange(10, 20) + 0.5))
+        self.assertTrue(numpy.allclose(coordsArr[:, 1], numpy.arange(10, 20) // 2 + 6.5))
+
+        self.assertEqual(extractColorCurve(pixelArr, (0, 255, 0), 10.0).shape, (0, 2))
+
+    def test_extractColorCurves(self):
+
+        # red curve y = x / 2, orange curve y = 50 - x / 2, both 3 pixels wide
+        pixelArr = numpy.full((60, 80, 4), 255, dtype=numpy.uint8)
+        for x in range(80):
+            pixelArr[x // 2 + 5:x // 2 + 8, x, :3] = (200, 30, 30)
+            pixelArr[50 - x // 2:53 - x // 2, x, :3] = (230, 120, 20)
+
+        (redArr, orangeArr) = extractColorCurves(pixelArr, [(200, 30, 30), (230, 120, 20)], 60.0)
+
+        # each pixel belongs to the nearer color only
+        self.assertTrue(numpy.array_equal(redArr, extractColorCurve(pixelArr, (200, 30, 30), 40.0)))
+        self.assertTrue(numpy.array_equal(orangeArr, extractColorCurve(pixelArr, (230, 120, 20), 40.0)))
+
+        coordsList = extractColorCurves(pixelArr, [(200, 30, 30)], rect=(10.0, 0.0, 20.0, 60.0))
+        self.assertTrue(numpy.array_equal(coordsList[0][:, 0], numpy.arange(10, 20) + 0.5))
+
+    def test_findSeedColor(self):
+
+        (pixelArr, centerArr) = buildCurveImage()
+
+        # click next to the curve
+        (color, (col, row)) = findSeedColor(pixelArr, 150.0, centerArr[150] + 6.0)
+        self.assertEqual(color, (30, 120, 200))
+        self.assertLessEqual(abs(row - centerArr[150]), 4.0)
+
+        self.assertIsNone(findSeedColor(pixelArr, -1.0, 10.0))
+
+    def test_thinMask(self):
+
+        maskArr = numpy.zeros((20, 40), dtype=bool)
+        maskArr[8:13, 2:38] = True
+        skeletonArr = thinMask(maskArr)
+
+        # one pixel wide line near the center row
+        self.assertTrue(numpy.all(skeletonArr.sum(axis=0)[5:35] == 1))
+        self.assertTrue(numpy.all(numpy.abs(numpy.nonzero(skeletonArr[:, 5:35])[0] - 10) <= 1))
+        self.assertFalse(numpy.any(skeletonArr & ~maskArr))
+
+    def test_traceSkeletonPath(self):
+
+        (pixelArr, centerArr) = buildCurveImage(gapColumns=(98, 99, 100))
+        maskArr = numpy.all(pixelArr[..., :3] == (30, 120, 200), axis=2)
+        skeletonArr = thinMask(maskArr)
+
+        pathArr = traceSkeletonPath(skeletonArr, (200, int(centerArr[200])))
+
+        # ordered from the left end, gap bridged, 8-connected steps elsewhere
+        self.assertLess(pathArr[0, 0], 10)
+        self.assertGreater(pathArr[-1, 0], 290)
+        self.assertTrue(numpy.all(numpy.abs(pathArr[:, 1] - centerArr[pathArr[:, 0]]) <= 2.0))
+        stepArr = numpy.abs(numpy.diff(pathArr, axis=0)).max(axis=1)
+        self.assertEqual(numpy.sum(stepArr > 1), 1)
+
+        # no skeleton near the seed
+        self.assertEqual(len(traceSkeletonPath(skeletonArr, (150, 5))), 0)
+
+        # seed outside the skeleton
+        for seed in ((-5, int(centerArr[0])), (300, int(centerArr[299])), (100, -1.5)):
+            self.assertEqual(len(traceSkeletonPath(skeletonArr, seed)), 0)
+
+    def test_resamplePath(self):
+
+        pathArr = numpy.array([[0, 0], [1, 0], [1, 1], [2, 2], [3, 2], [4, 2]])
+
+        coordsArr = resamplePath(pathArr)
+        self.assertTrue(numpy.array_equal(coordsArr, [[0.5, 0.5], [1.5, 1.0], [2.5, 2.5], [3.5, 2.5], [4.5, 2.5]]))
+
+        coordsArr = resamplePath(numpy.array([[0, 0], [10, 0]]), 2.5)
+        self.assertTrue(numpy.allclose(coordsArr[:, 0], [0.5, 3.0, 5.5, 8.0, 10.5]))
+
+        self.assertEqual(resamplePath(numpy.zeros((0, 2))).shape, (0, 2))
+
+    def test_traceColorCurve(self):
+
+        (pixelArr, centerArr) = buildCurveImage()
+
+        coordsArr = traceColorCurve(pixelArr, (120.0, centerArr[120] + 5.0))
+        self.assertGreater(len(coordsArr), 290)
+        self.assertTrue(numpy.all(numpy.diff(coordsArr[:, 0]) > 0))
+        self.assertLess(numpy.mean(numpy.abs(coordsArr[:, 1] - 0.5 - centerArr[(coordsArr[:, 0] - 0.5).astype(int)])),
+                        0.5)
+
+        # restricted to a rectangle
+        coordsArr = traceColorCurve(pixelArr, (120.0, centerArr[120]), rect=(50.0, 0.0, 200.0, 200.0))
+        self.assertTrue(numpy.all((coordsArr[:, 0] > 50.0) & (coordsArr[:, 0] < 200.0)))
+
+        # seed outside the rectangle
+        coordsArr = traceColorCurve(pixelArr, (20.0, centerArr[20]), rect=(60.0, 0.0, 300.0, 200.0))
+        self.assertEqual(coordsArr.shape, (0, 2))
+
+        # equidistant points
+        coordsArr = traceColorCurve(pixelArr, (120.0, centerArr[120]), arcStep=5.0)
+        self.assertTrue(numpy.allclose(numpy.hypot(*numpy.diff(coordsArr, axis=0).T), 5.0, atol=1.0))
@@ -0,0 +1,380 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+from src.diagramdigitizer.calibration import CALIBRATION_POINTS
+from src.diagramdigitizer.calibration import buildAxesCalibration
+from src.diagramdigitizer import graphitems
+from src.diagramdigitizer import history
+from src.diagramdigitizer import preprocessing
+from src.diagramdigitizer.background import arrToImage
+from src.diagramdigitizer.graphscene import DDGraphicsScene
+
+APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+OP_MODES = DDGraphicsScene.OPERATION_MODES
+AXES_POINTS_COORDS = {OP_MODES.OP_AXIS_X0: (10.0, 300.0), OP_MODES.OP_AXIS_X1: (400.0, 305.0),
+                      OP_MODES.OP_AXIS_Y0: (12.0, 300.0), OP_MODES.OP_AXIS_Y1: (8.0, 20.0)}
+
+
+def buildCalibratedScene(logX=False, logY=False):
+
+    scene = DDGraphicsScene()
+    scene.setAxesPoints(AXES_POINTS_COORDS)
+    scene.setScaleX(DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X if logX else DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_X)
+    scene.setScaleY(DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_Y if logY else DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_Y)
+    scene.set_x0Real(1.0)
+    scene.set_x1Real(100.0)
+    scene.set_y0Real(0.5)
+    scene.set_y1Real(5.0)
+
+    return scene
+
+
+def calcBaselineRealCoords(posArr, logX, logY):
+
+    # per-point formula of the scene before the batch transformation: projection onto each axis, then scaling
+    realArr = numpy.zeros((len(posArr), 2))
+    axesDefs = ((OP_MODES.OP_AXIS_X0, OP_MODES.OP_AXIS_X1, 1.0, 100.0, logX),
+                (OP_MODES.OP_AXIS_Y0, OP_MODES.OP_AXIS_Y1, 0.5, 5.0, logY))
+
+    for axis, (opMode0, opMode1, real0, real1, isLog) in enumerate(axesDefs):
+        vec0 = numpy.array(AXES_POINTS_COORDS[opMode0])
+        vec1 = numpy.array(AXES_POINTS_COORDS[opMode1])
+        len_sc = numpy.sqrt(numpy.dot(vec1 - vec0, vec1 - vec0))
+        evec_sc = (vec1 - vec0) / len_sc
+
+        for ii in range(len(posArr)):
+            proj_sc = numpy.dot(posArr[ii] - vec0, evec_sc)
+            if isLog:
+                scale = (numpy.log(real1) - numpy.log(real0)) / len_sc
+                realArr[ii, axis] = numpy.exp(numpy.log(real0) + scale * proj_sc)
+            else:
+                scale = (real1 - real0) / len_sc
+                realArr[ii, axis] = real0 + scale * proj_sc
+
+    return realArr
+
+
+class Test_determineDataPointsRealCoords(unittest.TestCase):
+
+    def test_batchMatchesPerPoint(self):
+
+        coordsArr = numpy.random.default_rng(0).uniform(0.0, 400.0, (500, 2))
+
+        for (logX, logY) in ((False, False), (True, False), (False, True), (True, True)):
+            scene = buildCalibratedScene(logX, logY)
+            scene.newLineOfDataPoints("set1")
+            scene.newLineOfDataPoints("set2")
+            scene.addDataPoints(coordsArr, "set1")
+
+            dictRealCoords = scene.determineDataPointsRealCoords()
+            self.assertEqual(dictRealCoords["set2"].shape, (0, 2))
+
+            # one batch per data set, identical to the per-point transformation
+            refArr = numpy.array([scene.calculateRealCoordinates(QtCore.QPointF(x, y)) for (x, y) in coordsArr])
+            numpy.testing.assert_array_equal(dictRealCoords["set1"], refArr)
+
+            refCal = buildAxesCalibration(*[numpy.array(AXES_POINTS_COORDS[opMode]) for opMode in (
+                OP_MODES.OP_AXIS_X0, OP_MODES.OP_AXIS_X1, OP_MODES.OP_AXIS_Y0, OP_MODES.OP_AXIS_Y1)],
+                1.0, 100.0, 0.5, 5.0, logX, logY)
+            numpy.testing.assert_allclose(dictRealCoords["set1"], refCal.calculateRealCoordinatesArr(coordsArr),
+                                          rtol=1e-12)
+
+            # independent reference: the per-point formula used before, on the skewed axes
+            numpy.testing.assert_allclose(dictRealCoords["set1"], calcBaselineRealCoords(coordsArr, logX, logY),
+                                          rtol=1e-13, atol=1e-12)
+
+    def test_trafo_itemsToArr_dataPoints(self):
+
+        scene = buildCalibratedScene()
+        coordsArr = numpy.array([[1.5, 2.5], [30.0, 40.0], [7.0, 8.0]])
+        scene.trafo_coordsToItems_dataPoints({"set1": coordsArr, "set2": []})
+
+        numpy.testing.assert_array_equal(scene.trafo_itemsToArr_dataPoints("set1"), coordsArr)
+        self.assertEqual(scene.trafo_itemsToArr_dataPoints("set2").shape, (0, 2))
+
+    def test_incompleteAxes(self):
+
+        scene = DDGraphicsScene()
+        scene.newLineOfDataPoints("set1")
+        scene.addDataPoints(numpy.array([[1.0, 2.0]]), "set1")
+
+        self.assertDictEqual(scene.determineDataPointsRealCoords(), {})
+
+
+def sendMouseMoves(scene, posList):
+
+    # move events over a view within one update interval, then the interval elapsed
+    view = QtWidgets.QGraphicsView(scene)
+    view.setMouseTracking(True)
+    view.resize(600, 400)
+    view.setSceneRect(0.0, 0.0, 500.0, 350.0)
+    emittedList = []
+    scenePosList = []
+    scene.mouseMovedSignal.connect(lambda x, y: emittedList.append((x, y)))
+
+    for (x, y) in posList:
+        viewPos = QtCore.QPoint(x, y)
+        scenePosList.append(view.mapToScene(viewPos))
+        event = QtGui.QMouseEvent(QtCore.QEvent.MouseMove, QtCore.QPointF(viewPos), QtCore.Qt.NoButton,
+                                  QtCore.Qt.NoButton, QtCore.Qt.NoModifier)
+        QtWidgets.QApplication.sendEvent(view.viewport(), event)
+
+    emittedBefore = list(emittedList)
+    loop = QtCore.QEventLoop()
+    QtCore.QTimer.singleShot(5 * DDGraphicsScene.MOUSE_UPDATE_INTERVAL, loop.quit)
+    loop.exec_()
+
+    return (scenePosList, emittedBefore, emittedList)
+
+
+class Test_mouseCoords(unittest.TestCase):
+
+    def test_coalescedMoves(self):
+
+        # one emission after the interval, with the real coordinates of the last position
+        (scenePosList, emittedBefore, emittedList) = sendMouseMoves(buildCalibratedScene(logY=True),
+                                                                    [(100, 200), (150, 120), (200, 150)])
+        self.assertEqual(emittedBefore, [])
+        self.assertEqual(len(emittedList), 1)
+        self.assertTrue(all(type(value) is float for value in emittedList[0]))
+
+        posArr = numpy.array([[scenePosList[-1].x(), scenePosList[-1].y()]])
+        numpy.testing.assert_allclose(emittedList[0], calcBaselineRealCoords(posArr, False, True)[0], rtol=1e-13)
+
+    def test_uncalibrated(self):
+
+        (_, emittedBefore, emittedList) = sendMouseMoves(DDGraphicsScene(), [(100, 200), (150, 120)])
+        self.assertEqual(emittedBefore, [])
+        self.assertEqual(len(emittedList), 1)
+        self.assertTrue(numpy.isnan(emittedList[0]).all())
+
+
+class Test_calibrationPoints(unittest.TestCase):
+
+    def test_fitPickedCalibrationPoints(self):
+
+        scene = DDGraphicsScene()
+        scene.startCalibrationPoints(CALIBRATION_POINTS.POINTS_X)
+        for (x, real) in ((100.0, 1.0), (200.0, 2.0), (300.0, 3.0)):
+            scene.addCalibrationPoint(x, 400.0, real)
+
+        # reference points of both axes required
+        with self.assertRaises(ValueError):
+            scene.fitPickedCalibrationPoints()
+
+        scene.startCalibrationPoints(CALIBRATION_POINTS.POINTS_Y)
+        for (y, real) in ((400.0, 0.0), (300.0, 10.0)):
+            scene.addCalibrationPoint(50.0, y, real)
+
+        cal = scene.fitPickedCalibrationPoints()
+        numpy.testing.assert_allclose(cal.calculateRealCoordinatesArr([[250.0, 350.0]]), [[2.5, 5.0]])
+        self.assertEqual(len(scene.getPickedCalibrationPoints()[CALIBRATION_POINTS.POINTS_X][0]), 3)
+
+        # data sets are not used as calibration input
+        scene.newLineOfDataPoints("set1")
+        self.assertEqual(scene.trafo_itemsToArr_dataPoints("set1").shape, (0, 2))
+
+        scene.clearCalibrationPoints()
+        self.assertIsNone(scene.getCalibration())
+        self.assertDictEqual(scene.getPickedCalibrationPoints(), {})
+
+    def test_failedCalibrationCached(self):
+
+        scene = DDGraphicsScene()
+        scene.setCalibrationPoints({CALIBRATION_POINTS.POINTS_XY: ([[0.0, 100.0], [100.0, 100.0], [0.0, 0.0]],
+                                                                   [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])})
+        self.assertIsNotNone(scene.getCalibration())
+
+        # non-positive values on a logarithmic axis: failure reported once, kept until the setup changes
+        scene.setScaleX(DDGraphicsScene.SCALETYPE_AXES.AXIS_LOG_X)
+        self.assertIsNone(scene.getCalibration())
+        self.assertIsNotNone(scene.getCalibrationError())
+        self.assertIsNone(scene.getCalibration())
+
+        scene.setScaleX(DDGraphicsScene.SCALETYPE_AXES.AXIS_LIN_X)
+        self.assertIsNotNone(scene.getCalibration())
+        self.assertIsNone(scene.getCalibrationError())
+
+
+def countDataPointsItems(scene):
+
+    return len([item for item in scene.items() if isinstance(item, graphitems.DDDataPointsItem)])
+
+
+class Test_history(unittest.TestCase):
+
+    def test_removeLine_undoRedo(self):
+
+        coordsArr = numpy.array([[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]])
+
+        scene = DDGraphicsScene()
+        scene.newLineOfDataPoints("set1")
+        scene.addDataPoints(coordsArr, "set1")
+        scene.removeLineOfDataPoints("set1")
+        self.assertEqual(countDataPointsItems(scene), 0)
+
+        for _ in range(2):
+            scene.undo()
+            self.assertEqual(scene.getNamesLinesOfDataPoints(), ["set1"])
+            numpy.testing.assert_array_equal(scene.trafo_itemsToArr_dataPoints("set1"), coordsArr)
+            self.assertEqual(countDataPointsItems(scene), 1)
+
+            scene.redo()
+            self.assertEqual(scene.getNamesLinesOfDataPoints(), [])
+            self.assertEqual(countDataPointsItems(scene), 0)
+
+        # a set of the same name created meanwhile is replaced
+        scene.newLineOfDataPoints("set1")
+        scene.undo()
+        numpy.testing.assert_array_equal(scene.trafo_itemsToArr_dataPoints("set1"), coordsArr)
+        self.assertEqual(countDataPointsItems(scene), 1)
+
+        # removing a set already gone
+        scene.applyChange((history.CHANGE_REMOVE_LINE, "set2", numpy.arange(1), coordsArr[:1]), False)
+        self.assertEqual(scene.getNamesLinesOfDataPoints(), ["set1"])
+
+
+def buildDataSetsScene(names):
+
+    scene = DDGraphicsScene()
+    dictItems = {}
+
+    for (ii, name) in enumerate(names):
+        scene.newLineOfDataPoints(name)
+        scene.addDataPoints(numpy.array([[1.0, 2.0 + ii]]), name)
+        dictItems[name] = scene.getCurrentDataPointsItem()
+
+    return (scene, dictItems)
+
+
+def getVisibleDataPointsItems(scene):
+
+    return [item for item in scene.items() if isinstance(item, graphitems.DDDataPointsItem) and item.isVisible()]
+
+
+class Test_dataSetsVisibility(unittest.TestCase):
+
+    def test_showLine(self):
+
+        (scene, dictItems) = buildDataSetsScene(["set1", "set2", "set3"])
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), ["set1", "set2", "set3"])
+
+        # switching sets: exactly the chosen one shown
+        for name in ["set2", "set3", "set1", "set1"]:
+            scene.showLineOfDataPoints(name)
+            self.assertEqual(getVisibleDataPointsItems(scene), [dictItems[name]])
+            self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), [name])
+
+        # unknown set: unchanged
+        scene.showLineOfDataPoints("set4")
+        self.assertEqual(getVisibleDataPointsItems(scene), [dictItems["set1"]])
+
+        scene.showAllLinesOfDataPoints()
+        self.assertEqual(len(getVisibleDataPointsItems(scene)), 3)
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), ["set1", "set2", "set3"])
+
+    def test_removeLine_undoRedo(self):
+
+        (scene, dictItems) = buildDataSetsScene(["set1", "set2"])
+
+        # removed shown set
+        scene.showLineOfDataPoints("set2")
+        scene.removeLineOfDataPoints("set2")
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), [])
+        self.assertEqual(getVisibleDataPointsItems(scene), [])
+
+        # restored set shown alone
+        scene.undo()
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), ["set2"])
+        self.assertEqual(len(getVisibleDataPointsItems(scene)), 1)
+
+        scene.redo()
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), [])
+        self.assertEqual(getVisibleDataPointsItems(scene), [])
+
+        scene.showAllLinesOfDataPoints()
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), ["set1"])
+        self.assertEqual(getVisibleDataPointsItems(scene), [dictItems["set1"]])
+
+        # removed hidden set
+        scene.newLineOfDataPoints("set3")
+        scene.showLineOfDataPoints("set3")
+        scene.removeLineOfDataPoints("set1")
+        scene.undo()
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), ["set1"])
+        scene.redo()
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), [])
+        scene.showAllLinesOfDataPoints()
+        self.assertEqual(scene.getNamesVisibleLinesOfDataPoints(), ["set3"])
+        self.assertEqual(len(getVisibleDataPointsItems(scene)), 1)
+
+    def test_setPen(self):
+
+        (scene, dictItems) = buildDataSetsScene(["set1", "set2"])
+        pen = QtGui.QPen(QtGui.QColor(10, 200, 30), 3.0)
+
+        scene.setPenLineOfDataPoints("set2", pen)
+        self.assertEqual(dictItems["set2"].getPen(), pen)
+        self.assertEqual(dictItems["set1"].getPen(), DDGraphicsScene.PEN_POINT)
+
+        # unknown set: ignored
+        scene.setPenLineOfDataPoints("set3", QtGui.QPen())
+        self.assertEqual(dictItems["set2"].getPen(), pen)
+
+
+class Test_preprocessing(unittest.TestCase):
+
+    def test_analysisPixels(self):
+
+        pixelArr = numpy.full((80, 120, 4), 255, dtype=numpy.uint8)
+        pixelArr[38:42, 10:110, :3] = (200, 20, 20)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filepath = os.path.join(tempDir, "image.png")
+            arrToImage(pixelArr).save(filepath)
+
+            scene = DDGraphicsScene()
+            scene.newScene(filepath)
+        self.assertFalse(scene.isBackgroundTiled())
+        self.assertIs(scene.getAnalysisPixels(), scene.getBackgroundPixels())
+
+        # analysis on the pixels shown, raw pixels kept
+        dictParams = {preprocessing.PREPROCESSING_STEPS.DESKEW: 10.0}
+        scene.setPreprocessing(dictParams)
+        numpy.testing.assert_array_equal(scene.getAnalysisPixels(),
+                                         preprocessing.preprocessImage(scene.getBackgroundPixels(), dictParams))
+        self.assertEqual(scene.getBackgroundColor(QtCore.QPointF(100.5, 40.5)), tuple(
+            int(val) for val in scene.getAnalysisPixels()[40, 100, :3]))
+        numpy.testing.assert_array_equal(scene.getBackgroundPixels(), pixelArr)
+
+        # memoized per parameters
+        analysisArr = scene.getAnalysisPixels()
+        scene.setPreprocessing({})
+        self.assertIs(scene.getAnalysisPixels(), scene.getBackgroundPixels())
+        scene.setPreprocessing(dictParams)
+        self.assertIs(scene.getAnalysisPixels(), analysisArr)
+
+    def test_previewColorMask(self):
+
+        pixelArr = numpy.full((80, 120, 4), 255, dtype=numpy.uint8)
+        pixelArr[38:42, 10:110, :3] = (200, 20, 20)
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filepath = os.path.join(tempDir, "image.png")
+            arrToImage(pixelArr).save(filepath)
+
+            scene = DDGraphicsScene()
+            scene.newScene(filepath)
+
+        # mask of the pixels shown
+        scene.setPreprocessing({preprocessing.PREPROCESSING_STEPS.DESKEW: 10.0})
+        self.assertTrue(scene.previewColorMask((200, 20, 20), 40.0))
+        self.assertIs(scene.getExtractionPipeline().getPixels(), scene.getAnalysisPixels())
@@ -0,0 +1,42 @@
+import unittest
+
+
+from src.diagramdigitizer.history import CHANGE_ADD_POINTS
+from src.diagramdigitizer.history import DDUndoStack
+
+
+class Test_DDUndoStack(unittest.TestCase):
+
+    def test_undoRedo(self):
+
+        undoStack = DDUndoStack()
+        self.assertIsNone(undoStack.undo())
+        self.assertIsNone(undoStack.redo())
+
+        undoStack.push((CHANGE_ADD_POINTS, "set1", [0], [(1.0, 2.0)]))
+        undoStack.push((CHANGE_ADD_POINTS, "set1", [1], [(3.0, 4.0)]))
+
+        self.assertEqual(undoStack.undo()[2], [1])
+        self.assertEqual(undoStack.undo()[2], [0])
+        self.assertFalse(undoStack.canUndo())
+        self.assertEqual(undoStack.redo()[2], [0])
+        self.assertTrue(undoStack.canRedo())
+
+        # new change discards redo
+        undoStack.push((CHANGE_ADD_POINTS, "set1", [2], [(5.0, 6.0)]))
+        self.assertFalse(undoStack.canRedo())
+        self.assertEqual(undoStack.undo()[2], [2])
+
+    def test_maxDepth(self):
+
+        undoStack = DDUndoStack(3)
+
+        for ind in range(5):
+            undoStack.push((CHANGE_ADD_POINTS, "set1", [ind], [(0.0, 0.0)]))
+
+        undoStack.setMaxDepth(2)
+        self.assertEqual(undoStack.getMaxDepth(), 2)
+
+        self.assertEqual(undoStack.undo()[2], [4])
+        self.assertEqual(undoStack.undo()[2], [3])
+        self.assertIsNone(undoStack.undo())
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.imagecache import HASH_CHUNK_SIZE
+from src.diagramdigitizer.imagecache import calcHalfResolution
+from src.diagramdigitizer.imagecache import calcImageKey
+from src.diagramdigitizer.imagecache import DDImageCache
+
+
+class Test_imagecache(unittest.TestCase):
+
+    def test_calcImageKey(self):
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filepath = os.path.join(tempDir, "image.png")
+            with open(filepath, "wb") as fp:
+                fp.write(b"abcd")
+            os.utime(filepath, ns=(10 ** 9, 10 ** 9))
+            key = calcImageKey(filepath)
+
+            # same content and time
+            self.assertEqual(calcImageKey(filepath), key)
+
+            # other page of the same file
+            self.assertNotEqual(calcImageKey(filepath, 1), key)
+
+            # modification time
+            os.utime(filepath, ns=(2 * 10 ** 9, 2 * 10 ** 9))
+            self.assertNotEqual(calcImageKey(filepath), key)
+
+            # content of same size
+            with open(filepath, "wb") as fp:
+                fp.write(b"abce")
+            os.utime(filepath, ns=(10 ** 9, 10 ** 9))
+            self.assertNotEqual(calcImageKey(filepath), key)
+
+    def test_calcImageKey_sample(self):
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            filepath = os.path.join(tempDir, "image.tif")
+            contentArr = numpy.zeros(3 * HASH_CHUNK_SIZE, dtype=numpy.uint8)
+
+            def calcKey(contentArr):
+                with open(filepath, "wb") as fp:
+                    fp.write(contentArr.tobytes())
+                os.utime(filepath, ns=(10 ** 9, 10 ** 9))
+                return calcImageKey(filepath)
+
+            key = calcKey(contentArr)
+
+            # head and tail hashed
+            for index in (0, HASH_CHUNK_SIZE - 1, 2 * HASH_CHUNK_SIZE, len(contentArr) - 1):
+                changedArr = contentArr.copy()
+                changedArr[index] = 1
+                self.assertNotEqual(calcKey(changedArr), key)
+
+            # the middle of large files is not read
+            changedArr = contentArr.copy()
+            changedArr[HASH_CHUNK_SIZE + 10] = 1
+            self.assertEqual(calcKey(changedArr), key)
+
+    def test_calcHalfResolution(self):
+
+        pixelArr = numpy.arange(3 * 5 * 4, dtype=numpy.uint8).reshape(3, 5, 4)
+        halfArr = calcHalfResolution(pixelArr)
+
+        self.assertEqual(halfArr.shape, (2, 3, 4))
+        self.assertEqual(halfArr.dtype, numpy.uint8)
+
+        # mean of 2x2 pixels
+        self.assertTrue(numpy.array_equal(halfArr[0, 0], (pixelArr[0, 0].astype(int) + pixelArr[0, 1] + pixelArr[1, 0]
+                                                          + pixelArr[1, 1] + 2) // 4))
+        # last row and column repeated
+        self.assertTrue(numpy.array_equal(halfArr[1, 2], pixelArr[2, 4]))
+
+
+class Test_DDImageCache(unittest.TestCase):
+
+    def test_entry(self):
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            imageCache = DDImageCache(tempDir)
+            self.assertIsNone(imageCache.openEntry("key"))
+
+            levelArrs = imageCache.beginEntry("key", [(4, 6, 4), (2, 3, 4)])
+            levelArrs[0][:] = 7
+            levelArrs[1][:] = 9
+
+            # not complete yet
+            self.assertIsNone(imageCache.openEntry("key", 2))
+
+            imageCache.commitEntry("key", levelArrs)
+            self.assertEqual(levelArrs, [])
+
+            levelArrs = imageCache.openEntry("key", 2)
+            self.assertEqual([levelArr.shape for levelArr in levelArrs], [(4, 6, 4), (2, 3, 4)])
+            self.assertTrue(numpy.all(levelArrs[0] == 7))
+            self.assertTrue(numpy.all(levelArrs[1] == 9))
+
+            # more levels than cached
+            self.assertIsNone(imageCache.openEntry("key", 3))
+
+    def test_abortEntry(self):
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            imageCache = DDImageCache(tempDir)
+            levelArrs = imageCache.beginEntry("key", [(4, 6, 4)])
+            del levelArrs
+
+            imageCache.abortEntry("key")
+            self.assertEqual(os.listdir(tempDir), [])
+            self.assertIsNone(imageCache.openEntry("key"))
+
+    def test_evict(self):
+
+        with tempfile.TemporaryDirectory() as tempDir:
+            imageCache = DDImageCache(tempDir)
+
+            for (time, key) in enumerate(["a", "b", "c"]):
+                levelArrs = imageCache.beginEntry(key, [(100, 100, 4)])
+                imageCache.commitEntry(key, levelArrs)
+                os.utime(imageCache.buildPath(key, 0), (time, time))
+
+            entrySize = os.path.getsize(imageCache.buildPath("a", 0))
+
+            # "a" is used, "b" is the least recently used
+            os.utime(imageCache.buildPath("a", 0), (10, 10))
+            imageCache.setMaxBytes(2 * entrySize)
+
+            self.assertIsNone(imageCache.openEntry("b"))
+            self.assertIsNotNone(imageCache.openEntry("a"))
+            self.assertIsNotNone(imageCache.openEntry("c"))
+
+            # an entry larger than the limit is kept when written
+            imageCache.setMaxBytes(entrySize // 2)
+            levelArrs = imageCache.beginEntry("d", [(100, 100, 4)])
+            imageCache.commitEntry("d", levelArrs)
+            self.assertIsNotNone(imageCache.openEntry("d"))
+            self.assertIsNone(imageCache.openEntry("a"))
+
+            imageCache.clear()
+            self.assertEqual(os.listdir(tempDir), [])
+
@@ -0,0 +1,142 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import QtWidgets
+
+from src.diagramdigitizer import background
+from src.diagramdigitizer import loader
+from src.diagramdigitizer.background import arrToImage
+from src.diagramdigitizer.background import calcPyramidShapes
+from src.diagramdigitizer.imagecache import calcHalfResolution
+from src.diagramdigitizer.imagecache import DDImageCache
+from src.diagramdigitizer.loader import DDLoaderThread
+from src.diagramdigitizer.loader import allocatePyramid
+from src.diagramdigitizer.loader import decodeBackgroundImage
+from src.diagramdigitizer.loader import decodePyramid
+
+APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+class Test_loader(unittest.TestCase):
+
+    def setUp(self):
+
+        # image of 3 pyramid levels, decoded in several strips, shown tiled
+        self.pixelArr = numpy.random.default_rng(0).integers(0, 256, (701, 1100, 4), dtype=numpy.uint8)
+        self.pixelArr[..., 3] = 255
+        self.referenceArrs = [self.pixelArr]
+        for level in range(1, len(calcPyramidShapes(1100, 701))):
+            self.referenceArrs.append(calcHalfResolution(self.referenceArrs[-1]))
+
+        self.tempDir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.tempDir.name, "image.png")
+        arrToImage(self.pixelArr).save(self.filepath)
+
+        self.constants = (loader.PYRAMID_STRIP_ROWS, loader.DECODE_STRIP_BYTES, background.TILED_MIN_PIXELS)
+        loader.PYRAMID_STRIP_ROWS = 64
+        loader.DECODE_STRIP_BYTES = 4 * 1100 * 200
+        background.TILED_MIN_PIXELS = 1000 * 500
+
+    def tearDown(self):
+
+        (loader.PYRAMID_STRIP_ROWS, loader.DECODE_STRIP_BYTES, background.TILED_MIN_PIXELS) = self.constants
+        self.tempDir.cleanup()
+
+    def assertPyramidEqual(self, pyramidArrs):
+
+        self.assertEqual(len(pyramidArrs), len(self.referenceArrs))
+        for (levelArr, referenceArr) in zip(pyramidArrs, self.referenceArrs):
+            numpy.testing.assert_array_equal(levelArr, referenceArr)
+
+    def test_decodePyramid(self):
+
+        pyramidArrs = allocatePyramid(calcPyramidShapes(1100, 701))
+        fractions = []
+        self.assertTrue(decodePyramid(self.filepath, pyramidArrs, fractions.append))
+
+        # strips of level 0 and of the half-resolution levels
+        self.assertPyramidEqual(pyramidArrs)
+        self.assertEqual(len(fractions), 4 + 11 + 6)
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertAlmostEqual(fractions[-1], 1.0)
+
+    def test_decodePyramid_cancelled(self):
+
+        pyramidArrs = allocatePyramid(calcPyramidShapes(1100, 701))
+        fractions = []
+        self.assertFalse(decodePyramid(self.filepath, pyramidArrs, fractions.append, lambda: len(fractions) >= 2))
+        self.assertEqual(len(fractions), 2)
+
+    def test_decodeBackgroundImage(self):
+
+        # without cache: pyramid in temporary files
+        (image, pyramidArrs) = decodeBackgroundImage(self.filepath)
+        self.assertIsNone(image)
+        self.assertPyramidEqual(pyramidArrs)
+        self.assertFalse(pyramidArrs[0].flags.writeable)
+
+        # with cache: decoded once, then read from the cache
+        imageCache = DDImageCache(os.path.join(self.tempDir.name, "cache"))
+        (image, pyramidArrs) = decodeBackgroundImage(self.filepath, imageCache)
+        self.assertPyramidEqual(pyramidArrs)
+
+        (image, pyramidArrs) = decodeBackgroundImage(self.filepath, imageCache, isCancelled=lambda: True)
+        self.assertPyramidEqual(pyramidArrs)
+
+        # small image: decoded image, cached as well
+        background.TILED_MIN_PIXELS = 1100 * 701 + 1
+        (image, pyramidArrs) = decodeBackgroundImage(self.filepath, imageCache)
+        self.assertIsNone(pyramidArrs)
+        numpy.testing.assert_array_equal(background.imageToArr(image), self.pixelArr)
+        numpy.testing.assert_array_equal(background.imageToArr(decodeBackgroundImage(self.filepath, imageCache)[0]),
+                                         self.pixelArr)
+
+    def test_decodeBackgroundImage_cancelled(self):
+
+        imageCache = DDImageCache(os.path.join(self.tempDir.name, "cache"))
+        self.assertEqual(decodeBackgroundImage(self.filepath, imageCache, isCancelled=lambda: True), (None, None))
+        self.assertEqual(decodeBackgroundImage(self.filepath, isCancelled=lambda: True), (None, None))
+
+        # aborted entry leaves no files
+        self.assertEqual(os.listdir(imageCache.getCacheDir()), [])
+
+    def test_decodeBackgroundImage_unreadable(self):
+
+        filepath = os.path.join(self.tempDir.name, "broken.png")
+        with open(filepath, "wb") as fp:
+            fp.write(b"no image")
+
+        with self.assertRaises(OSError):
+            decodeBackgroundImage(filepath)
+
+    def test_loaderThread_project(self):
+
+        projectPath = os.path.join(self.tempDir.name, "project.mydig")
+        with open(projectPath, "wb") as fp:
+            pickle.dump({"Image": self.filepath, "ImagePage": 0,
+                         "LinesOfDataPointsCoords": {"/Data": [[1.0, 2.0], [3.0, 4.0]], "/Empty": []}}, fp)
+
+        loaderThread = DDLoaderThread(projectPath=projectPath)
+        loaderThread.run()
+        self.assertIsNone(loaderThread.getError())
+        self.assertEqual(loaderThread.getImagePath(), self.filepath)
+
+        # coordinate lists as arrays, image decoded
+        (dumpDict, image, pyramidArrs) = loaderThread.getResult()
+        numpy.testing.assert_array_equal(dumpDict["LinesOfDataPointsCoords"]["/Data"], [[1.0, 2.0], [3.0, 4.0]])
+        self.assertEqual(dumpDict["LinesOfDataPointsCoords"]["/Empty"].shape, (0, 2))
+        self.assertIsNone(image)
+        self.assertPyramidEqual(pyramidArrs)
+
+    def test_loaderThread_unreadable(self):
+
+        loaderThread = DDLoaderThread(imagePath=os.path.join(self.tempDir.name, "missing.png"))
+        loaderThread.run()
+        self.assertIsNone(loaderThread.getResult())
+        self.assertIsNotNone(loaderThread.getError())
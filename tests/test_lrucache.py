@@ -0,0 +1,41 @@
+import unittest
+
+
+from src.diagramdigitizer.lrucache import DDLruCache
+
+
+class Test_DDLruCache(unittest.TestCase):
+
+    def test_eviction(self):
+
+        cache = DDLruCache(10)
+        cache.put("a", 1, 4)
+        cache.put("b", 2, 4)
+
+        # "a" is used, "b" is the least recently used
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3, 4)
+
+        self.assertNotIn("b", cache)
+        self.assertIn("a", cache)
+        self.assertEqual(cache.getTotalSize(), 8)
+
+        # too large on its own
+        cache.put("d", 4, 11)
+        self.assertNotIn("d", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_setBudget(self):
+
+        cache = DDLruCache(100)
+
+        for ind in range(10):
+            cache.put(ind, ind, 10)
+
+        cache.put(3, 3, 20)
+        cache.setBudget(45)
+
+        self.assertListEqual([key for key in range(10) if key in cache], [3, 8, 9])
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.pop(3), 3)
+        self.assertEqual(cache.getTotalSize(), 20)
@@ -0,0 +1,117 @@
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.matching import calcFastFftSize
+from src.diagramdigitizer.matching import calcNormCrossCorrelation
+from src.diagramdigitizer.matching import calcTemplateCenter
+from src.diagramdigitizer.matching import calcWindowSums
+from src.diagramdigitizer.matching import findMarkers
+from src.diagramdigitizer.matching import findPeaks
+
+
+def buildMarkerImage(centerList):
+
+    # dark rings (radius 5, anti-aliased) on white, plus filled squares
+    pixelArr = numpy.full((300, 400, 4), 255, dtype=numpy.uint8)
+    (yArr, xArr) = numpy.mgrid[0:300, 0:400] + 0.5
+
+    for (cx, cy) in centerList:
+        alphaArr = numpy.clip(1.5 - numpy.abs(numpy.hypot(xArr - cx, yArr - cy) - 5.0), 0.0, 1.0)
+        pixelArr[..., :3] = numpy.minimum(pixelArr[..., :3], (255 * (1.0 - alphaArr))[..., numpy.newaxis])
+
+    for (x, y) in ((50, 250), (300, 40)):
+        pixelArr[y - 5:y + 6, x - 5:x + 6, :3] = 0
+
+    return pixelArr
+
+
+class Test_matching(unittest.TestCase):
+
+    def test_calcFastFftSize(self):
+
+        self.assertEqual(calcFastFftSize(256), 256)
+        self.assertEqual(calcFastFftSize(97), 100)
+        self.assertEqual(calcFastFftSize(1), 1)
+
+    def test_calcWindowSums(self):
+
+        arr = numpy.arange(30, dtype=numpy.uint8).reshape(5, 6)
+        sumArr = calcWindowSums(arr, 2, 3)
+
+        self.assertEqual(sumArr.shape, (4, 4))
+        self.assertEqual(sumArr[1, 2], arr[1:3, 2:5].sum())
+
+        # wrapped cumulated sums, exact window sums
+        bigArr = numpy.full((5000, 3), 255 ** 2, dtype=numpy.int32)
+        self.assertTrue(numpy.all(calcWindowSums(bigArr, 4, 2, numpy.int32) == 8 * 255 ** 2))
+
+    def test_calcNormCrossCorrelation(self):
+
+        rng = numpy.random.default_rng(0)
+        imageArr = rng.integers(0, 256, (300, 280)).astype(numpy.uint8)
+        templateArr = imageArr[100:120, 50:65]
+
+        nccArr = calcNormCrossCorrelation(imageArr, templateArr)
+        self.assertEqual(nccArr.shape, (281, 266))
+        self.assertAlmostEqual(float(nccArr[100, 50]), 1.0, places=4)
+
+        # reference at some positions
+        t = templateArr - templateArr.mean()
+        for (row, col) in ((0, 0), (280, 265), (37, 211)):
+            w = imageArr[row:row + 20, col:col + 15].astype(float)
+            w -= w.mean()
+            self.assertAlmostEqual(float(nccArr[row, col]), numpy.sum(w * t) / numpy.sqrt(numpy.sum(w ** 2) *
+                                                                                           numpy.sum(t ** 2)), places=4)
+
+        # flat windows
+        imageArr[:40, :40] = 200
+        self.assertTrue(numpy.all(calcNormCrossCorrelation(imageArr, templateArr)[:20, :20] == 0.0))
+
+    def test_findPeaks(self):
+
+        (yArr, xArr) = numpy.mgrid[0:50, 0:60]
+        scoreArr = numpy.exp(-((xArr - 20.3) ** 2 + (yArr - 30.0) ** 2) / 8.0)
+        scoreArr += 0.9 * numpy.exp(-((xArr - 23.0) ** 2 + (yArr - 31.0) ** 2) / 8.0)
+        scoreArr += 0.8 * numpy.exp(-((xArr - 50.0) ** 2 + (yArr - 10.6) ** 2) / 8.0)
+
+        (posArr, valueArr) = findPeaks(scoreArr / scoreArr.max(), 0.5, 5.0)
+
+        # close peaks merged, ordered by score, sub-pixel positions
+        self.assertEqual(len(posArr), 2)
+        self.assertGreater(valueArr[0], valueArr[1])
+        self.assertAlmostEqual(posArr[1, 0], 50.0, delta=0.1)
+        self.assertAlmostEqual(posArr[1, 1], 10.6, delta=0.1)
+
+        self.assertEqual(findPeaks(scoreArr, 10.0, 5.0)[0].shape, (0, 2))
+
+    def test_calcTemplateCenter(self):
+
+        templateArr = numpy.full((10, 12), 255, dtype=numpy.uint8)
+        templateArr[2:5, 6:9] = 0
+
+        self.assertEqual(calcTemplateCenter(templateArr), (7.5, 3.5))
+        self.assertEqual(calcTemplateCenter(numpy.zeros((4, 6))), (3.0, 2.0))
+
+    def test_findMarkers(self):
+
+        centerArr = numpy.array([[40.3, 40.0], [120.0, 61.7], [200.5, 150.2], [350.8, 270.4], [15.0, 200.0]])
+        pixelArr = buildMarkerImage(centerArr)
+
+        # loosely boxed marker
+        markerArr = findMarkers(pixelArr, (112.0, 52.0, 131.0, 70.0))
+        self.assertEqual(len(markerArr), len(centerArr))
+
+        distArr = numpy.hypot(*(markerArr[:, numpy.newaxis] - centerArr[numpy.newaxis]).transpose(2, 0, 1))
+        self.assertTrue(numpy.all(distArr.min(axis=1) < 0.2))
+
+        # restricted to a rectangle
+        markerArr = findMarkers(pixelArr, (112.0, 52.0, 131.0, 70.0), rect=(100.0, 0.0, 300.0, 300.0))
+        self.assertEqual(len(markerArr), 2)
+
+        self.assertEqual(findMarkers(pixelArr, (10.0, 10.0, 11.0, 11.0)).shape, (0, 2))
+
+        # with correlations, descending
+        (markerArr, scoreArr) = findMarkers(pixelArr, (112.0, 52.0, 131.0, 70.0), withScores=True)
+        self.assertEqual(scoreArr.shape, (len(centerArr),))
+        self.assertTrue(numpy.all(numpy.diff(scoreArr) <= 0.0))
@@ -0,0 +1,64 @@
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.extraction import calcColorMask
+from src.diagramdigitizer.extraction import extractColorCurve
+from src.diagramdigitizer.extraction import traceColorCurve
+from src.diagramdigitizer.pipeline import DDExtractionPipeline
+from src.diagramdigitizer.pipeline import calcChannels
+from src.diagramdigitizer.pipeline import calcColorDistance
+from src.diagramdigitizer.pipeline import calcDistanceMask
+
+
+class Test_pipeline(unittest.TestCase):
+
+    def test_calcChannels(self):
+
+        pixelArr = numpy.random.default_rng(0).integers(0, 256, (20, 30, 4), dtype=numpy.uint8)
+
+        channelArr = calcChannels(pixelArr, (5.0, 2.5, 25.0, 18.0))
+        self.assertEqual(channelArr.shape, (3, 16, 20))
+        self.assertTrue(numpy.array_equal(channelArr, numpy.moveaxis(pixelArr[2:18, 5:25, :3], 2, 0)))
+
+    def test_calcDistanceMask(self):
+
+        pixelArr = numpy.random.default_rng(1).integers(0, 256, (40, 50, 4), dtype=numpy.uint8)
+
+        distArr = calcColorDistance(calcChannels(pixelArr), (200, 30, 90))
+        self.assertEqual(distArr[3, 4], numpy.sum((pixelArr[3, 4, :3].astype(int) - (200, 30, 90)) ** 2))
+
+        # same mask as in one pass
+        for tolerance in (0.0, 40.0, 100.5, 500.0):
+            self.assertTrue(numpy.array_equal(calcDistanceMask(distArr, tolerance),
+                                              calcColorMask(pixelArr, (200, 30, 90), tolerance)))
+
+    def test_DDExtractionPipeline(self):
+
+        pixelArr = numpy.full((100, 160, 4), 255, dtype=numpy.uint8)
+        xArr = numpy.arange(160)
+        for dy in range(-2, 3):
+            pixelArr[(50 + 30 * numpy.sin(xArr / 20.0)).astype(int) + dy, xArr, :3] = (200, 20, 20) if (
+                abs(dy) < 2) else (230, 140, 140)
+        rect = (10.0, 5.0, 150.0, 95.0)
+
+        extractionPipeline = DDExtractionPipeline()
+        extractionPipeline.setPixels(pixelArr)
+
+        # results as in one pass, a changed tolerance reuses the distances
+        for tolerance in (40.0, 140.0):
+            self.assertTrue(numpy.array_equal(extractionPipeline.getPoints(rect, (200, 20, 20), tolerance),
+                                              extractColorCurve(pixelArr, (200, 20, 20), tolerance, rect)))
+        distArr = extractionPipeline.getDistance(rect, (200, 20, 20))
+        extractionPipeline.getMask(rect, (200, 20, 20), 60.0)
+        self.assertIs(extractionPipeline.getDistance(rect, (200, 20, 20)), distArr)
+
+        self.assertTrue(numpy.array_equal(extractionPipeline.traceCurve((80.0, 50.0), 40.0, rect, 5.0),
+                                          traceColorCurve(pixelArr, (80.0, 50.0), 40.0, rect, 5.0)))
+        self.assertEqual(extractionPipeline.traceCurve((5.0, 50.0), 40.0, rect).shape, (0, 2))
+
+        # another image clears the cache
+        self.assertGreater(extractionPipeline.getCacheSize(), 0)
+        extractionPipeline.setPixels(pixelArr.copy())
+        self.assertEqual(extractionPipeline.getCacheSize(), 0)
+        self.assertTrue(extractionPipeline.isCacheable(rect))
@@ -0,0 +1,96 @@
+import unittest
+
+import numpy
+
+from src.diagramdigitizer.preprocessing import binarize
+from src.diagramdigitizer.preprocessing import calcOtsuThreshold
+from src.diagramdigitizer.preprocessing import calcParamsKey
+from src.diagramdigitizer.preprocessing import convertToGrayscale
+from src.diagramdigitizer.preprocessing import estimateSkewAngle
+from src.diagramdigitizer.preprocessing import preprocessImage
+from src.diagramdigitizer.preprocessing import PREPROCESSING_STEPS
+from src.diagramdigitizer.preprocessing import rotateImage
+from src.diagramdigitizer.preprocessing import stretchContrast
+
+
+def buildLinesImage():
+
+    # bright image with dark horizontal lines
+    pixelArr = numpy.full((300, 400, 4), 240, dtype=numpy.uint8)
+    for y in range(40, 260, 30):
+        pixelArr[y:y + 3, 20:380, :3] = 20
+
+    return pixelArr
+
+
+class Test_preprocessing(unittest.TestCase):
+
+    def test_calcParamsKey(self):
+
+        self.assertEqual(calcParamsKey({"b": None, "a": 1.0}), calcParamsKey({"a": 1.0, "b": None}))
+        self.assertNotEqual(calcParamsKey({"a": 1.0}), calcParamsKey({"a": 2.0}))
+
+    def test_convertToGrayscale(self):
+
+        pixelArr = numpy.array([[[255, 0, 0, 10], [0, 0, 255, 20]]], dtype=numpy.uint8)
+        grayArr = convertToGrayscale(pixelArr)
+
+        self.assertTrue(numpy.array_equal(grayArr[0, 0], [77, 77, 77, 10]))
+        self.assertTrue(numpy.array_equal(grayArr[0, 1], [29, 29, 29, 20]))
+
+    def test_stretchContrast(self):
+
+        pixelArr = numpy.zeros((10, 10, 4), dtype=numpy.uint8)
+        pixelArr[..., :3] = numpy.linspace(100, 150, 100).reshape(10, 10, 1).astype(numpy.uint8)
+        pixelArr[..., 3] = 255
+
+        outArr = stretchContrast(pixelArr, 0.0)
+        self.assertEqual(outArr[..., :3].min(), 0)
+        self.assertEqual(outArr[..., :3].max(), 255)
+        self.assertTrue(numpy.all(outArr[..., 3] == 255))
+
+        # constant image unchanged
+        self.assertTrue(numpy.all(stretchContrast(numpy.full((4, 4, 4), 9, dtype=numpy.uint8)) == 9))
+
+    def test_binarize(self):
+
+        pixelArr = buildLinesImage()
+        self.assertTrue(20 <= calcOtsuThreshold(pixelArr[..., 0]) < 240)
+
+        outArr = binarize(pixelArr)
+        self.assertTrue(numpy.array_equal(numpy.unique(outArr[..., :3]), [0, 255]))
+        self.assertTrue(numpy.all(outArr[40, 20:380, :3] == 0))
+        self.assertTrue(numpy.all(outArr[0, :, :3] == 255))
+
+        # given threshold
+        self.assertTrue(numpy.all(binarize(pixelArr, 250)[..., :3] == 0))
+
+    def test_rotateImage(self):
+
+        pixelArr = buildLinesImage()
+        self.assertTrue(numpy.array_equal(rotateImage(pixelArr, 0.0), pixelArr))
+
+        # counter-clockwise: a line rises to the right
+        rotatedArr = rotateImage(pixelArr, 3.0)
+        yLeft = numpy.nonzero(rotatedArr[:, 60, 0] < 128)[0][0]
+        yRight = numpy.nonzero(rotatedArr[:, 340, 0] < 128)[0][0]
+        self.assertGreater(yLeft, yRight)
+
+    def test_estimateSkewAngle(self):
+
+        pixelArr = buildLinesImage()
+
+        for angle in (-2.5, 0.0, 1.2):
+            self.assertAlmostEqual(estimateSkewAngle(rotateImage(pixelArr, angle)), -angle, delta=0.1)
+
+        # no dark pixels
+        self.assertEqual(estimateSkewAngle(numpy.full((20, 20, 4), 255, dtype=numpy.uint8)), 0.0)
+
+    def test_preprocessImage(self):
+
+        pixelArr = buildLinesImage()
+        self.assertIs(preprocessImage(pixelArr, {}), pixelArr)
+
+        outArr = preprocessImage(pixelArr, {PREPROCESSING_STEPS.GRAYSCALE: True, PREPROCESSING_STEPS.BINARIZE: 128})
+        self.assertTrue(numpy.array_equal(outArr, binarize(pixelArr, 128)))
+        self.assertTrue(numpy.array_equal(pixelArr, buildLinesImage()))
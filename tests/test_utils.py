@@ -1,4 +1,6 @@
 import numpy
+import os
+import tempfile
 import unittest
 
 
@@ -10,6 +12,8 @@ from src.diagramdigitizer.utils import sortNameListWithTag
 from src.diagramdigitizer.utils import contentStatusDict
 from src.diagramdigitizer.utils import sortArrDataDict
 from src.diagramdigitizer.utils import trafoDictKeys
+from src.diagramdigitizer.utils import readCoordsFromText
+from src.diagramdigitizer.utils import formatCoordinate
 
 
 class Test_sortNameListWithTag(unittest.TestCase):
@@ -72,3 +76,39 @@ class Test_trafoDictKeys(unittest.TestCase):
         dataDict = {'set1': 1.0, 'set2': 2.0}
         expectedList = [1, 2]
         self.assertListEqual(sorted(trafoDictKeys(dataDict).keys()), expectedList)
+
+
+class Test_readCoordsFromText(unittest.TestCase):
+
+    def readCoordsFromContent(self, content):
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            filepath = os.path.join(tmpDir, 'data.txt')
+            with open(filepath, 'w') as fp:
+                fp.write(content)
+            return readCoordsFromText(filepath)
+
+    def test_readCoordsFromText_csvExport(self):
+        coordsArr = self.readCoordsFromContent('set1;1.0;2.0\nset1;3.0;4.5\n')
+        self.assertListEqual(coordsArr.tolist(), [[1.0, 2.0], [3.0, 4.5]])
+
+    def test_readCoordsFromText_textExport(self):
+        coordsArr = self.readCoordsFromContent('# set1\n1.0\t2.0\n3.0\t4.5\n\n')
+        self.assertListEqual(coordsArr.tolist(), [[1.0, 2.0], [3.0, 4.5]])
+
+    def test_readCoordsFromText_whitespace(self):
+        coordsArr = self.readCoordsFromContent('1.0 2.0\n')
+        self.assertListEqual(coordsArr.tolist(), [[1.0, 2.0]])
+
+    def test_readCoordsFromText_empty(self):
+        coordsArr = self.readCoordsFromContent('# nothing\n')
+        self.assertEqual(coordsArr.shape, (0, 2))
+
+
+class Test_formatCoordinate(unittest.TestCase):
+
+    def test_formatCoordinate(self):
+        self.assertEqual(formatCoordinate(3.14159265, 4), '3.142')
+        self.assertEqual(formatCoordinate(1234567.0, 3), '1.23e+06')
+        self.assertEqual(formatCoordinate(numpy.float64(0.5)), '0.5')
+        self.assertEqual(formatCoordinate(numpy.nan), '')